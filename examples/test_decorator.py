@@ -2,7 +2,7 @@ import asyncio
 from navconfig import config
 from notify.models import Actor
 from notify import Notify
-from qw.decorators import dispatch
+from qw.decorators import dispatch, close_client
 
 stmp_host_user = config.get('stmp_host_user')
 stmp_host_password = config.get('stmp_host_password')
@@ -47,4 +47,5 @@ if __name__ == '__main__':
             create_user()
         )
     finally:
+        loop.run_until_complete(close_client())
         loop.close()
@@ -0,0 +1,37 @@
+"""Batches, fan-out and hedged calls with Queue Worker."""
+import asyncio
+import time
+from qw.client import QClient
+from qw.utils import cPrint
+
+
+def square(n: int) -> int:
+    return n * n
+
+
+def slow(seconds: float) -> float:
+    time.sleep(seconds)
+    return seconds
+
+
+async def main():
+    async with QClient() as qw:
+        # a batch of calls sent in a single payload by worker:
+        results = await qw.run_many([(square, (n,)) for n in range(100)])
+        print('BATCH: ', results[:10])
+        # fan-out, at most 8 calls in flight on every worker:
+        async for result in qw.map(square, range(100), per_worker=8):
+            print('MAP: ', result)
+        # idempotent calls can be sent to a second worker when slow:
+        for _ in range(30):
+            await qw.run(slow, 0.1, hedge=True)
+        print('HEDGE: ', qw.hedge_metrics())
+        print('POOLS: ', qw.pool_metrics())
+        print('BREAKERS: ', qw.breaker_metrics())
+
+
+if __name__ == '__main__':
+    start_time = time.time()
+    asyncio.run(main())
+    end_time = time.time() - start_time
+    cPrint(f'Task took {end_time} seconds to run', level='DEBUG')
@@ -12,8 +12,8 @@ from .conf import (
     WORKER_DEFAULT_PORT,
     WORKER_DEFAULT_QTY,
     WORKER_QUEUE_SIZE,
-    WORKER_DISCOVERY_PORT
-
+    WORKER_DISCOVERY_PORT,
+    WORKER_SERVER_PROTOCOL
 )
 from .process import SpawnProcess
 from .utils import cPrint
@@ -63,6 +63,13 @@ def main():
         default=WORKER_DISCOVERY_PORT,
         help='UDP Port for Service discovery'
     )
+    parser.add_argument(
+        '--protocol', dest='protocol',
+        type=str.lower,
+        choices=["streams", "protocol"],
+        default=WORKER_SERVER_PROTOCOL,
+        help='Server implementation: StreamReader/Writer or QueueProtocol'
+    )
     parser.add_argument(
         '--debug', action="store_true",
         default=False,
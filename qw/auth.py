@@ -0,0 +1,86 @@
+"""QueueWorker Session Authentication.
+
+Nonce-based challenge/response between QClient and QWorker.
+
+A full handshake proves the knowledge of the shared secret over a fresh
+nonce sent by the Worker, and the Worker returns a session ticket (expiry +
+random bytes). Both sides derive the same session key from the ticket, so
+any Worker sharing the secret can validate it without keeping state. New
+connections of the same session only prove the knowledge of the session key
+over a fresh nonce, then a captured handshake cannot be replayed.
+"""
+import hashlib
+import hmac
+import os
+import struct
+import time
+from functools import lru_cache
+from qw.exceptions import ConfigError
+
+
+## Prefixes for a full handshake and for resuming a session.
+AUTH_PREFIX = b'auth:'
+RESUME_PREFIX = b'resume:'
+
+## Reply sent by Worker when a session ticket is expired or invalid.
+SESSION_EXPIRED = b'SESSIONX'
+
+
+class SessionExpired(ConnectionRefusedError):
+    """Session ticket was refused by Worker, a full handshake is needed."""
+
+
+NONCE_SIZE = 32
+PROOF_SIZE = hashlib.sha512().digest_size
+SESSION_TICKET = struct.Struct('!Q16s')
+TICKET_SIZE = SESSION_TICKET.size
+
+
+def make_nonce() -> bytes:
+    return os.urandom(NONCE_SIZE)
+
+
+def make_proof(key: bytes, *parts: bytes) -> bytes:
+    """HMAC-SHA512 of the parts using key."""
+    return hmac.new(key, b''.join(parts), digestmod=hashlib.sha512).digest()
+
+
+def verify_proof(proof: bytes, key: bytes, *parts: bytes) -> bool:
+    return hmac.compare_digest(proof, make_proof(key, *parts))
+
+
+def secret_key(secret: str) -> bytes:
+    if not secret:
+        raise ConfigError(
+            "QW Server: Error, Empty Signature"
+        )
+    return secret.encode('utf-8')
+
+
+def new_ticket(lifetime: int) -> bytes:
+    """Session ticket: expiration timestamp and 16 random bytes."""
+    return SESSION_TICKET.pack(int(time.time()) + lifetime, os.urandom(16))
+
+
+def ticket_expiration(ticket: bytes) -> int:
+    expires, _ = SESSION_TICKET.unpack(ticket)
+    return expires
+
+
+@lru_cache(maxsize=1024)
+def derive_session_key(secret: bytes, ticket: bytes) -> bytes:
+    """Session key derived from the shared secret and the session ticket."""
+    return make_proof(secret, b'qw-session', ticket)
+
+
+class ClientSession:
+    """Session established by a Client after a full handshake."""
+    def __init__(self, ticket: bytes, secret: bytes):
+        self.ticket = ticket
+        self.key = derive_session_key(secret, ticket)
+        self.expires = ticket_expiration(ticket)
+
+    @property
+    def expired(self) -> bool:
+        # renew the session a bit before the Worker considers it expired.
+        return time.time() >= self.expires - 5
@@ -0,0 +1,146 @@
+"""QueueWorker Client Circuit Breaker.
+
+Workers failing repeatedly are ejected (circuit open) for an exponential
+backoff period, after that a single trial request is allowed (half-open):
+a success closes the circuit, a failure opens it again with a longer
+backoff. Ejected Workers are probed in background by the client.
+"""
+import random
+import time
+from navconfig.logging import logging
+from .conf import (
+    WORKER_BREAKER_THRESHOLD,
+    WORKER_BREAKER_BACKOFF,
+    WORKER_BREAKER_MAX_BACKOFF
+)
+
+
+### Circuit States:
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+
+class CircuitBreaker:
+    """Circuit Breaker of a single Worker.
+
+    Args:
+        worker: (host, port) of the Worker.
+        threshold: consecutive failures that open the circuit.
+        backoff: seconds the circuit is open the first time.
+        max_backoff: max seconds the circuit is open.
+    """
+    def __init__(
+        self,
+        worker: tuple,
+        threshold: int = WORKER_BREAKER_THRESHOLD,
+        backoff: float = WORKER_BREAKER_BACKOFF,
+        max_backoff: float = WORKER_BREAKER_MAX_BACKOFF
+    ):
+        self.worker = worker
+        self.threshold = max(threshold, 1)
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.failures: int = 0
+        self.opened: int = 0
+        self._state: str = CLOSED
+        self._retry_at: float = 0.0
+        self._trial: bool = False
+        self.logger = logging.getLogger('QW.Breaker')
+
+    def __repr__(self) -> str:
+        return f'<CircuitBreaker {self.worker!r} {self.state}>'
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and time.monotonic() >= self._retry_at:
+            self._state = HALF_OPEN
+            self._trial = False
+        return self._state
+
+    @property
+    def retry_in(self) -> float:
+        """Seconds until the circuit allows a trial request."""
+        return max(self._retry_at - time.monotonic(), 0.0)
+
+    @property
+    def available(self) -> bool:
+        """True if the circuit is closed or can accept a trial request."""
+        state = self.state
+        return state == CLOSED or (state == HALF_OPEN and not self._trial)
+
+    def allow(self) -> bool:
+        """True if a request can be sent to Worker."""
+        state = self.state
+        if state == CLOSED:
+            return True
+        if state == HALF_OPEN and not self._trial:
+            # only one trial request at time:
+            self._trial = True
+            return True
+        return False
+
+    def success(self):
+        if self._state != CLOSED:
+            self.logger.info(
+                f"Worker {self.worker!r} is available again"
+            )
+        self._state = CLOSED
+        self.failures = 0
+        self.opened = 0
+        self._trial = False
+
+    def failure(self):
+        self.failures += 1
+        state = self.state
+        if state == OPEN:
+            # already ejected (by concurrent requests failing together):
+            return
+        if state == HALF_OPEN or self.failures >= self.threshold:
+            self.trip()
+
+    def release(self):
+        """The trial request ended without success or failure (cancelled)."""
+        if self._state == HALF_OPEN:
+            self._trial = False
+
+    def _open(self, opened: int) -> float:
+        delay = min(self.backoff * (2 ** opened), self.max_backoff)
+        delay *= random.uniform(0.8, 1.2)
+        self._state = OPEN
+        self._trial = False
+        self._retry_at = time.monotonic() + delay
+        return delay
+
+    def trip(self):
+        """Open the circuit (exponential backoff with jitter)."""
+        delay = self._open(self.opened)
+        self.opened += 1
+        self.logger.warning(
+            f"Worker {self.worker!r} ejected for {delay:.1f} seconds "
+            f"after {self.failures} failures"
+        )
+
+    def probed(self, healthy: bool):
+        """Result of a background health probe of an ejected Worker.
+
+        A failed probe doesn't grow the backoff (only failed requests do),
+        an open circuit keeps their retry time.
+        """
+        state = self.state
+        if healthy:
+            if state != CLOSED:
+                # let a (new) trial request to close the circuit:
+                self._state = HALF_OPEN
+                self._trial = False
+        elif state == HALF_OPEN and not self._trial:
+            # still down: open again with the current backoff
+            self._open(max(self.opened - 1, 0))
+
+    def to_dict(self) -> dict:
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "opened": self.opened,
+            "retry_in": round(self.retry_in, 3)
+        }
@@ -6,19 +6,21 @@ import uuid
 import warnings
 import socket
 import base64
-from typing import Any, Union
-from collections.abc import Callable, Awaitable
+import threading
+from typing import Any, Optional, Union
+from collections.abc import Callable, Awaitable, Iterable, AsyncIterable
 from collections import defaultdict
 from functools import partial
-from concurrent.futures import ThreadPoolExecutor
+from contextlib import suppress
+from concurrent.futures import ThreadPoolExecutor, Future
 from redis import asyncio as aioredis
 import pickle
 import cloudpickle
 import jsonpickle
 import orjson
 from navconfig.logging import logging
-from qw.discovery import get_client_discovery
-from qw.utils import make_signature
+from qw.discovery import WorkerRegistry, workers_registry, get_redis_workers
+from qw.utils import local_sockets, owned_by_user, is_local_host
 from qw.exceptions import (
     ParserError,
     QWException,
@@ -30,13 +32,57 @@ from .conf import (
     WORKER_REDIS,
     REDIS_WORKER_STREAM,
     REDIS_WORKER_GROUP,
-    USE_DISCOVERY,
     WORKER_SECRET_KEY,
-    MAX_WORKERS,
-    expected_message
+    WORKER_FRAMED_PROTOCOL,
+    WORKER_BATCH_SIZE,
+    WORKER_MAP_CONCURRENCY,
+    WORKER_MAP_PER_WORKER,
+    WORKER_MAP_RETRIES,
+    WORKER_HIGH_LIST,
+    WORKER_HIGH_PRIORITY,
+    WORKER_COMPRESSION,
+    WORKER_COMPRESSION_THRESHOLD,
+    WORKER_MAX_PAYLOAD_SIZE,
+    WORKER_UNIX_SOCKET,
+    WORKER_FUNCTION_CACHE,
+    WORKER_CAPACITY_TTL,
+    WORKER_SCHEDULER,
+    WORKER_BREAKER_PROBE_INTERVAL,
+    WORKER_HEDGE_PERCENTILE
 )
-from .process import QW_WORKER_LIST
-from .wrappers import FuncWrapper, TaskWrapper
+from .auth import (
+    AUTH_PREFIX,
+    RESUME_PREFIX,
+    SESSION_EXPIRED,
+    SessionExpired,
+    NONCE_SIZE,
+    TICKET_SIZE,
+    ClientSession,
+    make_nonce,
+    make_proof,
+    secret_key
+)
+from .compression import CODECS
+from .serializer import dumps, loads, dump_function, dumps_call
+from .frames import (
+    FRAME_TASK,
+    FRAME_HEALTH,
+    FRAME_BATCH,
+    FRAME_STREAM,
+    FRAME_CALL,
+    FRAME_PROBE,
+    FLAG_ERROR,
+    FLAG_BUFFERS,
+    FLAG_MISSING,
+    CAPACITY_OPTION,
+    WorkerCapacity,
+    FramedConnection
+)
+from .pool import WorkerPool
+from .scheduler import Scheduler, WorkerStats, HashRing, get_scheduler
+from .breaker import CircuitBreaker, CLOSED
+from .status import PROBE_FORMAT, parse_probe
+from .wrappers import QueueWrapper, FuncWrapper, TaskWrapper
 
 
 MAX_RETRY_COUNT = 5
@@ -55,6 +101,41 @@ def round_robin_worker(workers):
         except StopIteration:
             break
 
+
+def result_error(result: Any) -> Optional[BaseException]:
+    """Exception of a Task failed on Worker (sent as is or as an error dict)."""
+    if isinstance(result, BaseException):
+        return result
+    if isinstance(result, dict) and 'exception' in result:
+        exc = result['exception']
+        if isinstance(exc, type) and issubclass(exc, BaseException):
+            try:
+                return exc(result.get('error'))
+            except Exception:  # pylint: disable=W0703
+                pass
+        return QWException(f"{exc!r}: {result.get('error')}")
+    return None
+
+
+def call_key(fn: Any) -> str:
+    """Name of the function of a call (latencies are kept by function)."""
+    if isinstance(fn, TaskWrapper):
+        return f'{fn.program}.{fn.task}'
+    # FuncWrapper and partial:
+    fn = getattr(fn, 'func', fn)
+    if not hasattr(fn, '__qualname__'):
+        fn = type(fn)
+    return f'{getattr(fn, "__module__", None)}.{fn.__qualname__}'
+
+
+def sock_host(writer: asyncio.StreamWriter) -> str:
+    """Local address of a connection (hostname for Unix Sockets)."""
+    sockname = writer.get_extra_info('sockname')
+    if isinstance(sockname, (tuple, list)):
+        return sockname[0]
+    return socket.gethostname()
+
+
 class QClient:
     """
     Queue Task Worker Client.
@@ -65,66 +146,90 @@ class QClient:
         _scheduler: Generator that returns host and port of selected worker.
         _retries_per_server: Defaultdict that stores number of retries for
                              each task queue server.
+        _pools: pools of persistent (framed) connections opened to each worker.
+        _scheduler: strategy used to select the worker of every call
+                    (round_robin, least_outstanding, p2c or ewma).
+
+    Framed connections stay open (pooled) until the client is disconnected,
+    use it as an async context manager or call disconnect() when done:
+
+        async with QClient() as qw:
+            result = await qw.run(fn)
     """
     timeout: int = 5
     redis: Callable = None
 
-    def __init__(self, worker_list: list = None, timeout: int = 5):
+    def __init__(
+        self,
+        worker_list: list = None,
+        timeout: int = 5,
+        framed: bool = WORKER_FRAMED_PROTOCOL,
+        scheduler: Union[str, type] = WORKER_SCHEDULER
+    ):
         try:
             self._loop = asyncio.get_event_loop()
         except RuntimeError:
             raise
         ## logger:
         self.logger = logging.getLogger('QW.Client')
-        ## check if we use network discovery or redis list:
+        ## without a worker list, workers are discovered (network discovery or
+        ## redis list) on first use and cached for all clients of the process:
+        self._registry: WorkerRegistry = None
         if worker_list:
-            self._workers = worker_list
-            self._worker_list = itertools.cycle(worker_list)
-        elif USE_DISCOVERY is True:
-            # get worker list from discovery:
-            self._workers, self._worker_list = get_client_discovery()
+            self._workers = list(worker_list)
         else:
-            # getting the list from redis
-            self._workers, self._worker_list = self.get_workers()
-        if not self._worker_list:
-            self.logger.warning(
-                'EMPTY WORKER LIST: Trying to connect to a default Worker'
-            )
-            # try to connect with the default worker
-            self._workers = [(WORKER_DEFAULT_HOST, WORKER_DEFAULT_PORT)]
-            self._worker_list = itertools.cycle(self._workers)
+            self._registry = workers_registry
+            self._workers = list(workers_registry.workers)
+        ## workers reserved for high priority tasks:
+        self._high_workers: list = [(host, int(port)) for host, port in WORKER_HIGH_LIST]
         self._num_retries = defaultdict(int)
         self._worker = None
         self.timeout = timeout
+        ## persistent connections:
+        self._framed: bool = framed
+        self._pools: dict = {}
+        ## authenticated session (shared by all connections):
+        self._session: ClientSession = None
+        ## worker selection (fed by in-flight requests, latency and capacity):
+        self._stats = WorkerStats()
+        self._scheduler: Scheduler = get_scheduler(scheduler, self._stats)
+        ## affinity of calls with a routing key:
+        self._ring: HashRing = HashRing()
+        ## hedged calls:
+        self._hedging: dict = {"calls": 0, "hedged": 0, "won": 0}
+        ## circuit breakers (ejected workers are probed in background):
+        self._breakers: dict = {}
+        self._prober: asyncio.Task = None
+
+    async def update_workers(self) -> list:
+        """Workers of this client (discovered on first use, then cached)."""
+        if self._registry is not None:
+            if (workers := await self._registry.get()):
+                self._workers = workers
+            elif not self._workers:
+                self.logger.warning(
+                    'EMPTY WORKER LIST: Trying to connect to a default Worker'
+                )
+                # try to connect with the default worker
+                self._workers = [(WORKER_DEFAULT_HOST, WORKER_DEFAULT_PORT)]
+        return self._workers
 
     def discover_workers(self):
-        if USE_DISCOVERY is True:
-            self._workers, self._worker_list = get_client_discovery()
-        else:
-            self._workers, self._worker_list = self.get_workers()
+        """Discover the workers again on next call."""
+        if self._registry is not None:
+            self._registry.invalidate()
 
     def get_workers(self):
+        """Workers registered on Redis (blocking)."""
         async def get_workers_list():
             try:
-                # starting redis:
-                redis = aioredis.ConnectionPool.from_url(
-                    WORKER_REDIS,
-                    decode_responses=True,
-                    encoding='utf-8'
-                )
-                conn = aioredis.Redis(connection_pool=redis)
-                workers = []
-                if (lrange := await conn.lrange(QW_WORKER_LIST, 0, MAX_WORKERS)):
-                    w = [orjson.loads(el) for el in lrange]
-                    workers = [tuple(list(v.values())[0]) for v in w]
+                workers = await get_redis_workers()
                 return workers, itertools.cycle(workers)
             except aioredis.ConnectionError as err:
                 self.logger.error(
                     f"Redis connection error: {err}"
                 )
                 raise
-            finally:
-                await redis.disconnect(inuse_connections=True)
 
         def get_workers():
             loop = asyncio.new_event_loop()
@@ -147,18 +252,50 @@ class QClient:
     async def validate_connection(
         self,
         reader: asyncio.StreamReader,
-        writer: asyncio.StreamWriter
+        writer: asyncio.StreamWriter,
+        framed: bool = False,
+        worker: tuple = None
     ) -> tuple:
-        signature = make_signature(expected_message, WORKER_SECRET_KEY)
-        writer.write(b'%d\n' % len(signature))
-        writer.write(signature)
+        secret = secret_key(WORKER_SECRET_KEY)
+        # asking for a persistent connection (and for the worker capacity):
+        mode = b'framed' if framed is True else b'stream'
+        mode += b':' + CAPACITY_OPTION
+        session = self._session
+        if session is not None and session.expired:
+            session = self._session = None
+        prefix = RESUME_PREFIX if session else AUTH_PREFIX
+        writer.write(prefix + mode + b'\n')
+        await writer.drain()
+        # the challenge sent by worker:
+        nonce = await reader.readexactly(NONCE_SIZE)
+        if session is not None:
+            writer.write(session.ticket + make_proof(session.key, nonce, mode))
+        else:
+            client_nonce = make_nonce()
+            writer.write(
+                client_nonce + make_proof(secret, nonce, client_nonce, mode)
+            )
         # sending data to worker:
         await writer.drain()
         response = None
         response = await reader.readexactly(8)
         if response == b'CONTINUE':
+            if session is None:
+                ticket = await reader.readexactly(TICKET_SIZE)
+                self._session = ClientSession(ticket, secret)
+            capacity = WorkerCapacity.unpack(
+                await reader.readexactly(WorkerCapacity.size)
+            )
+            if worker is not None:
+                self.set_capacity(worker, capacity)
             return [reader, writer]
         else:
+            # session was refused, next connection needs a full handshake:
+            self._session = None
+            if response == SESSION_EXPIRED:
+                raise SessionExpired(
+                    "Session expired on QW Server."
+                )
             try:
                 response = cloudpickle.loads(response)
                 if isinstance(response, BaseException):
@@ -168,70 +305,276 @@ class QClient:
                     f"Connection refused by QW Server: {ex}"
                 )
 
-    async def get_connection(self):
-        retries = {}
-        reader = None
-        writer = None
-        if not self._worker_list:
-            # try discover again a worker list:
-            self.discover_workers()
+    async def _connect(self, worker: tuple) -> tuple:
+        """Connect to Worker, using an Unix Socket if worker is local.
+
+        Only sockets owned by the same user are used, a socket bound by
+        another user could impersonate the Worker.
+        """
+        host, port = worker
+        if WORKER_UNIX_SOCKET is True and is_local_host(host):
+            sockets = local_sockets(port)
+            random.shuffle(sockets)
+            for path in sockets:
+                try:
+                    if not owned_by_user(path):
+                        self.logger.warning(
+                            f"Skipping Unix Socket {path}, owned by another user"
+                        )
+                        continue
+                    return await asyncio.wait_for(
+                        asyncio.open_unix_connection(path), timeout=self.timeout
+                    )
+                except OSError as exc:
+                    # stale socket of a stopped worker:
+                    self.logger.debug(
+                        f"Unable to connect to Unix Socket {path}: {exc}"
+                    )
+        return await asyncio.wait_for(
+            asyncio.open_connection(host, port), timeout=self.timeout
+        )
+
+    async def open_connection(self, worker: tuple, framed: bool = False):
+        """Open an authenticated connection to a Worker."""
+        reader, writer = await self._connect(worker)
+        # check the signature between server and client:
+        reader, writer = await self.validate_connection(
+            reader, writer, framed=framed, worker=worker
+        )
+        if framed is True:
+            conn = FramedConnection(
+                reader,
+                writer,
+                worker,
+                threshold=WORKER_COMPRESSION_THRESHOLD,
+                on_capacity=self.set_capacity,
+                max_size=WORKER_MAX_PAYLOAD_SIZE
+            )
+            try:
+                # agree on the compression codec:
+                await conn.negotiate(
+                    [codec for codec in WORKER_COMPRESSION if codec in CODECS]
+                )
+            except Exception:
+                await conn.close()
+                raise
+            return conn
+        return [reader, writer]
+
+    def get_pool(self, worker: tuple) -> WorkerPool:
+        """Return the pool of persistent connections to a Worker."""
+        try:
+            return self._pools[worker]
+        except KeyError:
+            pool = WorkerPool(
+                worker,
+                partial(self.open_connection, worker, framed=True),
+                on_capacity=self.set_capacity
+            )
+            self._pools[worker] = pool
+            return pool
+
+    def pool_metrics(self) -> dict:
+        """Metrics of the connection pools, by worker."""
+        return {
+            worker: pool.metrics() for worker, pool in self._pools.items()
+        }
+
+    def set_capacity(self, worker: tuple, capacity: WorkerCapacity):
+        self._stats.set_capacity(worker, capacity)
+
+    def is_full(self, worker: tuple) -> bool:
+        """True if the last capacity advertised (recently) by worker is full."""
+        capacity = self._stats.capacity.get(worker)
+        return (
+            capacity is not None
+            and capacity.full
+            and capacity.age() < WORKER_CAPACITY_TTL
+        )
+
+    def scheduler_metrics(self) -> dict:
+        """Requests in flight, latency and capacity, by worker."""
+        return self._stats.to_dict()
+
+    async def get_connection(self, framed: bool = False, queued: bool = False):
+        """Return a connection to the Worker selected by the Scheduler."""
+        _, conn = await self.select_worker(framed=framed, queued=queued)
+        return conn
+
+    def breaker(self, worker: tuple) -> CircuitBreaker:
+        try:
+            return self._breakers[worker]
+        except KeyError:
+            breaker = self._breakers[worker] = CircuitBreaker(worker)
+            return breaker
+
+    def breaker_metrics(self) -> dict:
+        """State of the circuit breakers, by worker."""
+        return {
+            worker: breaker.to_dict() for worker, breaker in self._breakers.items()
+        }
+
+    def connection_failed(self, worker: tuple):
+        self._num_retries[worker] += 1
+        self.breaker(worker).failure()
+        if self.breaker(worker).state != CLOSED:
+            self.start_prober()
+
+    def connection_succeeded(self, worker: tuple):
+        self._num_retries.pop(worker, None)
+        self.breaker(worker).success()
+
+    def start_prober(self):
+        """Start probing the ejected workers (if is not running)."""
+        if self._prober is None or self._prober.done():
+            self._prober = asyncio.get_running_loop().create_task(
+                self._probe_ejected()
+            )
+
+    async def _probe_ejected(self):
         while True:
-            worker = round_robin_worker(self._worker_list)
+            await asyncio.sleep(WORKER_BREAKER_PROBE_INTERVAL)
+            ejected = [
+                worker for worker, breaker in self._breakers.items()
+                if breaker.state != CLOSED
+            ]
+            if not ejected:
+                break
+            for worker in ejected:
+                # the binary probe reports the health of the Worker without
+                # authentication (and without the JSON status):
+                try:
+                    healthy = (await self.probe_worker(worker))['running']
+                except (QWException, ValueError, OSError, asyncio.TimeoutError):
+                    healthy = False
+                self.breaker(worker).probed(healthy)
+
+    def route(self, key: Union[str, bytes], usable: list, exclude: set) -> tuple:
+        """Worker owning a routing key on the hash ring."""
+        self._ring.update(self._workers)
+        unusable = self._ring.workers - set(usable)
+        return self._ring.get(key, exclude=unusable | exclude) or self._ring.get(
+            key, exclude=unusable
+        )
+
+    async def select_worker(
+        self,
+        framed: bool = False,
+        queued: bool = False,
+        key: Union[str, bytes] = None,
+        exclude: set = None,
+        priority: int = None
+    ) -> tuple:
+        """Select a Worker and open (or acquire) a connection to it.
+
+        Tasks to be queued are diverted from Workers that advertised a full
+        queue (unless all the Workers are full). Every worker is tried once,
+        Workers ejected by their circuit breaker are skipped.
+
+        Calls with a routing key are sent to the Worker owning the key on a
+        consistent-hash ring (or the next one if is unavailable).
+
+        Workers on exclude are avoided unless are the only ones available.
+
+        High priority tasks are sent to WORKER_HIGH_LIST while any of them is
+        available.
+
+        Returns:
+            tuple of (worker, connection).
+        """
+        await self.update_workers()
+        skipped: set = set(exclude or ())
+        failed: set = set()
+        diverted = 0
+        prioritized = priority is not None and priority >= WORKER_HIGH_PRIORITY
+        while True:
+            usable = []
+            if prioritized:
+                usable = [
+                    worker for worker in self._high_workers
+                    if worker not in failed and self.breaker(worker).available
+                ]
+            if not usable:
+                usable = [
+                    worker for worker in self._workers
+                    if worker not in failed and self.breaker(worker).available
+                ]
+            if not usable:
+                if not self._workers:
+                    raise ConnectionAbortedError(
+                        "Error: There is no workers to work with."
+                    )
+                retry_in = min(
+                    self.breaker(worker).retry_in for worker in self._workers
+                )
+                raise ConnectionError(
+                    f"All Workers are unavailable, next retry in {retry_in:.1f} seconds"
+                )
+            worker = self.route(key, usable, skipped) if key is not None else None
+            if worker is None:
+                # also keyed calls sent to workers out of the ring (high priority)
+                worker = self._scheduler.select(usable, exclude=skipped)
             self.logger.debug(f':: WORKER SELECTED: {worker!r}')
             if not worker:
                 raise ConnectionAbortedError(
                     "Error: There is no workers to work with."
                 )
+            can_divert = queued is True and diverted < len(self._workers)
+            if can_divert and self.is_full(worker):
+                diverted += 1
+                skipped.add(worker)
+                continue
+            # half-open circuits allow a single trial request:
+            breaker = self.breaker(worker)
+            trial = breaker.state != CLOSED
+            if not breaker.allow():
+                # the trial was taken by another request:
+                failed.add(worker)
+                continue
             try:
-                task = asyncio.open_connection(
-                    *worker
-                )
-                reader, writer = await asyncio.wait_for(
-                    task, timeout=self.timeout
-                )
-                retries[worker] = 0
-                # check the signature between server and client:
-                return await self.validate_connection(
-                    reader, writer
-                )
+                if framed is True:
+                    conn = await self.get_pool(worker).acquire()
+                    self.connection_succeeded(worker)
+                    return worker, conn
+                reader, writer = await self.open_connection(worker)
+                self.connection_succeeded(worker)
+                if can_divert and self.is_full(worker):
+                    # queue is full, try the next worker before sending the Task:
+                    diverted += 1
+                    skipped.add(worker)
+                    writer.close()
+                    continue
+                return worker, [reader, writer]
             except DiscardedTask as exc:
                 self.logger.warning(
                     f'Task was discarded, {exc!s}, retrying'
                 )
                 raise
+            except SessionExpired:
+                # worker is alive, retry with a full handshake:
+                self.connection_succeeded(worker)
+                continue
             except asyncio.TimeoutError:
-                # removing this worker from the self workers
-                # TODO: removing bad worker:
                 warnings.warn(f"Timeout, skipping {worker!r}")
-                await asyncio.sleep(WAIT_TIME)
-            except ConnectionRefusedError as ex:
-                # connection returns timeout, retry with another worker
-                self._num_retries[worker] += 1
-                if self._num_retries[worker] > MAX_RETRY_COUNT:
-                    raise ConnectionError(
-                        f'Max number of retries reached: {worker!r}: {ex}'
-                    ) from ex
-                warnings.warn(
-                    f"Can't connect to {worker!r}. Retrying..."
-                )
-                await asyncio.sleep(WAIT_TIME)
-                continue
+                failed.add(worker)
+                self.connection_failed(worker)
             except OSError as err:
-                self._num_retries[worker] += 1
-                if self._num_retries[worker] > MAX_RETRY_COUNT:
-                    raise ConnectionError(
-                        f'Max number of retries reached for {worker!r}, error: {err!s}'
-                    ) from err
+                # also refused connections, retry with another worker
                 warnings.warn(
-                    f"Can't connect to {worker!r}. Retrying..."
+                    f"Can't connect to {worker!r}: {err!s}. Retrying..."
                 )
-                await asyncio.sleep(WAIT_TIME)
+                failed.add(worker)
+                self.connection_failed(worker)
                 continue
             except Exception as err:
                 warnings.warn(
                     f'Unexpected Error on Queue Client: {err!s}'
                 )
                 raise
+            finally:
+                if trial:
+                    # the trial ends also when nothing was recorded (cancelled):
+                    breaker.release()
 
     async def close(self, writer: asyncio.StreamWriter):
         if writer.can_write_eof():
@@ -240,15 +583,49 @@ class QClient:
         self.logger.debug('Closing Socket')
         writer.close()
 
-    async def get_worker_connection(self):
+    async def __aenter__(self) -> "QClient":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.disconnect()
+
+    async def disconnect(self):
+        """Closing all the persistent connections opened to Workers."""
+        if self._prober is not None:
+            self._prober.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._prober
+            self._prober = None
+        pools = list(self._pools.values())
+        self._pools = {}
+        for pool in pools:
+            await pool.close()
+
+    async def get_worker_connection(self, framed: bool = False, queued: bool = False):
+        _, conn = await self.acquire_worker(framed=framed, queued=queued)
+        return conn
+
+    async def acquire_worker(
+        self,
+        framed: bool = False,
+        queued: bool = False,
+        key: Union[str, bytes] = None,
+        exclude: set = None,
+        priority: int = None
+    ) -> tuple:
+        """Return the selected worker and a connection to it."""
         try:
-            reader, writer = await self.get_connection()
-            return reader, writer
+            return await self.select_worker(
+                framed=framed, queued=queued, key=key, exclude=exclude,
+                priority=priority
+            )
         except DiscardedTask:
             await asyncio.sleep(WAIT_TIME)
             ### ask again after wait for new connection:
-            reader, writer = await self.get_connection()
-            return reader, writer
+            return await self.select_worker(
+                framed=framed, queued=queued, key=key, exclude=exclude,
+                priority=priority
+            )
         except ConnectionError as ex:
             raise ConnectionError(
                 f"Unable to Connect to Queue Worker: {ex}"
@@ -277,6 +654,51 @@ class QClient:
             raise
         return serialized_task
 
+    async def request_worker(
+        self,
+        func: Union[bytes, Callable, Awaitable],
+        conn: FramedConnection,
+        kind: int = FRAME_TASK
+    ) -> tuple:
+        """Send a task over a persistent connection and wait for their reply.
+
+        Large buffers of the task (and of the reply) are sent out-of-band.
+
+        Functions (FuncWrapper) are sent by reference, the digest of the
+        pickled function replaces their code unless the Worker asks for it.
+
+        Returns:
+            tuple of (payload, out_of_band) of the reply.
+        """
+        by_reference = (
+            WORKER_FUNCTION_CACHE and kind == FRAME_TASK
+            and type(func) is FuncWrapper  # pylint: disable=C0123
+        )
+        try:
+            if by_reference:
+                kind = FRAME_CALL
+                digest, code = dump_function(func.func)
+                serialized_task = dumps_call(func, digest)
+            else:
+                serialized_task = dumps(func)
+        except Exception as err:
+            self.logger.error(
+                f'Error Serializing Task {func!r}: {err!s}'
+            )
+            raise
+        try:
+            flags, result = await conn.request(kind, serialized_task)
+            if by_reference and flags & FLAG_MISSING:
+                # first call of this function on the Worker:
+                flags, result = await conn.request(
+                    kind, dumps_call(func, digest, code)
+                )
+        except ConnectionError as ex:
+            raise QWException(
+                f"Error getting results from Worker: {ex}"
+            ) from ex
+        return result, bool(flags & FLAG_BUFFERS)
+
     async def get_result(
         self,
         reader: asyncio.StreamReader,
@@ -323,7 +745,16 @@ class QClient:
             func = partial(fn, *args, **kwargs)
         return func
 
-    async def run(self, fn: Any, *args, use_wrapper: bool = False, **kwargs):
+    async def run(
+        self,
+        fn: Any,
+        *args,
+        use_wrapper: bool = False,
+        routing_key: Union[str, bytes] = None,
+        hedge: bool = False,
+        priority: int = None,
+        **kwargs
+    ):
         """Runs a function in Queue Worker
 
         Run function in the Queue Worker, returns the result or raises exception.
@@ -332,6 +763,11 @@ class QClient:
             fn: Any Function, object or callable to be send to Worker.
             args: any non-keyword arguments
             use_wrapper: (bool) wraps function into a Function Wrapper.
+            routing_key: calls with the same key are sent to the same Worker
+                (e.g. the program of a TaskWrapper).
+            hedge: (bool) send the call to a second Worker if the first one is
+                slower than the recent latencies, only for idempotent functions.
+            priority: high priority calls are sent to WORKER_HIGH_LIST.
             kwargs: keyword arguments.
 
         Returns:
@@ -342,9 +778,38 @@ class QClient:
             ConnectionError: unable to connect to Worker.
             Exception: Any Unhandled error.
         """
-        reader, writer = await self.get_worker_connection()
+        if hedge is True:
+            return await self.hedged_run(
+                fn, args, kwargs, use_wrapper=use_wrapper,
+                routing_key=routing_key, priority=priority
+            )
+        return await self._run(
+            fn, args, kwargs, use_wrapper=use_wrapper,
+            routing_key=routing_key, priority=priority
+        )
 
-        host, *_ = writer.get_extra_info('sockname')
+    async def _run(
+        self,
+        fn: Any,
+        args: tuple,
+        kwargs: dict,
+        use_wrapper: bool = False,
+        routing_key: Union[str, bytes] = None,
+        workers: set = None,
+        priority: int = None
+    ):
+        if self._framed is True:
+            worker, conn = await self.acquire_worker(
+                framed=True, key=routing_key, exclude=workers, priority=priority
+            )
+            host = sock_host(conn.writer)
+        else:
+            worker, (reader, writer) = await self.acquire_worker(
+                key=routing_key, exclude=workers, priority=priority
+            )
+            host = sock_host(writer)
+        if workers is not None:
+            workers.add(worker)
         # wrapping the function into Task Wrapper
         self.logger.debug(
             f'Sending Object {fn!s} to Worker {host}'
@@ -357,26 +822,154 @@ class QClient:
             queued=False,
             **kwargs
         )
-        ## send data to worker:
-        await self.sendto_worker(func, writer)
-        # Then, got the result:
-        serialized_result = await self.get_result(reader, writer)
+        out_of_band = False
+        with self._stats.track(worker, key=call_key(fn)):
+            if self._framed is True:
+                serialized_result, out_of_band = await self.request_worker(func, conn)
+            else:
+                ## send data to worker:
+                await self.sendto_worker(func, writer)
+                # Then, got the result:
+                serialized_result = await self.get_result(reader, writer)
+        return self.parse_result(serialized_result, out_of_band)
+
+    async def hedged_run(
+        self,
+        fn: Any,
+        args: tuple,
+        kwargs: dict,
+        use_wrapper: bool = False,
+        routing_key: Union[str, bytes] = None,
+        priority: int = None
+    ):
+        """Run a function, asking a second Worker when the first is slow.
+
+        The second call is sent when no reply arrived within the percentile
+        WORKER_HEDGE_PERCENTILE of the recent latencies of the function, the
+        first reply wins and the other call is cancelled.
+        """
+        self._hedging['calls'] += 1
+        delay = self._stats.percentile(WORKER_HEDGE_PERCENTILE, call_key(fn))
+        workers: set = set()
+        first = asyncio.get_running_loop().create_task(
+            self._run(fn, args, kwargs, use_wrapper, routing_key, workers, priority)
+        )
+        if delay is None or len(self._workers) < 2:
+            return await first
         try:
-            task_result = cloudpickle.loads(serialized_result)
+            await asyncio.wait({first}, timeout=delay)
+        except asyncio.CancelledError:
+            first.cancel()
+            raise
+        if first.done():
+            return first.result()
+        self._hedging['hedged'] += 1
+        second = asyncio.get_running_loop().create_task(
+            self._run(fn, args, kwargs, use_wrapper, routing_key, workers, priority)
+        )
+        pending = {first, second}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        if task is second:
+                            self._hedging['won'] += 1
+                        return task.result()
+            # both calls failed:
+            return first.result()
+        finally:
+            for task in (first, second):
+                if not task.done():
+                    task.cancel()
+                    # the loser can fail while is cancelled:
+                    task.add_done_callback(
+                        lambda t: t.cancelled() or t.exception()
+                    )
+
+    def hedge_metrics(self) -> dict:
+        """Hedged calls, calls sent to a second Worker and won by it.
+
+        delays are the current hedge delay (seconds) by function.
+        """
+        calls = self._hedging['calls']
+        hedged = self._hedging['hedged']
+        return {
+            **self._hedging,
+            "hedge_rate": hedged / calls if calls else 0.0,
+            "win_rate": self._hedging['won'] / hedged if hedged else 0.0,
+            "delays": {
+                key: self._stats.percentile(WORKER_HEDGE_PERCENTILE, key)
+                for key in self._stats.samples
+            }
+        }
+
+    async def run_stream(self, fn: Any, *args, use_wrapper: bool = False, **kwargs):
+        """Runs a function in Queue Worker and iterates over their result.
+
+        Generators and lists returned by the function are sent by Worker in
+        chunks while are produced, so memory used by both sides is bounded by
+        the chunk size instead of the whole result.
+
+        Args:
+            fn: Any Function, object or callable to be send to Worker.
+            args: any non-keyword arguments
+            use_wrapper: (bool) wraps function into a Function Wrapper.
+            kwargs: keyword arguments.
+
+        Yields:
+            every item of the function result.
+
+        Raises:
+            ConnectionError: unable to connect to Worker.
+            Exception: exception raised by the function.
+        """
+        if self._framed is not True:
+            # streaming requires a persistent connection:
+            result = await self.run(fn, *args, use_wrapper=use_wrapper, **kwargs)
+            if (error := result_error(result)) is not None:
+                raise error
+            for item in (result if isinstance(result, list) else [result]):
+                yield item
+            return
+        worker, conn = await self.acquire_worker(framed=True)
+        host = sock_host(conn.writer)
+        func = self.get_wrapped_function(
+            fn,
+            host,
+            *args,
+            use_wrapper=use_wrapper,
+            queued=False,
+            **kwargs
+        )
+        try:
+            serialized_task = dumps(func)
+        except Exception as err:
+            self.logger.error(
+                f'Error Serializing Task {func!r}: {err!s}'
+            )
+            raise
+        with self._stats.track(worker, timed=False):
+            async for flags, payload in conn.stream(FRAME_STREAM, serialized_task):
+                if not payload:
+                    continue
+                chunk = loads(payload, bool(flags & FLAG_BUFFERS))
+                if (error := result_error(chunk)) is not None:
+                    raise error
+                if flags & FLAG_ERROR:
+                    raise QWException(f"Error streaming result: {chunk!r}")
+                for item in chunk:
+                    yield item
+
+    def parse_result(self, serialized_result: bytes, out_of_band: bool = False) -> Any:
+        """Unpickle and decode the result returned by a Worker."""
+        try:
+            task_result = loads(serialized_result, out_of_band)
             self.logger.debug(
                 f'Data Received: {task_result!r}'
             )
-            try:
-                if isinstance(task_result, str):
-                    result = jsonpickle.decode(task_result)
-                else:
-                    result = task_result
-            except (TypeError, ValueError) as e:
-                logging.error(e)
-                result = task_result
-            except Exception as e:
-                logging.error(e)
-            task_result = result
         except (ValueError, TypeError) as ex:
             raise ParserError(
                 f"Error Parsing serialized results: {ex}"
@@ -387,6 +980,15 @@ class QClient:
         except Exception as err:  # pylint: disable=W0703
             self.logger.exception(f'Error receiving data from Worker Server: {err!s}')
             task_result = None
+        return self.decode_result(task_result)
+
+    def decode_result(self, task_result: Any) -> Any:
+        """Decode an (already unpickled) result returned by a Worker."""
+        try:
+            if isinstance(task_result, str):
+                task_result = jsonpickle.decode(task_result)
+        except Exception as e:  # pylint: disable=W0703
+            logging.error(e)
         if isinstance(task_result, BaseException):
             # raise task_result
             return task_result
@@ -417,7 +1019,15 @@ class QClient:
         else:
             return task_result
 
-    async def queue(self, fn: Any, *args, use_wrapper: bool = True, **kwargs):
+    async def queue(
+        self,
+        fn: Any,
+        *args,
+        use_wrapper: bool = True,
+        routing_key: Union[str, bytes] = None,
+        priority: int = None,
+        **kwargs
+    ):
         """Send a function to a Queue Worker and return.
 
         Send & Forget functionality to send a task to Queue Worker.
@@ -425,6 +1035,10 @@ class QClient:
         Args:
             fn: Any Function, object or callable to be send to Worker.
             args: any non-keyword arguments
+            routing_key: tasks with the same key are queued on the same Worker
+                (e.g. the program of a TaskWrapper).
+            priority: priority of the task on the Worker Queue (wrappers only),
+                high priority tasks are sent to WORKER_HIGH_LIST.
             kwargs: keyword arguments.
 
         Returns:
@@ -436,11 +1050,19 @@ class QClient:
             Exception: Any Unhandled error.
         """
         # TODO: Use Task id to return (later) the result of Task.
-        reader, writer = await self.get_worker_connection()
+        if self._framed is True:
+            worker, conn = await self.acquire_worker(
+                framed=True, queued=True, key=routing_key, priority=priority
+            )
+            host = sock_host(conn.writer)
+        else:
+            worker, (reader, writer) = await self.acquire_worker(
+                queued=True, key=routing_key, priority=priority
+            )
+            host = sock_host(writer)
         self.logger.debug(
             f'Sending function {fn!s} to Worker'
         )
-        host, *_ = writer.get_extra_info('sockname')
         # serializing
         func = self.get_wrapped_function(
             fn,
@@ -450,22 +1072,34 @@ class QClient:
             queued=True,
             **kwargs
         )
+        if priority is not None and isinstance(func, QueueWrapper):
+            func.priority = priority
+        out_of_band = False
         try:
-            ## send data to worker:
-            await self.sendto_worker(func, writer=writer)
-            # asks server if task was queued:
-            try:
-                while True:
-                    serialized_result = await reader.read(-1)
-                    if reader.at_eof():
-                        break
-            except Exception as err:
-                raise QWException(
-                    str(err)
-                ) from err
-            finally:
-                await self.close(writer)
-            received = cloudpickle.loads(serialized_result)
+            with self._stats.track(worker):
+                if self._framed is True:
+                    serialized_result, out_of_band = await self.request_worker(
+                        func, conn
+                    )
+                else:
+                    ## send data to worker:
+                    await self.sendto_worker(func, writer=writer)
+                    # asks server if task was queued:
+                    try:
+                        while True:
+                            serialized_result = await reader.read(-1)
+                            if reader.at_eof():
+                                break
+                    except Exception as err:
+                        raise QWException(
+                            str(err)
+                        ) from err
+                    finally:
+                        await self.close(writer)
+            received = loads(serialized_result, out_of_band)
+            if isinstance(received, asyncio.QueueFull):
+                # worker is full, divert the next tasks until it advertises again:
+                self.set_capacity(worker, WorkerCapacity(0, 0, 0, 0))
             # we dont need the result, return true
             if isinstance(received, (QWException, asyncio.QueueFull)):
                 raise received.__class__(str(received))
@@ -481,7 +1115,294 @@ class QClient:
             )
             raise
 
-    async def publish(self, fn: Any, *args, use_wrapper: bool = True, **kwargs):
+    def _unpack_call(self, call: Any) -> tuple:
+        """Convert a call of a batch into a (fn, args, kwargs) tuple."""
+        if isinstance(call, tuple):
+            fn, *rest = call
+            args = rest[0] if len(rest) > 0 else ()
+            kwargs = rest[1] if len(rest) > 1 else {}
+            return fn, tuple(args), dict(kwargs)
+        return call, (), {}
+
+    async def _send_batch(
+        self,
+        batch: list,
+        use_wrapper: bool,
+        queued: bool
+    ) -> list:
+        worker, conn = await self.acquire_worker(framed=True)
+        host = sock_host(conn.writer)
+        funcs = [
+            self.get_wrapped_function(
+                fn,
+                host,
+                *args,
+                use_wrapper=use_wrapper,
+                queued=queued,
+                **kwargs
+            ) for fn, args, kwargs in batch
+        ]
+        self.logger.debug(
+            f'Sending Batch of {len(funcs)} calls to Worker {conn.worker!r}'
+        )
+        with self._stats.track(worker, timed=False):
+            serialized_result, out_of_band = await self.request_worker(
+                funcs, conn, kind=FRAME_BATCH
+            )
+        try:
+            received = loads(serialized_result, out_of_band)
+        except (EOFError, ValueError, TypeError, pickle.UnpicklingError) as ex:
+            raise ParserError(
+                f"Error Parsing serialized results: {ex}"
+            ) from ex
+        if isinstance(received, BaseException):
+            # whole batch was refused by Worker:
+            return [received] * len(funcs)
+        results = []
+        for func, item in zip(funcs, received):
+            if isinstance(item, BaseException):
+                results.append(item)
+            elif queued is True:
+                results.append({
+                    "status": "Queued",
+                    "task": f"{func!r}",
+                    "message": item
+                })
+            else:
+                try:
+                    results.append(self.decode_result(item))
+                except Exception as err:  # pylint: disable=W0703
+                    results.append(err)
+        return results
+
+    async def _send_many(
+        self,
+        calls: Iterable,
+        use_wrapper: bool,
+        queued: bool,
+        batch_size: int
+    ) -> list:
+        calls = [self._unpack_call(call) for call in calls]
+        if self._framed is not True:
+            # batches requires a persistent connection, sending one by one:
+            method = self.queue if queued else self.run
+            return await asyncio.gather(
+                *[
+                    method(fn, *args, use_wrapper=use_wrapper, **kwargs)
+                    for fn, args, kwargs in calls
+                ],
+                return_exceptions=True
+            )
+        batch_size = max(batch_size, 1)
+        batches = [
+            calls[i:i + batch_size] for i in range(0, len(calls), batch_size)
+        ]
+        # every batch is sent to the Worker selected by the scheduler:
+        results = await asyncio.gather(
+            *[self._send_batch(batch, use_wrapper, queued) for batch in batches],
+            return_exceptions=True
+        )
+        # a failed batch doesn't discard the results of the others:
+        return list(itertools.chain.from_iterable(
+            [result] * len(batch) if isinstance(result, BaseException) else result
+            for batch, result in zip(batches, results)
+        ))
+
+    async def run_many(
+        self,
+        calls: Iterable,
+        use_wrapper: bool = False,
+        batch_size: int = WORKER_BATCH_SIZE
+    ) -> list:
+        """Runs a Batch of functions in Queue Workers.
+
+        Calls are splitted in batches of ``batch_size``, every batch is sent
+        to a Worker in a single payload.
+
+        Args:
+            calls: iterable of callables or tuples of (fn, args[, kwargs]).
+            use_wrapper: (bool) wraps functions into a Function Wrapper.
+            batch_size: max number of calls sent to a Worker at once.
+
+        Returns:
+            list of results (or exceptions), in the same order of calls. The
+            calls of a batch that couldn't be sent (e.g. ConnectionError) or
+            parsed (ParserError) get the exception of their batch.
+        """
+        return await self._send_many(
+            calls, use_wrapper=use_wrapper, queued=False, batch_size=batch_size
+        )
+
+    async def queue_many(
+        self,
+        calls: Iterable,
+        use_wrapper: bool = True,
+        batch_size: int = WORKER_BATCH_SIZE
+    ) -> list:
+        """Send a Batch of functions to Queue Workers and return.
+
+        Every batch is queued by the Worker in a single step.
+
+        Args:
+            calls: iterable of callables or tuples of (fn, args[, kwargs]).
+            use_wrapper: (bool) wraps functions into a Function Wrapper.
+            batch_size: max number of calls sent to a Worker at once.
+
+        Returns:
+            list of queue acknowledgements (or exceptions, like QueueFull),
+            in the same order of calls. The calls of a batch that couldn't
+            be sent get the exception of their batch, the other batches
+            are still queued.
+        """
+        return await self._send_many(
+            calls, use_wrapper=use_wrapper, queued=True, batch_size=batch_size
+        )
+
+    async def map(
+        self,
+        fn: Any,
+        iterable: Union[Iterable, AsyncIterable],
+        concurrency: int = WORKER_MAP_CONCURRENCY,
+        per_worker: int = WORKER_MAP_PER_WORKER,
+        retries: int = WORKER_MAP_RETRIES,
+        use_wrapper: bool = False
+    ):
+        """Runs a function over every item of an iterable in Queue Workers.
+
+        Items are consumed lazily, at most ``concurrency`` calls are in flight
+        (and ``per_worker`` on every Worker), calls failed by a connection
+        error are retried on other Workers.
+
+        Args:
+            fn: Any Function, object or callable to be send to Worker.
+            iterable: items (sync or async iterable), sent as argument of fn.
+            concurrency: max number of calls in flight.
+            per_worker: max number of calls in flight on every Worker.
+            retries: times a call is sent again to another Worker.
+            use_wrapper: (bool) wraps function into a Function Wrapper.
+
+        Yields:
+            results (or exceptions), in the same order of the items.
+        """
+        results: dict = {}
+        expected = 0
+        async for idx, result in self.as_completed(
+            fn,
+            iterable,
+            concurrency=concurrency,
+            per_worker=per_worker,
+            retries=retries,
+            use_wrapper=use_wrapper
+        ):
+            results[idx] = result
+            while expected in results:
+                yield results.pop(expected)
+                expected += 1
+
+    async def as_completed(
+        self,
+        fn: Any,
+        iterable: Union[Iterable, AsyncIterable],
+        concurrency: int = WORKER_MAP_CONCURRENCY,
+        per_worker: int = WORKER_MAP_PER_WORKER,
+        retries: int = WORKER_MAP_RETRIES,
+        use_wrapper: bool = False
+    ):
+        """Like map, but results are yielded as calls are completed.
+
+        Yields:
+            tuple of (index of the item, result or exception).
+        """
+        await self.update_workers()
+        items = self._enumerate(iterable)
+        pending: set = set()
+        exhausted = False
+        try:
+            while True:
+                # ejected Workers don't count, their calls go to the others:
+                limit = self.map_limit(concurrency, per_worker)
+                while not exhausted and len(pending) < limit:
+                    try:
+                        idx, item = await items.__anext__()
+                    except StopAsyncIteration:
+                        exhausted = True
+                        break
+                    pending.add(
+                        asyncio.get_running_loop().create_task(
+                            self._map_call(
+                                idx, fn, item, per_worker, retries, use_wrapper
+                            )
+                        )
+                    )
+                if not pending:
+                    break
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+            await items.aclose()
+
+    def map_limit(self, concurrency: int, per_worker: int) -> int:
+        """Max calls in flight of a fan-out, by the Workers available now."""
+        available = sum(
+            1 for worker in self._workers if self.breaker(worker).available
+        )
+        return max(1, min(concurrency, per_worker * available))
+
+    @staticmethod
+    async def _enumerate(iterable: Union[Iterable, AsyncIterable]):
+        idx = 0
+        if isinstance(iterable, AsyncIterable):
+            async for item in iterable:
+                yield idx, item
+                idx += 1
+        else:
+            for item in iterable:
+                yield idx, item
+                idx += 1
+
+    async def _map_call(
+        self,
+        idx: int,
+        fn: Any,
+        item: Any,
+        per_worker: int,
+        retries: int,
+        use_wrapper: bool
+    ) -> tuple:
+        tried: set = set()
+        for attempt in range(retries + 1):
+            # avoid the workers already tried and the busy ones:
+            busy = {
+                worker for worker in self._workers
+                if self._stats.in_flight[worker] >= per_worker
+            }
+            selected = tried | busy
+            before = set(selected)
+            try:
+                return idx, await self._run(
+                    fn, (item,), {}, use_wrapper=use_wrapper, workers=selected
+                )
+            except (QWException, OSError, asyncio.TimeoutError) as exc:
+                tried |= selected - before
+                if attempt == retries:
+                    return idx, exc
+                self.logger.warning(
+                    f'Call {idx} failed: {exc!s}, retrying on another Worker'
+                )
+
+    async def publish(
+        self,
+        fn: Any,
+        *args,
+        use_wrapper: bool = True,
+        priority: int = None,
+        **kwargs
+    ):
         """Publish a function into a Pub/Sub Channel.
 
         Send & Forget functionality to send a task to Queue Worker using Pub/Sub.
@@ -489,6 +1410,7 @@ class QClient:
         Args:
             fn: Any Function, object or callable to be send to Worker.
             args: any non-keyword arguments
+            priority: priority of the task on the Worker Queue (wrappers only).
             kwargs: keyword arguments.
 
         Returns:
@@ -516,6 +1438,8 @@ class QClient:
             queued=True,
             **kwargs
         )
+        if priority is not None and isinstance(func, QueueWrapper):
+            func.priority = priority
         if use_wrapper is True:
             uid = func.id
         else:
@@ -557,9 +1481,54 @@ class QClient:
                     f"Failed to disconnect Redis: {exc}"
                 )
 
+    async def probe(self) -> dict:
+        """Binary status of the next Worker, cheaper than health.
+
+        Returns:
+            dict with the state, capacity and load of the Worker.
+        """
+        if self._framed is True:
+            worker, conn = await self.acquire_worker(framed=True)
+            try:
+                with self._stats.track(worker, timed=False):
+                    _, reply = await conn.request(FRAME_PROBE)
+            except ConnectionError as err:
+                raise QWException(
+                    str(err)
+                ) from err
+            return parse_probe(reply)
+        workers = await self.update_workers()
+        return await self.probe_worker(self._scheduler.select(workers))
+
+    async def probe_worker(self, worker: tuple) -> dict:
+        """Binary status of a Worker (probes don't need authentication)."""
+        reader, writer = await self._connect(worker)
+        try:
+            writer.write(b'probe\n')
+            await writer.drain()
+            reply = await asyncio.wait_for(
+                reader.readexactly(PROBE_FORMAT.size), timeout=self.timeout
+            )
+        except (asyncio.IncompleteReadError, ConnectionError) as err:
+            raise QWException(
+                f"Error probing Worker {worker!r}: {err}"
+            ) from err
+        finally:
+            await self.close(writer)
+        return parse_probe(reply)
+
     async def health(self):
         task = 'health'
         serialized_task = task.encode('utf-8')
+        if self._framed is True:
+            conn = await self.get_worker_connection(framed=True)
+            try:
+                _, serialized_result = await conn.request(FRAME_HEALTH)
+            except ConnectionError as err:
+                raise QWException(
+                    str(err)
+                ) from err
+            return orjson.loads(serialized_result)
         # getting writer, reader
         reader, writer = await self.get_worker_connection()
         # send data to worker:
@@ -587,3 +1556,126 @@ class QClient:
             # logging.exception(f'Error receiving data from Worker Server: {err!s}')
             task_result = orjson.loads(serialized_result)
         return task_result
+
+
+class SyncQClient:
+    """Blocking Queue Task Worker Client.
+
+    For non-async callers (threads, scripts): a background thread runs an
+    event loop with a QClient, all the calls are sent through it sharing
+    their pool of persistent connections.
+
+    Args:
+        worker_list: list of (host, port) of the Workers.
+        timeout: timeout (seconds) connecting to Workers.
+        framed: (bool) use persistent (framed) connections, by default
+            WORKER_FRAMED_PROTOCOL (like QClient).
+        scheduler: strategy used to select the worker of every call.
+    """
+    def __init__(
+        self,
+        worker_list: list = None,
+        timeout: int = 5,
+        framed: bool = None,
+        scheduler: Union[str, type] = WORKER_SCHEDULER
+    ):
+        if framed is None:
+            framed = WORKER_FRAMED_PROTOCOL
+        self.logger = logging.getLogger('QW.SyncClient')
+        self._client: QClient = None
+        self._error: BaseException = None
+        self._closed: bool = False
+        self._loop = asyncio.new_event_loop()
+        self._started = threading.Event()
+        self._thread = threading.Thread(
+            target=self._serve,
+            args=(worker_list, timeout, framed, scheduler),
+            name='QW.SyncClient',
+            daemon=True
+        )
+        self._thread.start()
+        self._started.wait()
+        if self._error is not None:
+            raise self._error
+
+    def __repr__(self) -> str:
+        return f'<SyncQClient {self._client!r}>'
+
+    def __enter__(self) -> "SyncQClient":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def client(self) -> QClient:
+        return self._client
+
+    def _serve(self, *args):
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._client = QClient(*args)
+        except Exception as exc:  # pylint: disable=W0703
+            self._error = exc
+            self._started.set()
+            self._loop.close()
+            return
+        self._started.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            self._loop.close()
+
+    def submit(self, coro: Awaitable) -> Future:
+        """Run a coroutine on the loop of the client."""
+        if self._closed:
+            coro.close()
+            raise RuntimeError(
+                "SyncQClient is closed."
+            )
+        if threading.current_thread() is self._thread:
+            coro.close()
+            # waiting for the result here will block the loop forever:
+            raise RuntimeError(
+                "SyncQClient can't be used from their own event loop."
+            )
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def run_future(self, fn: Any, *args, **kwargs) -> Future:
+        """QClient.run, returns a concurrent.futures.Future."""
+        return self.submit(self._client.run(fn, *args, **kwargs))
+
+    def queue_future(self, fn: Any, *args, **kwargs) -> Future:
+        """QClient.queue, returns a concurrent.futures.Future."""
+        return self.submit(self._client.queue(fn, *args, **kwargs))
+
+    def publish_future(self, fn: Any, *args, **kwargs) -> Future:
+        """QClient.publish, returns a concurrent.futures.Future."""
+        return self.submit(self._client.publish(fn, *args, **kwargs))
+
+    def run(self, fn: Any, *args, **kwargs) -> Any:
+        """Runs a function in Queue Worker, waiting for their result."""
+        return self.run_future(fn, *args, **kwargs).result()
+
+    def queue(self, fn: Any, *args, **kwargs) -> Any:
+        """Send a function to a Queue Worker, waiting until was queued."""
+        return self.queue_future(fn, *args, **kwargs).result()
+
+    def publish(self, fn: Any, *args, **kwargs) -> Any:
+        """Publish a function into a Pub/Sub Channel."""
+        return self.publish_future(fn, *args, **kwargs).result()
+
+    def close(self, timeout: float = None):
+        """Close the connections to Workers and stop the loop."""
+        if self._closed:
+            return
+        try:
+            self.submit(self._client.disconnect()).result(timeout)
+        except Exception as exc:  # pylint: disable=W0703
+            self.logger.warning(
+                f"Error closing connections to Workers: {exc}"
+            )
+        finally:
+            self._closed = True
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout)
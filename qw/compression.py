@@ -0,0 +1,149 @@
+"""QueueWorker Payload Compression.
+
+Codecs negotiated between QClient and QWorker for framed connections,
+zstd and lz4 are used when installed, zlib is always available.
+"""
+import time
+import zlib
+from typing import Optional
+from navconfig.logging import logging
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+
+class Codec:
+    """Compression codec.
+
+    ``decompress(data, max_size)`` stops after max_size + 1 bytes of output
+    (0 means no limit), so a small payload can't inflate without bounds.
+    """
+    def __init__(self, name: str, compress, decompress):
+        self.name = name
+        self.compress = compress
+        self.decompress = decompress
+
+    def __repr__(self) -> str:
+        return f'<Codec {self.name}>'
+
+
+def _zstd_decompress(data: bytes, max_size: int = 0) -> bytes:
+    with zstandard.ZstdDecompressor().stream_reader(data) as reader:
+        return reader.read(max_size + 1 if max_size else -1)
+
+
+def _lz4_decompress(data: bytes, max_size: int = 0) -> bytes:
+    return lz4.frame.LZ4FrameDecompressor().decompress(
+        data, max_length=max_size + 1 if max_size else -1
+    )
+
+
+def _zlib_decompress(data: bytes, max_size: int = 0) -> bytes:
+    return zlib.decompressobj().decompress(data, max_size + 1 if max_size else 0)
+
+
+def _available() -> dict:
+    codecs = {}
+    if zstandard is not None:
+        codecs['zstd'] = Codec(
+            'zstd',
+            zstandard.ZstdCompressor(level=3).compress,
+            _zstd_decompress
+        )
+    else:
+        logging.debug(
+            "zstandard is not installed, zstd compression is not available."
+        )
+    if lz4 is not None:
+        codecs['lz4'] = Codec('lz4', lz4.frame.compress, _lz4_decompress)
+    codecs['zlib'] = Codec(
+        'zlib',
+        lambda data: zlib.compress(data, 1),
+        _zlib_decompress
+    )
+    return codecs
+
+
+## available codecs, by order of preference.
+CODECS: dict = _available()
+
+
+def get_codec(name: str) -> Optional[Codec]:
+    if isinstance(name, (bytes, bytearray)):
+        name = name.decode('utf-8')
+    return CODECS.get(name)
+
+
+def negotiate(offered: list, enabled: list) -> Optional[Codec]:
+    """Return the first codec offered by client that is enabled here."""
+    for name in offered:
+        if name in enabled and (codec := get_codec(name)):
+            return codec
+    return None
+
+
+class CompressionStats:
+    """Compression ratio and CPU time spent by a Worker (or Client)."""
+    def __init__(self):
+        self.raw_bytes: int = 0
+        self.compressed_bytes: int = 0
+        self.compressed: int = 0
+        self.decompressed: int = 0
+        self.compress_time: float = 0.0
+        self.decompress_time: float = 0.0
+
+    def compress(self, codec: Codec, data: bytes, threshold: int) -> tuple:
+        """Compress data if is bigger than threshold.
+
+        Returns:
+            tuple of (data, compressed), data is sent raw when compression
+            doesn't reduce their size.
+        """
+        if codec is None or len(data) < threshold:
+            return data, False
+        started = time.thread_time()
+        result = codec.compress(data)
+        self.compress_time += time.thread_time() - started
+        if len(result) >= len(data):
+            return data, False
+        self.compressed += 1
+        self.raw_bytes += len(data)
+        self.compressed_bytes += len(result)
+        return result, True
+
+    def decompress(self, codec: Codec, data: bytes, max_size: int = 0) -> bytes:
+        """Decompress data.
+
+        Raises:
+            ValueError: decompressed data are bigger than max_size (0 means
+                no limit).
+        """
+        started = time.thread_time()
+        result = codec.decompress(data, max_size)
+        self.decompress_time += time.thread_time() - started
+        if max_size and len(result) > max_size:
+            raise ValueError(
+                f"Decompressed payload exceeds the max payload size ({max_size} bytes)"
+            )
+        self.decompressed += 1
+        return result
+
+    def to_dict(self) -> dict:
+        ratio = None
+        if self.compressed_bytes:
+            ratio = round(self.raw_bytes / self.compressed_bytes, 2)
+        return {
+            "codecs": list(CODECS),
+            "compressed": self.compressed,
+            "decompressed": self.decompressed,
+            "raw_bytes": self.raw_bytes,
+            "compressed_bytes": self.compressed_bytes,
+            "ratio": ratio,
+            "compress_cpu_time": round(self.compress_time, 6),
+            "decompress_cpu_time": round(self.decompress_time, 6)
+        }
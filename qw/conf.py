@@ -1,9 +1,12 @@
+import os
 from navconfig import config
 
 def get_worker_list(workers: list):
     """Convert a list of workers in a tuple of worker:port for Scheduler."""
     wl = []
     for worker in workers:
+        if not worker:
+            continue
         w, p = worker.split(':')
         wl.append((w, p))
     return wl
@@ -13,14 +16,142 @@ QW_MAX_WORKERS = config.getint('QW_MAX_WORKERS', fallback=10)
 MAX_WORKERS = config.getint('MAX_WORKERS', fallback=10)
 WORKER_DEFAULT_HOST = config.get('WORKER_DEFAULT_HOST', fallback='0.0.0.0')
 WORKER_DEFAULT_PORT = config.getint('WORKER_DEFAULT_PORT', fallback=8888)
+## Unix Socket listener (per worker process) for clients on the same host,
+## in a private directory (mode 0700) so only clients of the same user connect
+WORKER_UNIX_SOCKET = config.getboolean('WORKER_UNIX_SOCKET', fallback=True)
+WORKER_UNIX_SOCKET_DIR = config.get(
+    'WORKER_UNIX_SOCKET_DIR',
+    fallback=os.path.join(
+        os.environ.get('XDG_RUNTIME_DIR') or '/tmp', f'qw-{os.getuid()}'
+    )
+)
 WORKER_DEFAULT_QTY = config.getint('WORKER_DEFAULT_QTY', fallback=4)
 WORKER_QUEUE_SIZE = config.getint('WORKER_QUEUE_SIZE', fallback=4)
+## Consumers of the Worker Queue (tasks running at once), adjusted between
+## min and max every interval (seconds) by queue wait time, loop lag and CPU
+WORKER_CONSUMERS_MIN = config.getint(
+    'WORKER_CONSUMERS_MIN', fallback=max(WORKER_QUEUE_SIZE - 1, 1)
+)
+WORKER_CONSUMERS_MAX = config.getint('WORKER_CONSUMERS_MAX', fallback=32)
+WORKER_CONSUMERS_INTERVAL = float(config.get('WORKER_CONSUMERS_INTERVAL', fallback=1.0))
+## grow when Tasks wait more than this (seconds) in the Queue
+WORKER_CONSUMERS_MAX_WAIT = float(config.get('WORKER_CONSUMERS_MAX_WAIT', fallback=0.5))
+## shrink when the event loop lags more than this (seconds)
+WORKER_CONSUMERS_MAX_LAG = float(config.get('WORKER_CONSUMERS_MAX_LAG', fallback=0.1))
+## shrink when the process uses more CPU than this (fraction of a core)
+WORKER_CONSUMERS_MAX_CPU = float(config.get('WORKER_CONSUMERS_MAX_CPU', fallback=0.9))
+## Tasks arriving on a full Queue are spilled to disk (SQLite) and drained
+## back into the Queue as it frees up, the directory must be private (0700)
+WORKER_SPILL = config.getboolean('WORKER_SPILL', fallback=False)
+WORKER_SPILL_DIR = config.get(
+    'WORKER_SPILL_DIR',
+    fallback=os.path.join(
+        os.environ.get('XDG_STATE_HOME') or os.path.expanduser('~/.local/state'),
+        'qw'
+    )
+)
+WORKER_SPILL_MAX_TASKS = config.getint('WORKER_SPILL_MAX_TASKS', fallback=100000)
+## max number of Tasks moved from disk to memory at once
+WORKER_SPILL_BATCH = config.getint('WORKER_SPILL_BATCH', fallback=100)
+## Priority lanes of the Worker Queue, dequeued by policy: strict or weighted
+WORKER_PRIORITY_LANES = config.getint('WORKER_PRIORITY_LANES', fallback=3)
+WORKER_PRIORITY_POLICY = config.get('WORKER_PRIORITY_POLICY', fallback='strict')
+## weights of the lanes (lowest priority first), by default 1, 2, 4...
+WORKER_PRIORITY_WEIGHTS = [
+    int(w) for w in config.getlist('WORKER_PRIORITY_WEIGHTS', fallback=[])
+]
+## seconds a Task can wait before is served ahead of higher lanes (0: never)
+WORKER_PRIORITY_MAX_WAIT = config.getint('WORKER_PRIORITY_MAX_WAIT', fallback=60)
+## Tasks with this priority (or higher) are sent to WORKER_HIGH_LIST
+WORKER_HIGH_PRIORITY = config.getint('WORKER_HIGH_PRIORITY', fallback=1)
 RESOURCE_THRESHOLD = config.getint('RESOURCE_THRESHOLD', fallback=90)
 CHECK_RESOURCE_USAGE = config.getboolean('CHECK_RESOURCE_USAGE', fallback=True)
 WORKER_RETRY_INTERVAL = config.getint('WORKER_RETRY_INTERVAL', fallback=10)
 WORKER_RETRY_COUNT = config.getint('WORKER_RETRY_COUNT', fallback=2)
+## Retries are delayed with exponential backoff (from WORKER_RETRY_INTERVAL)
+WORKER_RETRY_MAX_INTERVAL = config.getint('WORKER_RETRY_MAX_INTERVAL', fallback=300)
+## random variation of the retry delay (0.2: +/- 20%)
+WORKER_RETRY_JITTER = float(config.get('WORKER_RETRY_JITTER', fallback=0.2))
 WORKER_CONCURRENCY_NUMBER = config.getint('WORKER_CONCURRENCY_NUMBER', fallback=8)
 WORKER_TASK_TIMEOUT = config.getint('WORKER_TASK_TIMEOUT', fallback=30)
+## Max size (in bytes) of a Task received by a Worker
+WORKER_MAX_PAYLOAD_SIZE = config.getint(
+    'WORKER_MAX_PAYLOAD_SIZE', fallback=268435456
+)
+
+## Persistent (framed) connections between Client and Workers
+WORKER_FRAMED_PROTOCOL = config.getboolean('WORKER_FRAMED_PROTOCOL', fallback=True)
+
+## Server implementation: "streams" (StreamReader/Writer) or "protocol" (QueueProtocol)
+WORKER_SERVER_PROTOCOL = config.get('WORKER_SERVER_PROTOCOL', fallback='streams')
+## QueueProtocol stops reading a connection with this number of requests in flight
+WORKER_PROTOCOL_MAX_REQUESTS = config.getint(
+    'WORKER_PROTOCOL_MAX_REQUESTS', fallback=256
+)
+
+## Client Connection Pool (per worker)
+WORKER_POOL_MIN_SIZE = config.getint('WORKER_POOL_MIN_SIZE', fallback=1)
+WORKER_POOL_MAX_SIZE = config.getint('WORKER_POOL_MAX_SIZE', fallback=4)
+WORKER_POOL_MAX_STREAMS = config.getint('WORKER_POOL_MAX_STREAMS', fallback=32)
+WORKER_POOL_IDLE_TIMEOUT = config.getint('WORKER_POOL_IDLE_TIMEOUT', fallback=60)
+WORKER_POOL_HEALTH_INTERVAL = config.getint('WORKER_POOL_HEALTH_INTERVAL', fallback=15)
+
+## Payload Compression on framed connections (codecs by order of preference)
+WORKER_COMPRESSION = config.getlist(
+    'WORKER_COMPRESSION', fallback=['zstd', 'lz4', 'zlib']
+)
+## payloads smaller than this size (in bytes) are sent raw
+WORKER_COMPRESSION_THRESHOLD = config.getint(
+    'WORKER_COMPRESSION_THRESHOLD', fallback=8192
+)
+
+## Streamed results: items per chunk and chunks sent before client consumes them
+WORKER_STREAM_CHUNK_SIZE = config.getint('WORKER_STREAM_CHUNK_SIZE', fallback=100)
+WORKER_STREAM_WINDOW = config.getint('WORKER_STREAM_WINDOW', fallback=4)
+
+## Buffers bigger than this size (in bytes) are serialized out-of-band
+WORKER_OOB_MIN_SIZE = config.getint('WORKER_OOB_MIN_SIZE', fallback=65536)
+
+## Functions are sent by digest, Workers keep the last N deserialized functions
+WORKER_FUNCTION_CACHE = config.getboolean('WORKER_FUNCTION_CACHE', fallback=True)
+WORKER_FUNCTION_CACHE_SIZE = config.getint(
+    'WORKER_FUNCTION_CACHE_SIZE', fallback=1024
+)
+
+## Seconds the capacity advertised by a Worker is used to divert queued Tasks
+WORKER_CAPACITY_TTL = config.getint('WORKER_CAPACITY_TTL', fallback=2)
+
+## Circuit Breaker: consecutive failures that eject a Worker, backoff (seconds)
+WORKER_BREAKER_THRESHOLD = config.getint('WORKER_BREAKER_THRESHOLD', fallback=3)
+WORKER_BREAKER_BACKOFF = float(config.get('WORKER_BREAKER_BACKOFF', fallback=1.0))
+WORKER_BREAKER_MAX_BACKOFF = float(config.get('WORKER_BREAKER_MAX_BACKOFF', fallback=60.0))
+## seconds between health probes of the ejected Workers
+WORKER_BREAKER_PROBE_INTERVAL = float(config.get('WORKER_BREAKER_PROBE_INTERVAL', fallback=5.0))
+
+## Client Scheduling strategy: round_robin, least_outstanding, p2c or ewma
+WORKER_SCHEDULER = config.get('WORKER_SCHEDULER', fallback='round_robin')
+## weight of the last latency on the moving average (ewma)
+WORKER_SCHEDULER_EWMA_DECAY = float(config.get('WORKER_SCHEDULER_EWMA_DECAY', fallback=0.3))
+## Seconds the load advertised by a Worker is used by the Scheduler
+WORKER_SCHEDULER_HEALTH_TTL = config.getint(
+    'WORKER_SCHEDULER_HEALTH_TTL', fallback=30
+)
+## Hedged calls: a second Worker is asked when no reply arrives within
+## this percentile of the recent latencies of the function (once enough
+## latencies are known), kept for the last WORKER_HEDGE_FUNCTIONS functions
+WORKER_HEDGE_PERCENTILE = float(config.get('WORKER_HEDGE_PERCENTILE', fallback=95))
+WORKER_HEDGE_MIN_SAMPLES = config.getint('WORKER_HEDGE_MIN_SAMPLES', fallback=20)
+WORKER_HEDGE_SAMPLES = config.getint('WORKER_HEDGE_SAMPLES', fallback=1000)
+WORKER_HEDGE_FUNCTIONS = config.getint('WORKER_HEDGE_FUNCTIONS', fallback=256)
+## Virtual nodes of every Worker on the hash ring (calls with a routing key)
+WORKER_HASH_REPLICAS = config.getint('WORKER_HASH_REPLICAS', fallback=100)
+
+## Max number of calls sent to a Worker in a single Batch
+WORKER_BATCH_SIZE = config.getint('WORKER_BATCH_SIZE', fallback=100)
+## Fan-out (QClient.map): calls in flight (total and by Worker), retries
+WORKER_MAP_CONCURRENCY = config.getint('WORKER_MAP_CONCURRENCY', fallback=100)
+WORKER_MAP_PER_WORKER = config.getint('WORKER_MAP_PER_WORKER', fallback=16)
+WORKER_MAP_RETRIES = config.getint('WORKER_MAP_RETRIES', fallback=2)
 
 ## Queue Consumed Callback
 WORKER_QUEUE_CALLBACK = config.get(
@@ -36,12 +167,18 @@ WORKER_DISCOVERY_HOST = config.get('WORKER_DISCOVERY_HOST')
 WORKER_DISCOVERY_PORT = config.getint('WORKER_DISCOVERY_PORT', fallback=8434)
 WORKER_USE_NAKED_IP = config.getboolean('WORKER_USE_NAKED_IP', fallback=False)
 WORKER_DISCOVERY_BROADCAST = config.get('WORKER_DISCOVERY_BROADCAST', '255.255.255.255')
+## Seconds the discovered Workers are cached by the clients of a process
+WORKER_DISCOVERY_TTL = config.getint('WORKER_DISCOVERY_TTL', fallback=30)
 WORKER_DEFAULT_MULTICAST = config.get(
     'WORKER_DEFAULT_MULTICAST', fallback="239.255.255.250"
 )
 ## Word used by Discovery
 expected_message = config.get('WORKER_DISCOVERY_MESSAGE')
 WORKER_SECRET_KEY = config.get('WORKER_SECRET_KEY')
+## Session Authentication (seconds a session ticket is valid)
+WORKER_SESSION_TTL = config.getint('WORKER_SESSION_TTL', fallback=3600)
+## Accept (replayable) static signatures sent by older clients
+WORKER_STATIC_SIGNATURE = config.getboolean('WORKER_STATIC_SIGNATURE', fallback=False)
 
 
 ### Redis Transport
@@ -58,8 +195,10 @@ WORKERS = [e.strip() for e in list(config.get(
     'WORKER_LIST', fallback='127.0.0.1:8181').split(","))]
 WORKER_LIST = get_worker_list(WORKERS)
 
+## Workers reserved to high priority Tasks (none by default: high priority
+## Tasks are sent to WORKER_LIST like the others)
 HIGH_LIST = [e.strip() for e in list(config.get(
-    'WORKER_HIGH_LIST', fallback='127.0.0.1:8899').split(","))]
+    'WORKER_HIGH_LIST', fallback='').split(","))]
 WORKER_HIGH_LIST = get_worker_list(HIGH_LIST)
 
 # upgrade no-files
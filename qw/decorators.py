@@ -1,22 +1,125 @@
-from typing import Any
+"""QueueWorker Decorators.
+
+Decorated functions are sent to Queue Workers when are called, using a
+client shared by all of them (created on first call, one by event loop):
+
+    @dispatch
+    async def send_email(recipient):
+        ...
+
+    @dispatch(priority=1, routing_key=lambda program, task: program)
+    async def run_task(program, task):
+        ...
+
+The client keeps their connections open, close it before the loop ends
+(e.g. on application shutdown):
+
+    await close_client()
+"""
+import asyncio
+from typing import Any, Union
 from collections.abc import Callable
 from functools import wraps
 from qw.client import QClient
 
+## clients of the decorated functions, by event loop:
+_clients: dict = {}
 
-def dispatch(func: Callable) -> Any:
-    qw = QClient()  # calling Queue Worker
 
-    @wraps(func)
-    async def _wrap(*args, **kwargs):
-        result = await qw.queue(func, *args, **kwargs)
-        return result
-    return _wrap
+def get_client() -> QClient:
+    """Client shared by the decorated functions of the running loop."""
+    loop = asyncio.get_running_loop()
+    try:
+        return _clients[loop]
+    except KeyError:
+        # clients of closed loops can't be used (nor closed) anymore:
+        for closed in [lp for lp in _clients if lp.is_closed()]:
+            del _clients[closed]
+        client = _clients[loop] = QClient()
+        return client
+
 
-def run(func: Callable) -> Any:
-    qw = QClient()  # calling Queue Worker
+async def close_client():
+    """Close the connections of the client of the running loop."""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.disconnect()
 
+
+def _decorate(
+    func: Callable,
+    method: str,
+    timeout: float = None,
+    routing_key: Union[str, Callable] = None,
+    priority: int = None
+) -> Callable:
     @wraps(func)
     async def _wrap(*args, **kwargs):
-        return await qw.run(func, *args, **kwargs)
+        qw = get_client()  # calling Queue Worker
+        options = {}
+        if method != 'publish':
+            key = routing_key
+            if callable(key):
+                # key computed from the arguments of the call:
+                key = key(*args, **kwargs)
+            if key is not None:
+                options['routing_key'] = key
+        if priority is not None:
+            options['priority'] = priority
+        call = getattr(qw, method)(func, *args, **options, **kwargs)
+        if timeout:
+            return await asyncio.wait_for(call, timeout=timeout)
+        return await call
     return _wrap
+
+
+def dispatch(
+    func: Callable = None,
+    *,
+    timeout: float = None,
+    routing_key: Union[str, Callable] = None,
+    priority: int = None,
+    publish: bool = False
+) -> Any:
+    """Send the function to a Queue Worker (or Pub/Sub) when is called.
+
+    Args:
+        timeout: seconds to wait until the function was queued.
+        routing_key: tasks with the same key are queued on the same Worker,
+            a callable receives the arguments of the call.
+        priority: priority of the task on the Queue of the Worker.
+        publish: (bool) publish the task on Pub/Sub instead of queue it.
+    """
+    method = 'publish' if publish is True else 'queue'
+
+    def decorator(fn: Callable) -> Callable:
+        return _decorate(
+            fn, method, timeout=timeout, routing_key=routing_key, priority=priority
+        )
+    if func is not None:
+        return decorator(func)
+    return decorator
+
+
+def run(
+    func: Callable = None,
+    *,
+    timeout: float = None,
+    routing_key: Union[str, Callable] = None,
+    priority: int = None
+) -> Any:
+    """Run the function in a Queue Worker when is called, returns their result.
+
+    Args:
+        timeout: seconds to wait for the result.
+        routing_key: calls with the same key are sent to the same Worker,
+            a callable receives the arguments of the call.
+        priority: high priority calls are sent to WORKER_HIGH_LIST.
+    """
+    def decorator(fn: Callable) -> Callable:
+        return _decorate(
+            fn, 'run', timeout=timeout, routing_key=routing_key, priority=priority
+        )
+    if func is not None:
+        return decorator(func)
+    return decorator
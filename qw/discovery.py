@@ -1,14 +1,23 @@
 import asyncio
+import time
 from typing import Any
 from itertools import cycle
 import random
 import socket
+from redis import asyncio as aioredis
+import orjson
+from navconfig.logging import logging
 from qw.exceptions import QWException
 from qw.utils import cPrint
 from qw.utils.json import json_decoder
 from .conf import (
     WORKER_DISCOVERY_PORT,
     WORKER_DEFAULT_PORT,
+    WORKER_DISCOVERY_TTL,
+    WORKER_REDIS,
+    USE_DISCOVERY,
+    QW_WORKER_LIST,
+    MAX_WORKERS,
     expected_message
 )
 from .protocols import DiscoveryProtocol
@@ -62,3 +71,102 @@ def get_client_discovery() -> tuple:
         sock.close()
         random.shuffle(server_list)
         return server_list, cycle(server_list)  # pylint: disable=W0150
+
+
+async def get_redis_workers() -> list:
+    """Workers registered on Redis."""
+    redis = aioredis.ConnectionPool.from_url(
+        WORKER_REDIS,
+        decode_responses=True,
+        encoding='utf-8'
+    )
+    try:
+        conn = aioredis.Redis(connection_pool=redis)
+        workers = []
+        if (lrange := await conn.lrange(QW_WORKER_LIST, 0, MAX_WORKERS)):
+            w = [orjson.loads(el) for el in lrange]
+            workers = [tuple(list(v.values())[0]) for v in w]
+        return workers
+    finally:
+        await redis.disconnect(inuse_connections=True)
+
+
+async def discover_workers() -> list:
+    """Workers found by network discovery (or registered on Redis)."""
+    if USE_DISCOVERY is True:
+        # UDP discovery is blocking, don't wait for it on the event loop:
+        loop = asyncio.get_running_loop()
+        workers, _ = await loop.run_in_executor(None, get_client_discovery)
+        return workers
+    return await get_redis_workers()
+
+
+class WorkerRegistry:
+    """Workers known by the clients of this process.
+
+    Workers are discovered on first use and cached for ttl seconds, an
+    expired list is still used while is refreshed in background.
+
+    Args:
+        ttl: seconds the list of Workers is fresh.
+    """
+    def __init__(self, ttl: int = WORKER_DISCOVERY_TTL):
+        self.ttl = ttl
+        self._workers: list = []
+        self._updated: float = 0.0
+        self._task: asyncio.Task = None
+        self.logger = logging.getLogger('QW.Discovery')
+
+    def __repr__(self) -> str:
+        return f'<WorkerRegistry workers={len(self._workers)}>'
+
+    @property
+    def workers(self) -> list:
+        return self._workers
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() - self._updated > self.ttl
+
+    def invalidate(self):
+        """Discover the Workers again on next use."""
+        self._updated = 0.0
+
+    async def get(self) -> list:
+        """Cached Workers (discovered on first use)."""
+        if self.expired:
+            if not self._workers:
+                return await self.refresh()
+            self._start()
+        return self._workers
+
+    async def refresh(self) -> list:
+        """Discover the Workers (sharing the discovery in progress)."""
+        return await asyncio.shield(self._start())
+
+    def _start(self) -> asyncio.Task:
+        loop = asyncio.get_running_loop()
+        task = self._task
+        # a discovery running on another loop (another thread) can't be awaited:
+        if task is None or task.done() or task.get_loop() is not loop:
+            task = self._task = loop.create_task(self._discover())
+        return task
+
+    async def _discover(self) -> list:
+        try:
+            workers = await discover_workers()
+        except (QWException, aioredis.RedisError, OSError) as exc:
+            self.logger.error(
+                f"Unable to discover Workers: {exc}"
+            )
+            workers = []
+        if workers:
+            random.shuffle(workers)
+            self._workers = workers
+        # failed discoveries are not repeated until the ttl expires:
+        self._updated = time.monotonic()
+        return self._workers
+
+
+## shared by all clients of this process:
+workers_registry = WorkerRegistry()
@@ -0,0 +1,545 @@
+"""QueueWorker Framed Protocol.
+
+Length-prefixed frames used to keep a connection between QClient and QWorker
+open and multiplex several in-flight requests over the same socket.
+
+Every frame is a fixed header followed by the payload:
+
+    kind (1 byte) | flags (1 byte) | request id (8 bytes) | length (4 bytes)
+
+Replies carry the request id of the request that originated them.
+"""
+import asyncio
+import itertools
+import struct
+import time
+from typing import Optional, Union
+from collections.abc import Callable
+from contextlib import suppress
+from .compression import Codec, CompressionStats, get_codec
+
+
+## Prefix sent (before the signature length) to ask for a framed connection.
+FRAMED_PREFIX = b'framed:'
+
+## Connection Modes negotiated on signature validation.
+STREAM_MODE = 1
+FRAMED_MODE = 2
+
+FRAME_HEADER = struct.Struct('!BBQI')
+FRAME_HEADER_SIZE = FRAME_HEADER.size
+
+### Frame Kinds:
+FRAME_TASK = 1
+FRAME_RESULT = 2
+FRAME_HEALTH = 3
+FRAME_CHECK_STATE = 4
+FRAME_CLOSE = 5
+FRAME_PING = 6
+FRAME_BATCH = 7
+FRAME_HELLO = 8
+FRAME_STREAM = 9
+FRAME_CREDIT = 10
+FRAME_CANCEL = 11
+FRAME_CALL = 12
+FRAME_PROBE = 13
+## Capacity sent by Worker (unsolicited) after handling a Task.
+FRAME_CAPACITY = 14
+
+### Frame Flags:
+FLAG_COMPRESSED = 0x01
+FLAG_MORE = 0x02
+FLAG_ERROR = 0x04
+FLAG_BUFFERS = 0x08
+## Worker doesn't know the function of a call, client must send their code.
+FLAG_MISSING = 0x10
+
+
+## size of the chunks read when a payload is discarded.
+READ_CHUNK_SIZE = 65536
+
+## Handshake option (and PING payload) asking Worker for their capacity.
+CAPACITY_OPTION = b'capacity'
+
+
+class PayloadTooLarge(ValueError):
+    """Raised when a payload exceeds the max payload size."""
+    def __init__(self, length: int, max_size: int, request_id: int = 0):
+        super().__init__(
+            f"Payload of {length} bytes exceeds the max payload size ({max_size} bytes)"
+        )
+        self.request_id = request_id
+
+
+async def read_payload(reader: asyncio.StreamReader, length: int) -> bytearray:
+    """Read a payload of a declared length into a preallocated buffer.
+
+    Chunks are copied once into the buffer as soon as they arrive, instead
+    of accumulating the whole payload on the StreamReader buffer.
+    """
+    buffer = bytearray(length)
+    with memoryview(buffer) as view:
+        pos = 0
+        while pos < length:
+            chunk = await reader.read(length - pos)
+            if not chunk:
+                raise asyncio.IncompleteReadError(bytes(view[:pos]), length)
+            view[pos:pos + len(chunk)] = chunk
+            pos += len(chunk)
+    return buffer
+
+
+async def skip_payload(reader: asyncio.StreamReader, length: int) -> None:
+    """Discard a payload from the stream without buffering it."""
+    while length > 0:
+        chunk = await reader.read(min(length, READ_CHUNK_SIZE))
+        if not chunk:
+            raise asyncio.IncompleteReadError(b'', length)
+        length -= len(chunk)
+
+
+async def read_frame(reader: asyncio.StreamReader, max_size: int = 0) -> tuple:
+    """Read a complete frame from the stream.
+
+    Args:
+        reader: asyncio StreamReader.
+        max_size: max size of payload (0 means no limit), a bigger payload is
+            discarded and PayloadTooLarge is raised.
+
+    Returns:
+        tuple of (kind, flags, request_id, payload) or None if the peer
+        closed the connection between frames.
+    """
+    try:
+        header = await reader.readexactly(FRAME_HEADER_SIZE)
+    except asyncio.IncompleteReadError as exc:
+        if not exc.partial:
+            return None
+        raise
+    kind, flags, request_id, length = FRAME_HEADER.unpack(header)
+    if max_size and length > max_size:
+        # keep the connection usable for the next frames:
+        await skip_payload(reader, length)
+        raise PayloadTooLarge(length, max_size, request_id)
+    payload = await read_payload(reader, length) if length else b''
+    return kind, flags, request_id, payload
+
+
+class WorkerCapacity:
+    """Free capacity and load advertised by a Worker.
+
+    Sent after the CONTINUE reply of the handshake, as reply of a capacity
+    PING and (on framed connections) after every Task handled by the
+    Worker, so the client can divert a Task to another Worker before
+    sending it.
+
+        free slots (4 bytes) | queued (4 bytes) | active (4 bytes) | load (2 bytes)
+
+    load is the 1-minute load average per CPU, in thousandths.
+    """
+    FORMAT = struct.Struct('!IIIH')
+    size: int = FORMAT.size
+
+    def __init__(self, free: int, queued: int, active: int, load: int):
+        self.free = free
+        self.queued = queued
+        self.active = active
+        self.load = load
+        self.received: float = time.monotonic()
+
+    def __repr__(self) -> str:
+        return (
+            f'<WorkerCapacity free={self.free} queued={self.queued} '
+            f'active={self.active} load={self.load / 1000}>'
+        )
+
+    def pack_values(self) -> tuple:
+        return (
+            min(self.free, 0xFFFFFFFF),
+            min(self.queued, 0xFFFFFFFF),
+            min(self.active, 0xFFFFFFFF),
+            min(self.load, 0xFFFF)
+        )
+
+    def pack(self) -> bytes:
+        return self.FORMAT.pack(*self.pack_values())
+
+    @classmethod
+    def unpack(cls, data: bytes) -> "WorkerCapacity":
+        return cls(*cls.FORMAT.unpack(data))
+
+    @property
+    def full(self) -> bool:
+        return self.free == 0
+
+    def age(self) -> float:
+        return time.monotonic() - self.received
+
+
+class FrameParser:
+    """Incremental frame parser, for protocols receiving data in chunks.
+
+    Payloads are copied once into a preallocated buffer as chunks arrive,
+    a payload bigger than max_size is discarded (without buffering it) and
+    a PayloadTooLarge is returned in place of their frame.
+    """
+    def __init__(self, max_size: int = 0):
+        self.max_size = max_size
+        self._header = bytearray()
+        self._frame: Optional[tuple] = None
+        self._payload: Optional[bytearray] = None
+        self._pos: int = 0
+        self._skip: int = 0
+
+    def feed(self, data: bytes) -> list:
+        """Consume received data.
+
+        Returns:
+            list of completed frames (kind, flags, request_id, payload), or
+            PayloadTooLarge exceptions.
+        """
+        frames = []
+        view = memoryview(data)
+        while view:
+            if self._skip:
+                size = min(self._skip, len(view))
+                self._skip -= size
+                view = view[size:]
+            elif self._payload is None:
+                needed = FRAME_HEADER_SIZE - len(self._header)
+                self._header += view[:needed]
+                view = view[needed:]
+                if len(self._header) < FRAME_HEADER_SIZE:
+                    break
+                kind, flags, request_id, length = FRAME_HEADER.unpack(self._header)
+                self._header.clear()
+                if self.max_size and length > self.max_size:
+                    self._skip = length
+                    frames.append(
+                        PayloadTooLarge(length, self.max_size, request_id)
+                    )
+                elif not length:
+                    frames.append((kind, flags, request_id, b''))
+                else:
+                    self._frame = (kind, flags, request_id)
+                    self._payload = bytearray(length)
+                    self._pos = 0
+            else:
+                size = min(len(self._payload) - self._pos, len(view))
+                self._payload[self._pos:self._pos + size] = view[:size]
+                self._pos += size
+                view = view[size:]
+                if self._pos == len(self._payload):
+                    frames.append((*self._frame, self._payload))
+                    self._frame, self._payload = None, None
+        return frames
+
+
+def write_frame(
+    writer: asyncio.StreamWriter,
+    kind: int,
+    request_id: int,
+    payload: Union[bytes, list] = b'',
+    flags: int = 0
+) -> None:
+    """Write a frame on the transport (header and payload in a single call).
+
+    payload can be a list of parts (e.g. out-of-band buffers), that are
+    written without joining them.
+    """
+    parts = payload if isinstance(payload, list) else [payload]
+    length = sum(memoryview(part).nbytes for part in parts)
+    writer.writelines([FRAME_HEADER.pack(kind, flags, request_id, length), *parts])
+
+
+class FrameWriter:
+    """StreamWriter-like channel used by Worker to reply to a framed request.
+
+    Every write is sent as a RESULT frame tagged with the request id, closing
+    the channel only sends an empty reply if nothing was written, the
+    underlying connection remains open for the next requests.
+    Payloads are compressed with the codec negotiated for the connection.
+
+    Streamed replies are sent as partial frames (flagged with MORE), every
+    partial frame consumes a credit given back by the client when the
+    chunk was consumed.
+    """
+    ## replies can carry out-of-band buffers.
+    out_of_band: bool = True
+
+    def __init__(
+        self,
+        writer: asyncio.StreamWriter,
+        request_id: int,
+        lock: asyncio.Lock,
+        codec: Optional[Codec] = None,
+        stats: Optional[CompressionStats] = None,
+        threshold: int = 0
+    ):
+        self._writer = writer
+        self._lock = lock
+        self.request_id = request_id
+        self._sent: bool = False
+        self._codec = codec
+        self._stats = stats if stats is not None else CompressionStats()
+        self._threshold = threshold
+        self.credits: Optional[asyncio.Semaphore] = None
+
+    def get_extra_info(self, name: str, default=None):
+        return self._writer.get_extra_info(name, default)
+
+    def write(self, data: Union[bytes, list], flags: int = 0):
+        if isinstance(data, list):
+            # out-of-band buffers are sent as-is:
+            flags |= FLAG_BUFFERS
+        else:
+            data, compressed = self._stats.compress(
+                self._codec, data, self._threshold
+            )
+            if compressed:
+                flags |= FLAG_COMPRESSED
+        write_frame(self._writer, FRAME_RESULT, self.request_id, data, flags)
+        self._sent = True
+
+    async def write_chunk(self, data: Union[bytes, list]):
+        """Send a partial reply, waiting for a credit of the client."""
+        if self.credits is not None:
+            await self.credits.acquire()
+        self.write(data, FLAG_MORE)
+        await self.drain()
+
+    async def drain(self):
+        async with self._lock:
+            await self._writer.drain()
+
+    def can_write_eof(self) -> bool:
+        return False
+
+    def write_eof(self):
+        pass
+
+    def is_closing(self) -> bool:
+        return self._writer.is_closing()
+
+    def close(self):
+        if not self._sent and not self._writer.is_closing():
+            # always reply, the client is waiting for this request id.
+            self.write(b'')
+
+
+class FramedConnection:
+    """Client side of a multiplexed connection to a Worker.
+
+    Requests are written as frames with an unique id, a background task
+    reads the replies and resolves the future waiting for each id.
+    Capacity frames sent by Worker are passed to ``on_capacity``, compressed
+    replies bigger than ``max_size`` once decompressed are failed.
+    """
+    def __init__(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        worker: tuple,
+        threshold: int = 0,
+        on_capacity: Optional[Callable] = None,
+        max_size: int = 0
+    ):
+        self.reader = reader
+        self.writer = writer
+        self.worker = worker
+        self.on_capacity = on_capacity
+        self.codec: Optional[Codec] = None
+        self.stats = CompressionStats()
+        self.max_size = max_size
+        self._threshold = threshold
+        self._pending: dict = {}
+        self._streams: dict = {}
+        self._ids = itertools.count(1)
+        self._lock = asyncio.Lock()
+        self._closed: bool = False
+        self.last_used: float = time.monotonic()
+        self._reader_task = asyncio.get_running_loop().create_task(
+            self._read_replies()
+        )
+
+    def __repr__(self) -> str:
+        return f'<FramedConnection {self.worker!r} in_flight={self.in_flight}>'
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._pending) + len(self._streams)
+
+    @property
+    def sockname(self) -> tuple:
+        return self.writer.get_extra_info('sockname')
+
+    async def _read_replies(self):
+        error = None
+        try:
+            while True:
+                frame = await read_frame(self.reader)
+                if frame is None:
+                    break
+                kind, flags, request_id, payload = frame
+                if kind == FRAME_CAPACITY:
+                    if self.on_capacity is not None and len(payload) == WorkerCapacity.size:
+                        self.on_capacity(self.worker, WorkerCapacity.unpack(payload))
+                    continue
+                if request_id in self._streams:
+                    queue = self._streams[request_id]
+                    if not flags & FLAG_MORE:
+                        del self._streams[request_id]
+                    try:
+                        payload = self._decompress(flags, payload)
+                        queue.put_nowait((flags, payload))
+                    except Exception as exc:  # pylint: disable=W0703
+                        queue.put_nowait(exc)
+                    continue
+                fut = self._pending.pop(request_id, None)
+                if fut is None or fut.done():
+                    continue
+                try:
+                    fut.set_result((flags, self._decompress(flags, payload)))
+                except Exception as exc:  # pylint: disable=W0703
+                    fut.set_exception(exc)
+        except (asyncio.IncompleteReadError, ConnectionError, OSError) as exc:
+            error = exc
+        finally:
+            self._closed = True
+            exc = ConnectionResetError(
+                f"Connection to Worker {self.worker!r} was lost: {error!s}"
+            )
+            for fut in self._pending.values():
+                if not fut.done():
+                    fut.set_exception(exc)
+            self._pending.clear()
+            for queue in self._streams.values():
+                queue.put_nowait(exc)
+            self._streams.clear()
+
+    def _decompress(self, flags: int, payload: bytes) -> bytes:
+        if flags & FLAG_COMPRESSED:
+            return self.stats.decompress(self.codec, payload, self.max_size)
+        return payload
+
+    def _compress(self, payload: Union[bytes, list], flags: int) -> tuple:
+        if isinstance(payload, list):
+            # out-of-band buffers are sent as-is:
+            return payload, flags | FLAG_BUFFERS
+        payload, compressed = self.stats.compress(
+            self.codec, payload, self._threshold
+        )
+        if compressed:
+            flags |= FLAG_COMPRESSED
+        return payload, flags
+
+    async def request(
+        self,
+        kind: int,
+        payload: Union[bytes, list] = b'',
+        flags: int = 0
+    ) -> tuple:
+        """Send a request and wait for their reply.
+
+        Returns:
+            tuple of (flags, payload) of the reply frame.
+        """
+        if self._closed:
+            raise ConnectionResetError(
+                f"Connection to Worker {self.worker!r} is closed."
+            )
+        payload, flags = self._compress(payload, flags)
+        request_id = next(self._ids)
+        fut = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = fut
+        try:
+            write_frame(self.writer, kind, request_id, payload, flags)
+            async with self._lock:
+                await self.writer.drain()
+            return await fut
+        except asyncio.CancelledError:
+            # nobody is waiting for the reply, Worker can stop working on it:
+            if not fut.done():
+                self.cancel(request_id)
+            raise
+        finally:
+            self._pending.pop(request_id, None)
+            self.last_used = time.monotonic()
+
+    def cancel(self, request_id: int):
+        """Ask Worker to cancel a request (the reply is discarded)."""
+        self._pending.pop(request_id, None)
+        self._streams.pop(request_id, None)
+        if not self._closed:
+            write_frame(self.writer, FRAME_CANCEL, request_id)
+
+    async def stream(
+        self,
+        kind: int,
+        payload: Union[bytes, list] = b'',
+        flags: int = 0
+    ):
+        """Send a request and iterate over their partial replies.
+
+        A credit is given back to Worker for every chunk received, stopping
+        the iteration before the last chunk cancels the request.
+
+        Yields:
+            tuple of (flags, payload) of every reply frame.
+        """
+        if self._closed:
+            raise ConnectionResetError(
+                f"Connection to Worker {self.worker!r} is closed."
+            )
+        payload, flags = self._compress(payload, flags)
+        request_id = next(self._ids)
+        queue = asyncio.Queue()
+        self._streams[request_id] = queue
+        finished = False
+        try:
+            write_frame(self.writer, kind, request_id, payload, flags)
+            async with self._lock:
+                await self.writer.drain()
+            while not finished:
+                item = await queue.get()
+                if isinstance(item, BaseException):
+                    finished = True
+                    raise item
+                reply_flags, data = item
+                if reply_flags & FLAG_MORE:
+                    write_frame(self.writer, FRAME_CREDIT, request_id)
+                else:
+                    finished = True
+                yield reply_flags, data
+        finally:
+            if not finished:
+                self.cancel(request_id)
+            self._streams.pop(request_id, None)
+            self.last_used = time.monotonic()
+
+    async def negotiate(self, codecs: list) -> Optional[Codec]:
+        """Agree with Worker on the compression codec of this connection."""
+        if not codecs:
+            return None
+        _, name = await self.request(
+            FRAME_HELLO, ','.join(codecs).encode('utf-8')
+        )
+        self.codec = get_codec(bytes(name)) if name else None
+        return self.codec
+
+    async def close(self):
+        if not self._closed:
+            self._closed = True
+            with suppress(Exception):
+                write_frame(self.writer, FRAME_CLOSE, 0)
+                await self.writer.drain()
+        self._reader_task.cancel()
+        with suppress(asyncio.CancelledError, Exception):
+            await self._reader_task
+        self.writer.close()
+        with suppress(Exception):
+            await self.writer.wait_closed()
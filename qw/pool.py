@@ -0,0 +1,225 @@
+"""QueueWorker Client Connection Pool.
+
+Bounded pool of authenticated (framed) connections to a single Worker.
+"""
+import asyncio
+import time
+from typing import Optional
+from collections.abc import Awaitable, Callable
+from contextlib import suppress
+from navconfig.logging import logging
+from .conf import (
+    WORKER_POOL_MIN_SIZE,
+    WORKER_POOL_MAX_SIZE,
+    WORKER_POOL_MAX_STREAMS,
+    WORKER_POOL_IDLE_TIMEOUT,
+    WORKER_POOL_HEALTH_INTERVAL
+)
+from .frames import (
+    FRAME_PING,
+    CAPACITY_OPTION,
+    WorkerCapacity,
+    FramedConnection
+)
+
+
+class WorkerPool:
+    """Pool of persistent connections to a Worker (host, port).
+
+    Connections are multiplexed, a connection is shared by several requests
+    until it reaches ``max_streams`` in-flight requests, then a new one is
+    opened (up to ``max_size``). Idle connections over ``min_size`` are
+    closed after ``idle_timeout`` seconds and idle connections are checked
+    every ``health_interval`` seconds with a PING frame, their reply carries
+    the Worker capacity, passed to ``on_capacity`` (busy connections get it
+    after every Task, see FramedConnection).
+
+    Args:
+        worker: (host, port) of the Worker.
+        connect: coroutine function that opens an authenticated connection.
+        on_capacity: callable receiving (worker, WorkerCapacity).
+    """
+    def __init__(
+        self,
+        worker: tuple,
+        connect: Callable[[], Awaitable[FramedConnection]],
+        min_size: int = WORKER_POOL_MIN_SIZE,
+        max_size: int = WORKER_POOL_MAX_SIZE,
+        max_streams: int = WORKER_POOL_MAX_STREAMS,
+        idle_timeout: int = WORKER_POOL_IDLE_TIMEOUT,
+        health_interval: int = WORKER_POOL_HEALTH_INTERVAL,
+        on_capacity: Optional[Callable] = None
+    ):
+        self.worker = worker
+        self._connect = connect
+        self.min_size = max(min_size, 0)
+        self.max_size = max(max_size, 1, self.min_size)
+        self.max_streams = max_streams
+        self.idle_timeout = idle_timeout
+        self.health_interval = health_interval
+        self.on_capacity = on_capacity
+        self._connections: list[FramedConnection] = []
+        self._opening: set[asyncio.Task] = set()
+        self._maintenance: Optional[asyncio.Task] = None
+        self._closed: bool = False
+        self.logger = logging.getLogger('QW.Pool')
+        ## metrics:
+        self._created: int = 0
+        self._discarded: int = 0
+        self._reused: int = 0
+        self._health_failures: int = 0
+
+    def __repr__(self) -> str:
+        return f'<WorkerPool {self.worker!r} size={self.size}>'
+
+    @property
+    def size(self) -> int:
+        return len(self._connections)
+
+    @property
+    def in_flight(self) -> int:
+        return sum(conn.in_flight for conn in self._connections)
+
+    def metrics(self) -> dict:
+        return {
+            "size": self.size,
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+            "idle": sum(1 for conn in self._connections if conn.in_flight == 0),
+            "in_flight": self.in_flight,
+            "connecting": self.connecting,
+            "created": self._created,
+            "discarded": self._discarded,
+            "reused": self._reused,
+            "health_failures": self._health_failures
+        }
+
+    def _purge(self):
+        """Remove the connections closed by peer."""
+        alive = [conn for conn in self._connections if not conn.closed]
+        self._discarded += len(self._connections) - len(alive)
+        self._connections = alive
+
+    @property
+    def connecting(self) -> int:
+        """Connections being opened."""
+        return len(self._opening)
+
+    async def _establish(self) -> FramedConnection:
+        conn = await self._connect()
+        if self._closed:
+            await conn.close()
+            raise ConnectionAbortedError(
+                f"Pool for Worker {self.worker!r} is closed."
+            )
+        self._connections.append(conn)
+        self._created += 1
+        return conn
+
+    async def _open(self) -> FramedConnection:
+        task = asyncio.get_running_loop().create_task(self._establish())
+        self._opening.add(task)
+        task.add_done_callback(self._opening.discard)
+        return await task
+
+    async def _wait_opening(self):
+        """Wait for the connections being opened (by other callers)."""
+        done, _ = await asyncio.wait(
+            set(self._opening), return_when=asyncio.FIRST_COMPLETED
+        )
+        if self._connections:
+            return
+        for task in done:
+            if not task.cancelled() and (exc := task.exception()) is not None:
+                # don't open another connection to a failing Worker:
+                raise ConnectionError(
+                    f"Unable to connect to Worker {self.worker!r}: {exc!s}"
+                ) from exc
+
+    async def acquire(self) -> FramedConnection:
+        """Return the least loaded connection, opening a new one if needed.
+
+        No more than max_size connections are open (or being opened), callers
+        arriving while the pool is opening them wait for those connections.
+        """
+        if self._closed:
+            raise ConnectionAbortedError(
+                f"Pool for Worker {self.worker!r} is closed."
+            )
+        if self._maintenance is None:
+            self._maintenance = asyncio.get_running_loop().create_task(
+                self._maintain()
+            )
+        while True:
+            self._purge()
+            conn = min(
+                self._connections, key=lambda c: c.in_flight, default=None
+            )
+            if conn is not None and conn.in_flight < self.max_streams:
+                self._reused += 1
+                return conn
+            if self.size + self.connecting < self.max_size:
+                return await self._open()
+            if conn is not None:
+                # pool is full, the least loaded connection is shared:
+                self._reused += 1
+                return conn
+            # cold pool, all the connections allowed are being opened:
+            await self._wait_opening()
+
+    async def _check(self, conn: FramedConnection) -> bool:
+        try:
+            _, reply = await asyncio.wait_for(
+                conn.request(FRAME_PING, CAPACITY_OPTION),
+                timeout=self.health_interval
+            )
+            if self.on_capacity is not None and len(reply) == WorkerCapacity.size:
+                self.on_capacity(self.worker, WorkerCapacity.unpack(reply))
+            return True
+        except (asyncio.TimeoutError, ConnectionError, OSError) as exc:
+            self._health_failures += 1
+            self.logger.warning(
+                f"Health check failed for {self.worker!r}: {exc}"
+            )
+            await conn.close()
+            return False
+
+    async def _maintain(self):
+        """Close idle connections, check the health and keep min_size open."""
+        while not self._closed:
+            await asyncio.sleep(self.health_interval)
+            self._purge()
+            now = time.monotonic()
+            for conn in list(self._connections):
+                if conn.in_flight > 0:
+                    continue
+                if (
+                    self.size > self.min_size
+                    and now - conn.last_used > self.idle_timeout
+                ):
+                    self._connections.remove(conn)
+                    self._discarded += 1
+                    await conn.close()
+                else:
+                    await self._check(conn)
+            self._purge()
+            while self.size < self.min_size and not self._closed:
+                try:
+                    await self._open()
+                except (ConnectionError, OSError, asyncio.TimeoutError) as exc:
+                    self.logger.warning(
+                        f"Unable to refill pool for {self.worker!r}: {exc}"
+                    )
+                    break
+
+    async def close(self):
+        self._closed = True
+        if self._maintenance is not None:
+            self._maintenance.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._maintenance
+        for task in list(self._opening):
+            task.cancel()
+        connections, self._connections = self._connections, []
+        for conn in connections:
+            await conn.close()
@@ -90,7 +90,7 @@ class SpawnProcess(object):
                 p = mp.Process(
                     target=start_server,
                     name=f'{self.worker}_{i}',
-                    args=(i, args.host, args.port, args.debug, )
+                    args=(i, args.host, args.port, args.debug, args.protocol, )
                 )
                 JOB_LIST.append(p)
                 p.start()
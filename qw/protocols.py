@@ -1,9 +1,7 @@
-import time
 import random
 import asyncio
 import redis
 from typing import Any
-import hashlib
 import socket
 import struct
 from json import JSONDecodeError
@@ -14,8 +12,16 @@ from .conf import (
     WORKER_DISCOVERY_HOST,
     WORKER_DEFAULT_MULTICAST,
     WORKER_REDIS,
+    WORKER_MAX_PAYLOAD_SIZE,
+    WORKER_PROTOCOL_MAX_REQUESTS,
     expected_message
 )
+from .frames import (
+    FRAMED_MODE,
+    READ_CHUNK_SIZE,
+    FrameParser,
+    PayloadTooLarge
+)
 
 
 MULTICAST_ADDRESS = WORKER_DEFAULT_MULTICAST
@@ -129,48 +135,277 @@ class DiscoveryProtocol(asyncio.DatagramProtocol):
         # Remove all occurrences of this server from the redis list
         self._redis.lrem('QW_SERVER_LIST', 1, server_info)
 
+
+class ProtocolReader:
+    """StreamReader-like buffer fed by QueueProtocol.
+
+    Used while the client is authenticated and by connections in stream
+    mode, the transport is paused while the buffer is over the limit.
+    """
+    def __init__(self, transport: asyncio.Transport, limit: int = READ_CHUNK_SIZE):
+        self._transport = transport
+        self._limit = limit
+        self._buffer = bytearray()
+        self._eof: bool = False
+        self._paused: bool = False
+        self._waiter: asyncio.Future = None
+
+    def _wakeup(self):
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    async def _wait(self):
+        self._waiter = asyncio.get_running_loop().create_future()
+        try:
+            await self._waiter
+        finally:
+            self._waiter = None
+
+    def _consume(self, size: int) -> bytes:
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        if self._paused and len(self._buffer) <= self._limit:
+            self._paused = False
+            self._transport.resume_reading()
+        return data
+
+    def feed_data(self, data: bytes):
+        self._buffer += data
+        self._wakeup()
+        if not self._paused and len(self._buffer) > 2 * self._limit:
+            self._paused = True
+            self._transport.pause_reading()
+
+    def feed_eof(self):
+        self._eof = True
+        self._wakeup()
+
+    def at_eof(self) -> bool:
+        return self._eof and not self._buffer
+
+    def take_buffer(self) -> bytes:
+        """Return (and remove) all the buffered data."""
+        return self._consume(len(self._buffer))
+
+    async def readline(self) -> bytes:
+        while True:
+            idx = self._buffer.find(b'\n')
+            if idx >= 0:
+                return self._consume(idx + 1)
+            if self._eof:
+                return self._consume(len(self._buffer))
+            if len(self._buffer) > self._limit:
+                raise asyncio.LimitOverrunError(
+                    'Separator is not found, and chunk exceed the limit',
+                    len(self._buffer)
+                )
+            await self._wait()
+
+    async def readexactly(self, size: int) -> bytes:
+        while len(self._buffer) < size:
+            if self._eof:
+                raise asyncio.IncompleteReadError(
+                    self._consume(len(self._buffer)), size
+                )
+            await self._wait()
+        return self._consume(size)
+
+    async def read(self, size: int = -1) -> bytes:
+        if size == 0:
+            return b''
+        while not self._buffer and not self._eof:
+            await self._wait()
+        if size < 0:
+            size = len(self._buffer)
+        return self._consume(size)
+
+
+class TransportWriter:
+    """StreamWriter-like object, writes directly on the transport of a Protocol."""
+    def __init__(self, transport: asyncio.Transport, protocol: "QueueProtocol"):
+        self._transport = transport
+        self._protocol = protocol
+
+    @property
+    def transport(self) -> asyncio.Transport:
+        return self._transport
+
+    def write(self, data: bytes):
+        self._transport.write(data)
+
+    def writelines(self, data: list):
+        self._transport.writelines(data)
+
+    async def drain(self):
+        await self._protocol.drain()
+
+    def can_write_eof(self) -> bool:
+        return self._transport.can_write_eof()
+
+    def write_eof(self):
+        self._transport.write_eof()
+
+    def is_closing(self) -> bool:
+        return self._transport.is_closing()
+
+    def get_extra_info(self, name: str, default=None):
+        return self._transport.get_extra_info(name, default)
+
+    def close(self):
+        self._transport.close()
+
+    async def wait_closed(self):
+        await self._protocol.wait_closed()
+
+
 class QueueProtocol(asyncio.Protocol):
-    """Connection Protocol for QueueWorker Server."""
+    """Connection Protocol for QueueWorker Server.
+
+    Low-overhead alternative to the StreamReader/StreamWriter handler: the
+    client is authenticated with the Worker handshake, then frames are
+    parsed incrementally on data_received and replies are written directly
+    on the transport. Reading is paused while the connection has
+    WORKER_PROTOCOL_MAX_REQUESTS requests in flight, replies wait while the
+    transport buffer is full. Connections in stream mode (a single Task
+    per connection) are handled by the Worker stream handler.
 
-    def __init__(self, queue: asyncio.Queue, name: str):
-        self.queue = queue
+    Args:
+        worker: QWorker serving the connection.
+    """
+
+    def __init__(self, worker: Any):
+        self.worker = worker
         self.logger = logging.getLogger(
-            f'QW.QueueServer-{name}'
+            f'QW.QueueServer-{worker.name}'
         )
         self.transport = None
+        self.peername = None
         self.loop = asyncio.get_event_loop()
-        self._ready = asyncio.Event()
-        self._name = name
-        print(
-            f'Starting Protocol for {name}'
+        self.reader: ProtocolReader = None
+        self.writer: TransportWriter = None
+        self._handler: asyncio.Task = None
+        self._parser: FrameParser = None
+        self._session = None
+        self._closing: bool = False
+        self._paused: bool = False
+        self._writing_paused: bool = False
+        self._drain_waiters: list = []
+        self._closed = self.loop.create_future()
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.peername = transport.get_extra_info('peername')
+        self.reader = ProtocolReader(transport)
+        self.writer = TransportWriter(transport, self)
+        self._handler = self.loop.create_task(self.handshake())
+
+    async def handshake(self):
+        try:
+            mode = await self.worker.signature_validation(self.reader, self.writer)
+            if mode == FRAMED_MODE:
+                self.start_framing()
+            elif mode:
+                await self.worker.stream_handler(
+                    self.reader, self.writer, self.peername
+                )
+        except Exception as exc:  # pylint: disable=W0703
+            self.logger.error(
+                f"Error on connection with {self.peername!r}: {exc}"
+            )
+            self.transport.close()
+
+    def start_framing(self):
+        """Client was authenticated, the next data received are frames."""
+        self.logger.info(
+            f"Framed connection from {self.peername!r} to worker {self.worker.name!s}"
         )
+        self._session = self.worker.framed_session(self.writer)
+        self._session.on_done = self.request_done
+        self._parser = FrameParser(WORKER_MAX_PAYLOAD_SIZE)
+        reader, self.reader = self.reader, None
+        # frames received while the handshake was finishing:
+        if (data := reader.take_buffer()):
+            self.data_received(data)
+        if reader.at_eof():
+            self.close()
 
-    def setup(self, peer):
-        self.ip, self.port = peer[0], peer[1]
+    def data_received(self, data: bytes):
+        if self._parser is None:
+            self.reader.feed_data(data)
+            return
+        if self._closing:
+            return
+        for frame in self._parser.feed(data):
+            if isinstance(frame, PayloadTooLarge):
+                self._session.discard(frame)
+            elif not self._session.handle_frame(*frame):
+                self.close()
+                return
+        if not self._paused and self._session.in_flight >= WORKER_PROTOCOL_MAX_REQUESTS:
+            self._paused = True
+            self.transport.pause_reading()
 
-    @property
-    def connection_id(self):
-        if not hasattr(self, '_connection_id'):
-            self._connection_id = hashlib.md5(
-                '{}{}{}'.format(self.ip, self.port, time.time()).encode('utf-8')
-            ).hexdigest()
-        print('ID: ', self._connection_id)
-        return self._connection_id
+    def request_done(self):
+        if self._paused and self._session.in_flight < WORKER_PROTOCOL_MAX_REQUESTS // 2:
+            self._paused = False
+            if not self.transport.is_closing():
+                self.transport.resume_reading()
+
+    def eof_received(self):
+        if self._parser is None:
+            self.reader.feed_eof()
+        else:
+            self.close()
+        # keep the transport open to send the replies:
+        return True
+
+    def close(self):
+        """Close the connection when all requests were replied."""
+        if self._closing:
+            return
+        self._closing = True
+        self._handler = self.loop.create_task(self._session.close())
+
+    def pause_writing(self):
+        self._writing_paused = True
+
+    def resume_writing(self):
+        self._writing_paused = False
+        waiters, self._drain_waiters = self._drain_waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    async def drain(self):
+        if self._closed.done():
+            raise ConnectionResetError('Connection lost')
+        if not self._writing_paused:
+            return
+        waiter = self.loop.create_future()
+        self._drain_waiters.append(waiter)
+        await waiter
+
+    async def wait_closed(self):
+        await asyncio.shield(self._closed)
 
     def connection_lost(self, exc):
         if exc:
-            self.logger.exception(exc)
+            self.logger.warning(
+                f"Connection with {self.peername!r} was lost: {exc}"
+            )
         self.logger.debug(
             'Server closed the Connection'
         )
+        if not self._closed.done():
+            self._closed.set_result(None)
+        for waiter in self._drain_waiters:
+            if not waiter.done():
+                waiter.set_exception(ConnectionResetError('Connection lost'))
+        self._drain_waiters.clear()
+        if self.reader is not None:
+            self.reader.feed_eof()
+        if self._session is not None:
+            # nobody is waiting for the replies:
+            self._session.cancel()
+            self.close()
         super().connection_lost(exc=exc)
-
-    def connection_made(self, transport):
-        print('Connection Made')
-        self.transport = transport
-        self.peername = transport.get_extra_info('peername')
-        self.setup(self.peername)
-        print('Connection Accepted')
-
-    def data_received(self, data):
-        pass
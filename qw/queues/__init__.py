@@ -1,3 +1,4 @@
 from .manager import QueueManager
+from .lanes import PriorityLanes
 
-__all__ = ['QueueManager']
+__all__ = ['QueueManager', 'PriorityLanes']
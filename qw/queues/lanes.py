@@ -0,0 +1,154 @@
+"""Priority Lanes of the Worker Queue.
+
+Tasks are queued on the lane of their priority (QueueWrapper.priority,
+clamped to the number of lanes, higher first), lanes are dequeued by policy:
+
+    strict: always the highest priority lane with Tasks.
+    weighted: smooth weighted round-robin between lanes with Tasks.
+
+In both policies a Task waiting more than max_wait seconds is served first,
+so lower lanes are never starved.
+"""
+import asyncio
+import time
+from collections import deque
+from qw.exceptions import ConfigError
+from ..conf import (
+    WORKER_QUEUE_SIZE,
+    WORKER_PRIORITY_LANES,
+    WORKER_PRIORITY_POLICY,
+    WORKER_PRIORITY_WEIGHTS,
+    WORKER_PRIORITY_MAX_WAIT
+)
+
+
+STRICT = 'strict'
+WEIGHTED = 'weighted'
+
+
+class TaskLanes:
+    """Lanes of Tasks (deque interface used by asyncio.Queue).
+
+    Args:
+        lanes: number of priority lanes.
+        policy: strict or weighted.
+        weights: weights of the lanes (lowest priority first).
+        max_wait: seconds a Task waits before is served first (0: never).
+    """
+    def __init__(
+        self,
+        lanes: int = WORKER_PRIORITY_LANES,
+        policy: str = WORKER_PRIORITY_POLICY,
+        weights: list = None,
+        max_wait: float = WORKER_PRIORITY_MAX_WAIT
+    ):
+        if policy not in (STRICT, WEIGHTED):
+            raise ConfigError(
+                f"Unknown Priority Policy {policy!r}, options: {STRICT}, {WEIGHTED}"
+            )
+        lanes = max(lanes, 1)
+        weights = list(weights or WORKER_PRIORITY_WEIGHTS)
+        self.policy = policy
+        self.max_wait = max_wait
+        self.weights: list = [
+            max(weights[idx], 1) if idx < len(weights) else 2 ** idx
+            for idx in range(lanes)
+        ]
+        self.lanes: list = [deque() for _ in range(lanes)]
+        self._current: list = [0] * lanes
+        ## moving average of the seconds Tasks waited on the lanes:
+        self.wait: float = 0.0
+
+    def __len__(self) -> int:
+        return sum(len(lane) for lane in self.lanes)
+
+    def __bool__(self) -> bool:
+        return any(self.lanes)
+
+    def __iter__(self):
+        for lane in reversed(self.lanes):
+            for _, task in lane:
+                yield task
+
+    def __repr__(self) -> str:
+        return f'<TaskLanes {self.policy} {self.sizes()}>'
+
+    def sizes(self) -> list:
+        """Tasks waiting on every lane (lowest priority first)."""
+        return [len(lane) for lane in self.lanes]
+
+    def lane(self, task) -> int:
+        priority = getattr(task, 'priority', 0) or 0
+        return min(max(int(priority), 0), len(self.lanes) - 1)
+
+    def append(self, task):
+        self.lanes[self.lane(task)].append((time.monotonic(), task))
+
+    def popleft(self):
+        queued, task = self.lanes[self._select()].popleft()
+        self.wait += 0.2 * ((time.monotonic() - queued) - self.wait)
+        return task
+
+    def oldest(self) -> float:
+        """Seconds the oldest Task is waiting."""
+        heads = [lane[0][0] for lane in self.lanes if lane]
+        if not heads:
+            return 0.0
+        return time.monotonic() - min(heads)
+
+    def _select(self) -> int:
+        ready = [idx for idx, lane in enumerate(self.lanes) if lane]
+        if not ready:
+            raise IndexError('pop from empty lanes')
+        if self.max_wait > 0:
+            # anti-starvation, the oldest Task waiting too much goes first:
+            oldest = min(ready, key=lambda idx: self.lanes[idx][0][0])
+            if time.monotonic() - self.lanes[oldest][0][0] > self.max_wait:
+                return oldest
+        if self.policy == STRICT or len(ready) == 1:
+            return ready[-1]
+        total = 0
+        selected = ready[-1]
+        for idx in ready:
+            self._current[idx] += self.weights[idx]
+            total += self.weights[idx]
+            if self._current[idx] > self._current[selected]:
+                selected = idx
+        self._current[selected] -= total
+        return selected
+
+
+class PriorityLanes(asyncio.Queue):
+    """asyncio.Queue with priority lanes.
+
+    Args:
+        maxsize: max number of Tasks (of all lanes).
+        lanes: number of priority lanes.
+        policy: strict or weighted.
+        weights: weights of the lanes (lowest priority first).
+        max_wait: seconds a Task waits before is served first (0: never).
+    """
+    def __init__(
+        self,
+        maxsize: int = WORKER_QUEUE_SIZE,
+        lanes: int = WORKER_PRIORITY_LANES,
+        policy: str = WORKER_PRIORITY_POLICY,
+        weights: list = None,
+        max_wait: float = WORKER_PRIORITY_MAX_WAIT
+    ):
+        self._lanes = TaskLanes(lanes, policy, weights, max_wait)
+        super().__init__(maxsize=maxsize)
+
+    def _init(self, maxsize):
+        self._queue = self._lanes
+
+    def sizes(self) -> list:
+        """Tasks waiting on every lane (lowest priority first)."""
+        return self._lanes.sizes()
+
+    def wait_time(self) -> float:
+        """Seconds Tasks are waiting (average, or the oldest if is longer)."""
+        if not self._lanes:
+            # nothing is waiting now, the average is outdated:
+            self._lanes.wait = 0.0
+        return max(self._lanes.wait, self._lanes.oldest())
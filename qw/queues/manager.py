@@ -1,4 +1,5 @@
 import asyncio
+import contextlib
 import time
 from typing import Union
 from collections.abc import Awaitable, Callable
@@ -15,12 +16,22 @@ from flowtask.exceptions import (
 from qw.exceptions import QWException
 from ..conf import (
     WORKER_QUEUE_SIZE,
-    WORKER_RETRY_INTERVAL,
     WORKER_RETRY_COUNT,
-    WORKER_QUEUE_CALLBACK
+    WORKER_QUEUE_CALLBACK,
+    WORKER_CONSUMERS_MIN,
+    WORKER_CONSUMERS_MAX,
+    WORKER_CONSUMERS_INTERVAL,
+    WORKER_CONSUMERS_MAX_WAIT,
+    WORKER_CONSUMERS_MAX_LAG,
+    WORKER_CONSUMERS_MAX_CPU,
+    WORKER_SPILL,
+    WORKER_SPILL_BATCH
 )
 from ..executor import TaskExecutor
 from ..wrappers.base import QueueWrapper
+from .lanes import PriorityLanes
+from .retry import RetryScheduler
+from .spill import SpillStore, spill_path
 
 
 class QueueManager:
@@ -30,10 +41,25 @@ class QueueManager:
     def __init__(self, worker_name: str):
         self.logger = logging.getLogger('QW.Queue')
         self.worker_name = worker_name
-        self.queue: asyncio.Queue = asyncio.Queue(
+        self.queue: PriorityLanes = PriorityLanes(
             maxsize=WORKER_QUEUE_SIZE
         )
         self.consumers: list = []
+        ## consumers waiting for a task (can be stopped safely):
+        self._idle: set = set()
+        self.min_consumers: int = max(WORKER_CONSUMERS_MIN, 1)
+        self.max_consumers: int = max(WORKER_CONSUMERS_MAX, self.min_consumers)
+        self._scaler: asyncio.Task = None
+        self._lag: float = 0.0
+        self._cpu: float = 0.0
+        ## times the pool was measured:
+        self.ticks: int = 0
+        ## failed tasks waiting for a retry:
+        self.retries: RetryScheduler = RetryScheduler(self.queue)
+        ## overflow persisted on disk (opened when consumers are started):
+        self.spill: SpillStore = None
+        self._spilled: asyncio.Event = None
+        self._drainer: asyncio.Task = None
         self.logger.debug(
             f'Started Queue Manager with size: {WORKER_QUEUE_SIZE}'
         )
@@ -66,24 +92,170 @@ class QueueManager:
             ) from ex
 
     def size(self):
+        if self.spill is not None:
+            return self.queue.qsize() + len(self.spill)
         return self.queue.qsize()
 
     def empty(self):
+        if self.spill is not None and len(self.spill):
+            return False
         return self.queue.empty()
 
     def full(self):
+        if self.spill is not None and not self.spill.full:
+            return False
         return self.queue.full()
 
+    def spilling(self) -> bool:
+        """True if new Tasks are spilled to disk (to keep their order)."""
+        return self.spill is not None and (bool(len(self.spill)) or self.queue.full())
+
+    def lanes(self) -> list:
+        """Tasks waiting on every priority lane (lowest first)."""
+        return self.queue.sizes()
+
+    def free(self) -> int:
+        """Number of Tasks that can be queued before the Queue is full."""
+        if self.queue.maxsize <= 0:
+            return 0xFFFFFFFF
+        free = max(self.queue.maxsize - self.queue.qsize(), 0)
+        if self.spill is not None:
+            free += self.spill.free()
+        return free
+
+    def pool(self) -> dict:
+        """Size of the consumer pool and the signals that adjust it."""
+        return {
+            "size": len(self.consumers),
+            "idle": len(self._idle),
+            "min": self.min_consumers,
+            "max": self.max_consumers,
+            "wait": round(self.queue.wait_time(), 3),
+            "lag": round(self._lag, 3),
+            "cpu": round(self._cpu, 3)
+        }
+
+    def add_consumer(self):
+        task = asyncio.create_task(
+            self.queue_handler()
+        )
+        self.consumers.append(task)
+
+    def remove_consumer(self) -> bool:
+        """Stop an idle consumer (busy consumers finish their Task)."""
+        if not self._idle:
+            return False
+        consumer = self._idle.pop()
+        consumer.cancel()
+        self.consumers.remove(consumer)
+        return True
+
+    async def open_spill(self):
+        """Open the disk spill (tasks of a previous run are drained)."""
+        spill = SpillStore(spill_path(self.worker_name))
+        try:
+            await spill.open()
+        except Exception as exc:  # pylint: disable=W0703
+            self.logger.error(
+                f"Unable to open Queue Spill {spill.path}: {exc}"
+            )
+            await spill.close()
+            return
+        self.spill = spill
+        self._spilled = asyncio.Event()
+        self._drainer = asyncio.create_task(self.drain_spill())
+        if len(spill):
+            self._spilled.set()
+
+    async def drain_spill(self):
+        """Move the spilled Tasks back into the Queue as room is available.
+
+        Tasks are removed from disk once queued, a Task waiting for room
+        when the drain is stopped (or fails) stays on disk.
+        """
+        while True:
+            if not len(self.spill):
+                self._spilled.clear()
+                await self._spilled.wait()
+                continue
+            room = max(self.queue.maxsize - self.queue.qsize(), 1)
+            tasks = await self.spill.peek_many(min(room, WORKER_SPILL_BATCH))
+            queued = []
+            try:
+                for seq, task in tasks:
+                    # waits until a consumer takes a Task:
+                    await self.queue.put(task)
+                    queued.append(seq)
+            finally:
+                await self.spill.remove(queued)
+
     async def fire_consumers(self):
-        """Fire up the Task consumers."""
-        for _ in range(WORKER_QUEUE_SIZE - 1):
-            task = asyncio.create_task(
-                self.queue_handler()
+        """Fire up the Task consumers (and the pool sizing)."""
+        if WORKER_SPILL is True and self.spill is None:
+            await self.open_spill()
+        for _ in range(self.min_consumers):
+            self.add_consumer()
+        if self.max_consumers > self.min_consumers:
+            self._scaler = asyncio.create_task(self.scale_consumers())
+
+    async def scale_consumers(self):
+        """Adjust the number of consumers between min and max.
+
+        Consumers are added while Tasks wait on the Queue, and removed when
+        the event loop lags, CPU is saturated or they are idle.
+        """
+        loop = asyncio.get_running_loop()
+        interval = WORKER_CONSUMERS_INTERVAL
+        while True:
+            started = loop.time()
+            cpu_started = time.process_time()
+            await asyncio.sleep(interval)
+            elapsed = loop.time() - started
+            self._lag = max(elapsed - interval, 0.0)
+            self._cpu = (time.process_time() - cpu_started) / elapsed
+            self.ticks += 1
+            # consumers failed by unhandled errors are replaced:
+            self.consumers = [c for c in self.consumers if not c.done()]
+            while len(self.consumers) < self.min_consumers:
+                self.add_consumer()
+            size = len(self.consumers)
+            overloaded = (
+                self._lag > WORKER_CONSUMERS_MAX_LAG
+                or self._cpu > WORKER_CONSUMERS_MAX_CPU
             )
-            self.consumers.append(task)
+            if overloaded:
+                if size > self.min_consumers and self.remove_consumer():
+                    self.logger.info(
+                        f'Worker is overloaded (lag {self._lag:.3f}s, '
+                        f'cpu {self._cpu:.0%}), consumers: {size - 1}'
+                    )
+            elif self.queue.wait_time() > WORKER_CONSUMERS_MAX_WAIT:
+                if size < self.max_consumers:
+                    self.add_consumer()
+                    self.logger.info(
+                        f'Tasks are waiting {self.queue.wait_time():.3f}s, '
+                        f'consumers: {size + 1}'
+                    )
+            elif self.queue.empty() and len(self._idle) > 1:
+                if size > self.min_consumers:
+                    self.remove_consumer()
 
     async def empty_queue(self):
         """Processing and shutting down the Queue."""
+        if self._scaler is not None:
+            self._scaler.cancel()
+            self._scaler = None
+        if self._drainer is not None:
+            self._drainer.cancel()
+            # the Tasks already queued are removed from disk:
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._drainer
+            self._drainer = None
+        if self.spill is not None:
+            # spilled tasks are kept on disk for the next start:
+            await self.spill.close()
+            self.spill = None
+        self.retries.clear()
         while not self.queue.empty():
             self.queue.get_nowait()
             self.queue.task_done()
@@ -103,6 +275,13 @@ class QueueManager:
             task (QueueWrapper): an instance of QueueWrapper
         """
         try:
+            if self.spilling():
+                await self.spill.push(task)
+                self._spilled.set()
+                self.logger.info(
+                    f'Task {task!s} with id {id} was spilled to disk at {int(time.time())}'
+                )
+                return True
             self.queue.put_nowait(task)
             await asyncio.sleep(.1)
             self.logger.info(
@@ -116,6 +295,38 @@ class QueueManager:
             )
             raise
 
+    async def put_many(self, tasks: list) -> int:
+        """put_many.
+
+            Add a Batch of Tasks into the Queue in one step.
+        Args:
+            tasks (list): a list of QueueWrapper instances.
+        Returns:
+            int: number of tasks queued, the remaining tasks were discarded.
+        """
+        queued = 0
+        for task in tasks:
+            if self.spilling():
+                break
+            try:
+                self.queue.put_nowait(task)
+            except asyncio.queues.QueueFull:
+                break
+            queued += 1
+        if queued < len(tasks) and self.spill is not None:
+            spilled = await self.spill.push_many(tasks[queued:])
+            if spilled:
+                self._spilled.set()
+            queued += spilled
+        if queued < len(tasks):
+            self.logger.error(
+                f"Worker Queue is Full, discarding {len(tasks) - queued} Tasks"
+            )
+        self.logger.info(
+            f'Batch of {queued} Tasks was queued at {int(time.time())}'
+        )
+        return queued
+
     async def get(self) -> QueueWrapper:
         """get.
 
@@ -131,9 +342,14 @@ class QueueManager:
 
     async def queue_handler(self):
         """Method for handling the tasks received by the connection handler."""
+        consumer = asyncio.current_task()
         while True:
             result = None
-            task = await self.queue.get()
+            self._idle.add(consumer)
+            try:
+                task = await self.queue.get()
+            finally:
+                self._idle.discard(consumer)
             self.logger.info(
                 f"Task started {task} on {self.worker_name}"
             )
@@ -157,13 +373,12 @@ class QueueManager:
                     if task.retry() is True:  # task was marked to retry
                         if task.retries < WORKER_RETRY_COUNT - 1:
                             task.add_retries()
+                            # queued again when is due, consumer goes on:
+                            delay = self.retries.schedule(task)
                             self.logger.warning(
-                                f"Task {task} failed. Retrying. Retry count: {task.retries}"
+                                f"Task {task} failed. Retrying in {delay:.1f} seconds. "
+                                f"Retry count: {task.retries}"
                             )
-                            # Wait some seconds before retrying.
-                            await asyncio.sleep(WORKER_RETRY_INTERVAL)
-                            await self.queue.put(task)
-                            await asyncio.sleep(0.1)
                         else:
                             cnt = WORKER_RETRY_COUNT
                             self.logger.warning(
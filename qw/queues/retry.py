@@ -0,0 +1,111 @@
+"""Delayed Retries of the Worker Queue.
+
+Failed Tasks are kept on a timer heap until their retry is due, then are
+put again on the Queue: consumers don't wait for the retry delay.
+
+The delay grows exponentially with the retries of the Task (from interval
+to max_interval), with a random jitter.
+"""
+import asyncio
+import heapq
+import itertools
+import random
+from navconfig.logging import logging
+from ..conf import (
+    WORKER_RETRY_INTERVAL,
+    WORKER_RETRY_MAX_INTERVAL,
+    WORKER_RETRY_JITTER
+)
+from ..wrappers.base import QueueWrapper
+
+
+class RetryScheduler:
+    """Timer heap of the Tasks waiting for a retry.
+
+    Args:
+        queue: Queue where the Tasks are put when their retry is due.
+        interval: seconds before the first retry.
+        max_interval: max seconds before a retry.
+        jitter: random variation of the delay (0.2: +/- 20%).
+    """
+    def __init__(
+        self,
+        queue: asyncio.Queue,
+        interval: float = WORKER_RETRY_INTERVAL,
+        max_interval: float = WORKER_RETRY_MAX_INTERVAL,
+        jitter: float = WORKER_RETRY_JITTER
+    ):
+        self.queue = queue
+        self.interval = interval
+        self.max_interval = max_interval
+        self.jitter = jitter
+        self._heap: list = []
+        self._seq = itertools.count()
+        self._timer: asyncio.TimerHandle = None
+        self.logger = logging.getLogger('QW.Retry')
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def __repr__(self) -> str:
+        return f'<RetryScheduler pending={len(self._heap)}>'
+
+    def delay(self, retries: int) -> float:
+        """Seconds before the retry number ``retries`` (starting at 1)."""
+        delay = self.interval * (2 ** max(retries - 1, 0))
+        if self.jitter:
+            delay *= random.uniform(1 - self.jitter, 1 + self.jitter)
+        return min(max(delay, 0), self.max_interval)
+
+    def schedule(self, task: QueueWrapper, delay: float = None) -> float:
+        """Put the Task on the Queue again after a delay.
+
+        Returns:
+            seconds until the retry.
+        """
+        if delay is None:
+            delay = self.delay(task.retries)
+        loop = asyncio.get_running_loop()
+        heapq.heappush(self._heap, (loop.time() + delay, next(self._seq), task))
+        self._arm(loop)
+        return delay
+
+    def _arm(self, loop: asyncio.AbstractEventLoop):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._heap:
+            self._timer = loop.call_at(self._heap[0][0], self._fire, loop)
+
+    def _fire(self, loop: asyncio.AbstractEventLoop):
+        self._timer = None
+        now = loop.time()
+        delayed = []
+        while self._heap and self._heap[0][0] <= now:
+            _, _, task = heapq.heappop(self._heap)
+            try:
+                self.queue.put_nowait(task)
+                self.logger.info(
+                    f'Retrying Task {task!s} (retry {task.retries})'
+                )
+            except asyncio.QueueFull:
+                delayed.append(task)
+        for task in delayed:
+            # queue is full, try again later:
+            heapq.heappush(
+                self._heap, (now + self.delay(1), next(self._seq), task)
+            )
+        self._arm(loop)
+
+    def clear(self) -> int:
+        """Discard the pending retries.
+
+        Returns:
+            number of Tasks discarded.
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        discarded = len(self._heap)
+        self._heap.clear()
+        return discarded
@@ -0,0 +1,192 @@
+"""Disk Spill of the Worker Queue.
+
+Tasks arriving when the Queue is full are persisted on a local SQLite file
+instead of being discarded, then are drained back into the Queue (highest
+priority first, then by arrival) as the consumers free up room.
+
+SQLite is used from a single thread, the event loop never waits for disk.
+Tasks are removed from disk only once they are in the Queue, Tasks still on
+disk when the Worker stops are recovered on the next start. The file is
+loaded with cloudpickle, so it must be in a private directory and owned by
+the Worker user.
+"""
+import asyncio
+import os
+import re
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+import cloudpickle
+from navconfig.logging import logging
+from ..utils import private_dir, owned_by_user
+from ..conf import (
+    WORKER_SPILL_DIR,
+    WORKER_SPILL_MAX_TASKS
+)
+from ..wrappers.base import QueueWrapper
+
+
+def spill_path(worker_name: str) -> str:
+    name = re.sub(r'[^\w.-]', '_', worker_name)
+    return os.path.join(WORKER_SPILL_DIR, f'qw-{name}.spill.db')
+
+
+class SpillStore:
+    """Tasks spilled to disk (SQLite).
+
+    Args:
+        path: SQLite file.
+        max_tasks: max number of Tasks on disk.
+    """
+    def __init__(self, path: str, max_tasks: int = WORKER_SPILL_MAX_TASKS):
+        self.path = path
+        self.max_tasks = max_tasks
+        self.logger = logging.getLogger('QW.Spill')
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix='QW.Spill'
+        )
+        self._conn: sqlite3.Connection = None
+        self._pending: int = 0
+        self.spilled: int = 0
+
+    def __len__(self) -> int:
+        return self._pending
+
+    def __repr__(self) -> str:
+        return f'<SpillStore {self.path} pending={self._pending}>'
+
+    @property
+    def full(self) -> bool:
+        return self._pending >= self.max_tasks
+
+    def free(self) -> int:
+        return max(self.max_tasks - self._pending, 0)
+
+    async def _call(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
+
+    def _open(self) -> int:
+        private_dir(os.path.dirname(self.path))
+        if os.path.exists(self.path) and not owned_by_user(self.path):
+            raise PermissionError(
+                f"Spill {self.path} is owned by another user"
+            )
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS tasks ('
+            'seq INTEGER PRIMARY KEY AUTOINCREMENT, '
+            'priority INTEGER NOT NULL, '
+            'payload BLOB NOT NULL)'
+        )
+        conn.execute(
+            'CREATE INDEX IF NOT EXISTS tasks_order ON tasks (priority DESC, seq)'
+        )
+        conn.commit()
+        self._conn = conn
+        count, = conn.execute('SELECT COUNT(*) FROM tasks').fetchone()
+        return count
+
+    async def open(self):
+        self._pending = await self._call(self._open)
+        if self._pending:
+            self.logger.notice(
+                f'Recovered {self._pending} Tasks spilled on {self.path}'
+            )
+
+    def _insert(self, rows: list):
+        self._conn.executemany(
+            'INSERT INTO tasks (priority, payload) VALUES (?, ?)', rows
+        )
+        self._conn.commit()
+
+    async def push_many(self, tasks: list) -> int:
+        """Persist Tasks while there is room.
+
+        Returns:
+            number of Tasks spilled, the remaining tasks were discarded.
+        """
+        tasks = tasks[:self.free()]
+        if not tasks:
+            return 0
+        rows = [
+            (int(getattr(task, 'priority', 0) or 0), cloudpickle.dumps(task))
+            for task in tasks
+        ]
+        # room is reserved before writing:
+        self._pending += len(rows)
+        try:
+            await self._call(self._insert, rows)
+        except Exception:
+            self._pending -= len(rows)
+            raise
+        self.spilled += len(rows)
+        return len(rows)
+
+    async def push(self, task: QueueWrapper):
+        """Persist a Task, raises QueueFull if there is no room."""
+        if not await self.push_many([task]):
+            raise asyncio.QueueFull(
+                f"Spill {self.path} is Full"
+            )
+
+    def _peek(self, limit: int) -> list:
+        return self._conn.execute(
+            'SELECT seq, payload FROM tasks ORDER BY priority DESC, seq LIMIT ?',
+            (limit,)
+        ).fetchall()
+
+    def _delete(self, seqs: list):
+        self._conn.executemany(
+            'DELETE FROM tasks WHERE seq = ?', [(seq,) for seq in seqs]
+        )
+        self._conn.commit()
+
+    async def peek_many(self, limit: int) -> list:
+        """Next Tasks to be queued, kept on disk until they are removed.
+
+        Returns:
+            list of (seq, task), seq identifies the Task on remove().
+        """
+        if not self._pending:
+            return []
+        rows = await self._call(self._peek, limit)
+        tasks = []
+        broken = []
+        for seq, payload in rows:
+            try:
+                tasks.append((seq, cloudpickle.loads(payload)))
+            except Exception as exc:  # pylint: disable=W0703
+                self.logger.error(
+                    f"Discarding spilled Task, unable to load: {exc}"
+                )
+                broken.append(seq)
+        await self.remove(broken)
+        return tasks
+
+    async def remove(self, seqs: list):
+        """Remove Tasks (already queued) from disk."""
+        if not seqs:
+            return
+        await self._call(self._delete, seqs)
+        self._pending -= len(seqs)
+
+    async def pop_many(self, limit: int) -> list:
+        """Remove (and return) the next Tasks to be queued."""
+        tasks = await self.peek_many(limit)
+        await self.remove([seq for seq, _ in tasks])
+        return [task for _, task in tasks]
+
+    async def close(self):
+        if self._conn is not None:
+            await self._call(self._conn.close)
+            self._conn = None
+        self._executor.shutdown(wait=False)
+
+    def to_dict(self) -> dict:
+        return {
+            "pending": self._pending,
+            "max_tasks": self.max_tasks,
+            "spilled": self.spilled
+        }
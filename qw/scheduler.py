@@ -0,0 +1,311 @@
+"""QueueWorker Client Scheduling.
+
+Strategies used by QClient to select the Worker of every call, fed by the
+requests in flight and latencies seen by the client and by the capacity
+advertised by the Workers (handshake and health checks).
+
+Calls with a routing key are sent to the same Worker instead (affinity),
+using a consistent-hash ring.
+"""
+import bisect
+import hashlib
+import itertools
+import random
+import time
+from typing import Optional, Union
+from contextlib import contextmanager
+from collections import defaultdict, deque, OrderedDict
+from qw.exceptions import ConfigError
+from .conf import (
+    WORKER_SCHEDULER_EWMA_DECAY,
+    WORKER_SCHEDULER_HEALTH_TTL,
+    WORKER_HASH_REPLICAS,
+    WORKER_HEDGE_MIN_SAMPLES,
+    WORKER_HEDGE_SAMPLES,
+    WORKER_HEDGE_FUNCTIONS
+)
+from .frames import WorkerCapacity
+
+
+class WorkerStats:
+    """Requests in flight, latency (EWMA) and capacity of every Worker.
+
+    Args:
+        decay: weight of the last latency in the moving average.
+    """
+    def __init__(self, decay: float = WORKER_SCHEDULER_EWMA_DECAY):
+        self.decay = decay
+        self.in_flight: dict = defaultdict(int)
+        self.latency: dict = {}
+        self.errors: dict = defaultdict(int)
+        self.capacity: dict = {}
+        ## recent latencies of the calls run (hedged calls), by function:
+        self.samples: OrderedDict = OrderedDict()
+
+    @contextmanager
+    def track(self, worker: tuple, timed: bool = True, key: str = None):
+        """Count a request in flight and their latency.
+
+        Requests not comparable with a single call (batches, streams) are
+        not timed, only counted while are in flight. The latency of calls
+        with a key (the function run) is also kept for hedging.
+        """
+        self.in_flight[worker] += 1
+        started = time.monotonic()
+        try:
+            yield
+        except Exception:
+            self.errors[worker] += 1
+            raise
+        else:
+            if timed:
+                self.observe(worker, time.monotonic() - started, key)
+        finally:
+            self.in_flight[worker] -= 1
+
+    def observe(self, worker: tuple, elapsed: float, key: str = None):
+        if key is not None:
+            self.add_sample(key, elapsed)
+        if (latency := self.latency.get(worker)) is None:
+            self.latency[worker] = elapsed
+        else:
+            self.latency[worker] = latency + self.decay * (elapsed - latency)
+
+    def add_sample(self, key: str, elapsed: float):
+        try:
+            samples = self.samples[key]
+            self.samples.move_to_end(key)
+        except KeyError:
+            samples = self.samples[key] = deque(maxlen=WORKER_HEDGE_SAMPLES)
+            if len(self.samples) > WORKER_HEDGE_FUNCTIONS:
+                self.samples.popitem(last=False)
+        samples.append(elapsed)
+
+    def percentile(self, percent: float, key: str) -> Optional[float]:
+        """Percentile of the recent latencies of a function.
+
+        None if there are a few latencies of the function.
+        """
+        samples = self.samples.get(key)
+        if samples is None or len(samples) < max(WORKER_HEDGE_MIN_SAMPLES, 1):
+            return None
+        samples = sorted(samples)
+        idx = min(int(len(samples) * percent / 100), len(samples) - 1)
+        return samples[idx]
+
+    def set_capacity(self, worker: tuple, capacity: WorkerCapacity):
+        self.capacity[worker] = capacity
+
+    def get_capacity(self, worker: tuple) -> Optional[WorkerCapacity]:
+        """Capacity advertised by worker, if is recent."""
+        capacity = self.capacity.get(worker)
+        if capacity is None or capacity.age() > WORKER_SCHEDULER_HEALTH_TTL:
+            return None
+        return capacity
+
+    def outstanding(self, worker: tuple) -> int:
+        """Requests in flight of this client plus Tasks busy on the Worker."""
+        pending = self.in_flight[worker]
+        if (capacity := self.get_capacity(worker)) is not None:
+            pending += capacity.active + capacity.queued
+        return pending
+
+    def to_dict(self) -> dict:
+        workers = set(self.in_flight) | set(self.latency) | set(self.capacity)
+        return {
+            worker: {
+                "in_flight": self.in_flight[worker],
+                "latency": self.latency.get(worker),
+                "errors": self.errors[worker],
+                "capacity": repr(self.capacity.get(worker))
+            } for worker in workers
+        }
+
+
+class Scheduler:
+    """Base Scheduling Strategy.
+
+    Args:
+        stats: statistics of the Workers kept by client.
+    """
+    name: str = None
+
+    def __init__(self, stats: WorkerStats):
+        self.stats = stats
+
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__}>'
+
+    def candidates(self, workers: list, exclude: set = None) -> list:
+        if exclude:
+            available = [w for w in workers if w not in exclude]
+            if available:
+                return available
+        return list(workers)
+
+    def select(self, workers: list, exclude: set = None) -> Optional[tuple]:
+        raise NotImplementedError()
+
+
+class RoundRobin(Scheduler):
+    """Cycle over the Workers."""
+    name: str = 'round_robin'
+
+    def __init__(self, stats: WorkerStats):
+        super().__init__(stats)
+        self._counter = itertools.count()
+
+    def select(self, workers: list, exclude: set = None) -> Optional[tuple]:
+        if not workers:
+            return None
+        for _ in range(len(workers)):
+            worker = workers[next(self._counter) % len(workers)]
+            if not exclude or worker not in exclude:
+                return worker
+        return worker
+
+
+class LeastOutstanding(Scheduler):
+    """Worker with less requests in flight (ties are broken randomly)."""
+    name: str = 'least_outstanding'
+
+    def select(self, workers: list, exclude: set = None) -> Optional[tuple]:
+        candidates = self.candidates(workers, exclude)
+        if not candidates:
+            return None
+        random.shuffle(candidates)
+        return min(candidates, key=self.stats.outstanding)
+
+
+class PowerOfTwoChoices(Scheduler):
+    """Pick two Workers at random, use the less loaded one."""
+    name: str = 'p2c'
+
+    def select(self, workers: list, exclude: set = None) -> Optional[tuple]:
+        candidates = self.candidates(workers, exclude)
+        if len(candidates) < 2:
+            return candidates[0] if candidates else None
+        first, second = random.sample(candidates, 2)
+        if self.stats.outstanding(second) < self.stats.outstanding(first):
+            return second
+        return first
+
+
+class EWMALatency(Scheduler):
+    """Worker with lowest latency (EWMA) weighted by their requests in flight.
+
+    Workers without latency yet are tried first.
+    """
+    name: str = 'ewma'
+
+    def cost(self, worker: tuple) -> float:
+        latency = self.stats.latency.get(worker)
+        if latency is None:
+            return 0.0
+        return latency * (self.stats.outstanding(worker) + 1)
+
+    def select(self, workers: list, exclude: set = None) -> Optional[tuple]:
+        candidates = self.candidates(workers, exclude)
+        if not candidates:
+            return None
+        random.shuffle(candidates)
+        return min(candidates, key=self.cost)
+
+
+class HashRing:
+    """Consistent-hash ring of Workers, with virtual nodes.
+
+    Only the keys owned by a Worker are moved when it joins or leaves.
+
+    Args:
+        workers: initial list of Workers.
+        replicas: virtual nodes of every Worker.
+    """
+    def __init__(self, workers: list = None, replicas: int = WORKER_HASH_REPLICAS):
+        self.replicas = max(replicas, 1)
+        self._hashes: list = []
+        self._nodes: list = []
+        self._workers: set = set()
+        for worker in workers or []:
+            self.add(worker)
+
+    def __len__(self) -> int:
+        return len(self._workers)
+
+    def __contains__(self, worker: tuple) -> bool:
+        return worker in self._workers
+
+    @property
+    def workers(self) -> set:
+        return set(self._workers)
+
+    @staticmethod
+    def hash(key: Union[str, bytes]) -> int:
+        if isinstance(key, str):
+            key = key.encode('utf-8')
+        return int.from_bytes(
+            hashlib.blake2b(key, digest_size=8).digest(), 'big'
+        )
+
+    def add(self, worker: tuple):
+        if worker in self._workers:
+            return
+        self._workers.add(worker)
+        name = ':'.join(str(part) for part in worker)
+        for replica in range(self.replicas):
+            point = self.hash(f'{name}#{replica}')
+            idx = bisect.bisect(self._hashes, point)
+            self._hashes.insert(idx, point)
+            self._nodes.insert(idx, worker)
+
+    def remove(self, worker: tuple):
+        if worker not in self._workers:
+            return
+        self._workers.discard(worker)
+        nodes = [
+            (point, node) for point, node in zip(self._hashes, self._nodes)
+            if node != worker
+        ]
+        self._hashes = [point for point, _ in nodes]
+        self._nodes = [node for _, node in nodes]
+
+    def update(self, workers: list):
+        """Add the new Workers and remove the missing ones."""
+        workers = set(workers)
+        if workers == self._workers:
+            return
+        for worker in self._workers - workers:
+            self.remove(worker)
+        for worker in workers - self._workers:
+            self.add(worker)
+
+    def get(self, key: Union[str, bytes], exclude: set = None) -> Optional[tuple]:
+        """Worker owning the key (the next one on the ring if excluded)."""
+        if not self._nodes:
+            return None
+        start = bisect.bisect(self._hashes, self.hash(key))
+        total = len(self._nodes)
+        for offset in range(total):
+            worker = self._nodes[(start + offset) % total]
+            if not exclude or worker not in exclude:
+                return worker
+        return None
+
+
+SCHEDULERS: dict = {
+    scheduler.name: scheduler for scheduler in (
+        RoundRobin, LeastOutstanding, PowerOfTwoChoices, EWMALatency
+    )
+}
+
+
+def get_scheduler(scheduler: Union[str, type], stats: WorkerStats) -> Scheduler:
+    """Return an instance of an Scheduler (by name or class)."""
+    if isinstance(scheduler, str):
+        try:
+            scheduler = SCHEDULERS[scheduler]
+        except KeyError as ex:
+            raise ConfigError(
+                f"Unknown Scheduler {scheduler!r}, options: {', '.join(SCHEDULERS)}"
+            ) from ex
+    return scheduler(stats)
@@ -0,0 +1,161 @@
+"""QueueWorker Serializer.
+
+cloudpickle serialization using pickle protocol 5, large contiguous buffers
+(NumPy arrays, pandas blocks, bytes) are extracted out-of-band and sent as
+separate parts of the payload, then rebuilt over the received buffer
+without copies.
+
+Payload with out-of-band buffers:
+
+    count (4 bytes) | lengths (8 bytes * (count + 1)) | pickle | buffers
+
+Functions can be sent by reference: the call carries the digest of the
+pickled function (and the pickled function itself only when the Worker
+doesn't have it), followed by the wrapper without the function:
+
+    digest (16 bytes) | code length (4 bytes) | code | wrapper
+"""
+import copy
+import hashlib
+import pickle
+import struct
+from typing import Any, Optional, Union
+from collections import OrderedDict
+from collections.abc import Callable
+import cloudpickle
+from .conf import WORKER_OOB_MIN_SIZE, WORKER_FUNCTION_CACHE_SIZE
+
+
+BUFFERS_COUNT = struct.Struct('!I')
+CALL_HEADER = struct.Struct('!16sI')
+
+
+def dumps(obj: Any, out_of_band: bool = True) -> Union[bytes, list]:
+    """Serialize an object.
+
+    Returns:
+        bytes, or a list of parts (header, pickle and buffers) when
+        buffers were extracted out-of-band.
+    """
+    if out_of_band is False:
+        return cloudpickle.dumps(obj)
+    buffers = []
+
+    def buffer_callback(buffer: pickle.PickleBuffer) -> bool:
+        try:
+            view = buffer.raw()
+        except BufferError:
+            # non-contiguous buffer, serialized in-band
+            return True
+        if view.nbytes < WORKER_OOB_MIN_SIZE:
+            return True
+        buffers.append(view)
+        return False
+
+    data = cloudpickle.dumps(
+        obj, protocol=5, buffer_callback=buffer_callback
+    )
+    if not buffers:
+        return data
+    lengths = struct.pack(
+        f'!{len(buffers) + 1}Q', len(data), *[b.nbytes for b in buffers]
+    )
+    return [BUFFERS_COUNT.pack(len(buffers)) + lengths, data, *buffers]
+
+
+def loads(payload: Union[bytes, bytearray], out_of_band: bool = False) -> Any:
+    """Deserialize a payload, rebuilding out-of-band buffers over it."""
+    if not out_of_band:
+        return cloudpickle.loads(payload)
+    view = memoryview(payload)
+    count, = BUFFERS_COUNT.unpack_from(view, 0)
+    offset = BUFFERS_COUNT.size
+    lengths = struct.unpack_from(f'!{count + 1}Q', view, offset)
+    offset += 8 * (count + 1)
+    parts = []
+    for length in lengths:
+        parts.append(view[offset:offset + length])
+        offset += length
+    data, *buffers = parts
+    return pickle.loads(data, buffers=buffers)
+
+
+def function_digest(code: bytes) -> bytes:
+    return hashlib.blake2b(code, digest_size=16).digest()
+
+
+def dump_function(func: Callable) -> tuple:
+    """Pickle a function.
+
+    Returns:
+        tuple of (digest, code) of the pickled function.
+    """
+    code = cloudpickle.dumps(func)
+    return function_digest(code), code
+
+
+def dumps_call(wrapper: Any, digest: bytes, code: bytes = b'') -> Union[bytes, list]:
+    """Serialize a FuncWrapper without their function."""
+    call = copy.copy(wrapper)
+    call.func = None
+    header = CALL_HEADER.pack(digest, len(code)) + code
+    data = dumps(call)
+    if isinstance(data, list):
+        return [header, *data]
+    return header + data
+
+
+def loads_call(payload: Union[bytes, bytearray], out_of_band: bool = False) -> tuple:
+    """Deserialize a call sent with dumps_call.
+
+    Returns:
+        tuple of (digest, code, wrapper), code is empty if was not sent.
+    """
+    view = memoryview(payload)
+    digest, size = CALL_HEADER.unpack_from(view, 0)
+    offset = CALL_HEADER.size
+    code = view[offset:offset + size]
+    wrapper = loads(view[offset + size:], out_of_band)
+    return digest, code, wrapper
+
+
+class FunctionCache:
+    """LRU of deserialized functions, keyed by digest of their pickled code."""
+    def __init__(self, max_size: int = WORKER_FUNCTION_CACHE_SIZE):
+        self.max_size = max_size
+        self._functions: OrderedDict = OrderedDict()
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def __len__(self) -> int:
+        return len(self._functions)
+
+    def get(self, digest: bytes) -> Optional[Callable]:
+        try:
+            func = self._functions[digest]
+        except KeyError:
+            self.misses += 1
+            return None
+        self._functions.move_to_end(digest)
+        self.hits += 1
+        return func
+
+    def load(self, digest: bytes, code: bytes) -> Callable:
+        """Deserialize (and remember) a function sent by client."""
+        if function_digest(code) != digest:
+            raise ValueError(
+                "Function code doesn't match their digest"
+            )
+        func = cloudpickle.loads(code)
+        self._functions[digest] = func
+        if len(self._functions) > self.max_size:
+            self._functions.popitem(last=False)
+        return func
+
+    def to_dict(self) -> dict:
+        return {
+            "size": len(self._functions),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses
+        }
@@ -3,12 +3,15 @@ import os
 import time
 import socket
 import uuid
+import struct
 import base64
 import asyncio
 import inspect
 import random
+import itertools
 from typing import Any
-from collections.abc import Callable
+from collections.abc import Callable, Iterator
+from functools import partial
 import multiprocessing as mp
 import cloudpickle
 from navconfig.logging import logging
@@ -17,35 +20,222 @@ from qw.exceptions import (
     ParserError,
     DiscardedTask
 )
-from qw.utils import make_signature
+from qw.utils import make_signature, unix_socket_path, private_dir
 from redis import asyncio as aioredis
 from redis.exceptions import ResponseError
 from .conf import (
     WORKER_DEFAULT_HOST,
     WORKER_DEFAULT_PORT,
-    WORKER_DEFAULT_QTY,
     expected_message,
     WORKER_SECRET_KEY,
     REDIS_WORKER_STREAM,
     REDIS_WORKER_GROUP,
     WORKER_USE_STREAMS,
     WORKER_REDIS,
-    WORKER_QUEUE_SIZE
+    WORKER_SESSION_TTL,
+    WORKER_STATIC_SIGNATURE,
+    WORKER_MAX_PAYLOAD_SIZE,
+    WORKER_COMPRESSION,
+    WORKER_COMPRESSION_THRESHOLD,
+    WORKER_UNIX_SOCKET,
+    WORKER_STREAM_CHUNK_SIZE,
+    WORKER_STREAM_WINDOW,
+    WORKER_SERVER_PROTOCOL
 )
 from .utils.json import json_encoder
-from .utils.versions import get_versions
 from .utils import cPrint
 from .queues import QueueManager
 from .wrappers import (
-    QueueWrapper
+    QueueWrapper,
+    FuncWrapper
 )
 from .executor import TaskExecutor
+from .status import WorkerStatus
+from .protocols import QueueProtocol
+from .auth import (
+    AUTH_PREFIX,
+    RESUME_PREFIX,
+    SESSION_EXPIRED,
+    NONCE_SIZE,
+    PROOF_SIZE,
+    TICKET_SIZE,
+    make_nonce,
+    secret_key,
+    new_ticket,
+    ticket_expiration,
+    derive_session_key,
+    verify_proof
+)
+from .compression import CompressionStats, negotiate
+from .serializer import dumps, loads, loads_call, FunctionCache
+from .frames import (
+    FRAMED_PREFIX,
+    STREAM_MODE,
+    FRAMED_MODE,
+    FRAME_TASK,
+    FRAME_HEALTH,
+    FRAME_CHECK_STATE,
+    FRAME_CLOSE,
+    FRAME_PING,
+    FRAME_BATCH,
+    FRAME_HELLO,
+    FRAME_STREAM,
+    FRAME_CREDIT,
+    FRAME_CANCEL,
+    FRAME_CALL,
+    FRAME_PROBE,
+    FRAME_CAPACITY,
+    FLAG_COMPRESSED,
+    FLAG_ERROR,
+    FLAG_BUFFERS,
+    FLAG_MISSING,
+    READ_CHUNK_SIZE,
+    CAPACITY_OPTION,
+    WorkerCapacity,
+    FrameWriter,
+    PayloadTooLarge,
+    read_frame,
+    write_frame
+)
 
 DEFAULT_HOST = WORKER_DEFAULT_HOST
 if not DEFAULT_HOST:
     DEFAULT_HOST = socket.gethostbyname(socket.gethostname())
 
 
+class FramedSession:
+    """State of a framed connection accepted by a Worker.
+
+    Frames are handled in order as they are read, requests are dispatched
+    on their own task and the stream credits, cancellations and the
+    compression codec of the connection are tracked here. Used by both the
+    streams handler and the QueueProtocol.
+    """
+    def __init__(self, worker: "QWorker", writer: asyncio.StreamWriter):
+        self.worker = worker
+        self.writer = writer
+        self.lock = asyncio.Lock()
+        self.requests: dict = {}
+        self.credits: dict = {}
+        self.codec = None
+        ## called when a request is done.
+        self.on_done: Callable = None
+
+    @property
+    def in_flight(self) -> int:
+        return len(self.requests)
+
+    def channel(self, request_id: int, **kwargs) -> FrameWriter:
+        return FrameWriter(self.writer, request_id, self.lock, **kwargs)
+
+    def _request_done(self, request_id: int):
+        self.requests.pop(request_id, None)
+        self.credits.pop(request_id, None)
+        if self.on_done is not None:
+            self.on_done()
+
+    def spawn(self, request_id: int, coro) -> asyncio.Task:
+        task = asyncio.get_running_loop().create_task(coro)
+        self.requests[request_id] = task
+        task.add_done_callback(
+            lambda _, rid=request_id: self._request_done(rid)
+        )
+        return task
+
+    def advertise(self, task: asyncio.Task):
+        """Send the Worker capacity after a Task was handled."""
+        if task.cancelled() or self.writer.is_closing():
+            return
+        write_frame(
+            self.writer, FRAME_CAPACITY, 0, self.worker.capacity().pack()
+        )
+
+    def discard(self, exc: Exception, request_id: int = None):
+        if request_id is None:
+            request_id = getattr(exc, 'request_id', 0)
+        self.spawn(
+            request_id,
+            self.worker.discard_task(
+                f"Task discarded by {self.worker.name!s}: {exc}",
+                writer=self.channel(request_id)
+            )
+        )
+
+    def handle_frame(
+        self,
+        kind: int,
+        flags: int,
+        request_id: int,
+        payload: bytes
+    ) -> bool:
+        """Handle a frame received from client.
+
+        Returns:
+            False if the client is closing the connection.
+        """
+        if kind == FRAME_CLOSE:
+            return False
+        elif kind == FRAME_CREDIT:
+            # client consumed a chunk of a streamed reply:
+            if request_id in self.credits:
+                self.credits[request_id].release()
+            return True
+        elif kind == FRAME_CANCEL:
+            if request_id in self.requests:
+                self.requests[request_id].cancel()
+            return True
+        elif kind == FRAME_HELLO:
+            # negotiate the compression codec of this connection:
+            offered = bytes(payload).decode('utf-8').split(',')
+            self.codec = negotiate(offered, WORKER_COMPRESSION)
+            self.channel(request_id).write(
+                self.codec.name.encode('utf-8') if self.codec else b''
+            )
+            return True
+        channel = self.channel(
+            request_id,
+            codec=self.codec,
+            stats=self.worker.compression,
+            threshold=WORKER_COMPRESSION_THRESHOLD
+        )
+        if flags & FLAG_COMPRESSED:
+            try:
+                payload = self.worker.compression.decompress(
+                    self.codec, payload, WORKER_MAX_PAYLOAD_SIZE
+                )
+            except Exception as exc:  # pylint: disable=W0703
+                self.discard(
+                    f"Unable to decompress Task: {exc}", request_id
+                )
+                return True
+        if kind == FRAME_STREAM:
+            channel.credits = asyncio.Semaphore(WORKER_STREAM_WINDOW)
+            self.credits[request_id] = channel.credits
+        task = self.spawn(
+            request_id,
+            self.worker.frame_dispatch(kind, payload, channel, flags)
+        )
+        if kind in (FRAME_TASK, FRAME_CALL, FRAME_BATCH):
+            # the capacity seen by client stays fresh while is busy:
+            task.add_done_callback(self.advertise)
+        return True
+
+    def cancel(self):
+        """Cancel all requests (connection was lost)."""
+        for task in self.requests.values():
+            task.cancel()
+
+    async def close(self):
+        # nobody will consume the streamed replies:
+        for request_id in list(self.credits):
+            self.requests[request_id].cancel()
+        if self.requests:
+            await asyncio.gather(
+                *self.requests.values(), return_exceptions=True
+            )
+        await self.worker.closing_writer(self.writer, None)
+
+
 class QWorker:
     """Queue Task Worker server.
 
@@ -54,6 +244,8 @@ class QWorker:
         port: Port number of the server.
         loop: Event loop to run in.
         task_executor: Executor that will run tasks from clients.
+        protocol: asyncio Protocol class (instantiated with the worker for
+            every connection) used instead of StreamReader/StreamWriter.
     """
     def __init__(
             self,
@@ -77,8 +269,15 @@ class QWorker:
             self._name = mp.current_process().name
         self._loop = event_loop if event_loop else asyncio.new_event_loop()
         self._server: Callable = None
+        self._unix_server: Callable = None
+        self._unix_path: str = None
         self._pid = os.getpid()
         self._protocol = protocol
+        self.compression = CompressionStats()
+        self.functions = FunctionCache()
+        self.status: WorkerStatus = None
+        ## Tasks being executed (not queued) by this worker:
+        self._active: int = 0
         # logging:
         self.logger = logging.getLogger(
             f'QW.Server:{self._name}.{self._id}'
@@ -88,6 +287,23 @@ class QWorker:
     def name(self):
         return self._name
 
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    @property
+    def active(self) -> int:
+        """Number of Tasks being executed (not queued) by this worker."""
+        return self._active
+
+    @property
+    def unix_path(self) -> str:
+        return self._unix_path
+
+    @property
+    def serving(self) -> str:
+        return ', '.join(str(sock.getsockname()) for sock in self._server.sockets)
+
     def start_redis(self):
         self.pool = aioredis.ConnectionPool.from_url(
             WORKER_REDIS,
@@ -226,11 +442,64 @@ class QWorker:
         except asyncio.CancelledError:
             pass
 
+    async def start_unix_server(self):
+        """Starts a Unix Socket listener for clients on the same host.
+
+        The socket is created (mode 0600) in a private directory, on any
+        error the Worker keeps serving on TCP only.
+        """
+        path = unix_socket_path(self.port, self._id)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            private_dir(os.path.dirname(path))
+            try:
+                # remove a stale socket of a previous worker with same id:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            # only the owner can connect to the socket:
+            umask = os.umask(0o177)
+            try:
+                sock.bind(path)
+            finally:
+                os.umask(umask)
+            if self._protocol:
+                self._unix_server = await self._loop.create_unix_server(
+                    partial(self._protocol, self),
+                    sock=sock
+                )
+            else:
+                self._unix_server = await asyncio.start_unix_server(
+                    self.connection_handler,
+                    sock=sock
+                )
+            self._unix_path = path
+            self.logger.info(
+                f'Serving {self._name}:{self._id} on {path}, pid: {self._pid}'
+            )
+        except OSError as exc:
+            sock.close()
+            # TCP is still available, only log the error:
+            self.logger.warning(
+                f"Unable to serve on Unix Socket {path}: {exc}"
+            )
+
+    async def close_unix_server(self):
+        if not self._unix_server:
+            return
+        self._unix_server.close()
+        await self._unix_server.wait_closed()
+        try:
+            os.unlink(self._unix_path)
+        except OSError:
+            pass
+
     async def start(self):
         # Redis Service:
         self.start_redis()
         """Starts Queue Manager."""
         self.queue = QueueManager(worker_name=self._name)
+        self.status = WorkerStatus(self)
         # Subscription Manager:
         self.subscription_task = self._loop.create_task(
             self.start_subscription()
@@ -238,7 +507,7 @@ class QWorker:
         try:
             if self._protocol:
                 self._server = await self._loop.create_server(
-                    self._protocol,
+                    partial(self._protocol, self),
                     host=self.host,
                     port=self.port,
                     family=socket.AF_INET,
@@ -260,6 +529,10 @@ class QWorker:
             self.logger.info(
                 f'Serving {self._name}:{self._id} on {sock}, pid: {self._pid}'
             )
+            if WORKER_UNIX_SOCKET is True:
+                await self.start_unix_server()
+            # addresses served are known now:
+            self.status.reset()
         except Exception as err:
             raise QWException(
                 f"Error: {err}"
@@ -291,6 +564,7 @@ class QWorker:
         except KeyboardInterrupt:
             pass
         try:
+            await self.close_unix_server()
             self._server.close()
             await self._server.wait_closed()
         except RuntimeError as err:
@@ -309,6 +583,19 @@ class QWorker:
                 level='INFO'
             )
 
+    def capacity(self) -> WorkerCapacity:
+        """Free capacity of the Queue and current load of this Worker."""
+        try:
+            load = os.getloadavg()[0] / (os.cpu_count() or 1)
+        except OSError:
+            load = 0
+        return WorkerCapacity(
+            free=self.queue.free(),
+            queued=self.queue.size(),
+            active=self._active,
+            load=int(load * 1000)
+        )
+
     def check_signature(self, payload: bytes) -> bool:
         signature = make_signature(expected_message, WORKER_SECRET_KEY)
         if signature == payload:
@@ -334,47 +621,15 @@ class QWorker:
         await self.closing_writer(writer, result.encode('utf-8'))
 
     async def worker_health(self, writer: asyncio.StreamWriter):
-        addrs = ', '.join(str(sock.getsockname()) for sock in self._server.sockets)
-        status = {
-            "workers": WORKER_DEFAULT_QTY,
-            "queue": {
-                "size": self.queue.size(),
-                "full": self.queue.full(),
-                "empty": self.queue.empty(),
-                "consumers": len(self.queue.consumers)
-            },
-            "worker": {
-                "name": self.name,
-                "address": self.server_address,
-                "serving": addrs
-            }
-        }
-        await self.response_keepalive(status=status, writer=writer)
+        await self.closing_writer(writer, self.status.health())
 
     async def worker_check_state(self, writer: asyncio.StreamWriter):
         ## TODO: add last executed task
-        addrs = ', '.join(str(sock.getsockname()) for sock in self._server.sockets)
-        status = {
-            "versions": get_versions(),
-            "workers": WORKER_DEFAULT_QTY,
-            "worker": {
-                "name": self.name,
-                "address": self.server_address,
-                "serving": addrs,
-                "redis": WORKER_REDIS
-            },
-            "queue": {
-                "max_size": WORKER_QUEUE_SIZE,
-                "size": self.queue.size(),
-                "full": self.queue.full(),
-                "empty": self.queue.empty(),
-                "consumers": len(self.queue.consumers)
-            },
-        }
-        await self.response_keepalive(
-            status=status,
-            writer=writer
-        )
+        await self.closing_writer(writer, self.status.check_state())
+
+    async def worker_probe(self, writer: asyncio.StreamWriter):
+        """Binary status of the worker, for load balancers."""
+        await self.closing_writer(writer, self.status.probe())
 
     async def discard_task(self, message: str, writer: asyncio.StreamWriter):
         exc = DiscardedTask(
@@ -421,7 +676,10 @@ class QWorker:
         except asyncio.CancelledError:
             return False
         ###
-        if prefix == b'health':
+        if prefix.strip() == b'probe':
+            await self.worker_probe(writer=writer)
+            return False
+        elif prefix == b'health':
             ### sending a heartbeat
             await self.worker_health(
                 writer=writer
@@ -432,7 +690,20 @@ class QWorker:
                 writer=writer
             )
             return False
+        elif prefix.startswith((AUTH_PREFIX, RESUME_PREFIX)):
+            return await self.session_validation(
+                prefix.strip(), reader, writer
+            )
         else:
+            if WORKER_STATIC_SIGNATURE is False:
+                return await self.refuse_connection(
+                    writer, 'Static signature is disabled, Closing now.'
+                )
+            mode = STREAM_MODE
+            if prefix.startswith(FRAMED_PREFIX):
+                # client asks for a persistent (framed) connection:
+                mode = FRAMED_MODE
+                prefix = prefix[len(FRAMED_PREFIX):]
             try:
                 msglen = int(prefix)
             except ValueError:
@@ -440,35 +711,105 @@ class QWorker:
             payload = await reader.readexactly(msglen)
             if self.check_signature(payload) is False:
                 ### close transport inmediately:
-                exc = ConnectionRefusedError(
-                    'Connection unsecured, Closing now.'
-                )
-                self.logger.error(
-                    'Closing unsecured connection'
-                )
-                result = cloudpickle.dumps(exc)
-                await self.closing_writer(
-                    writer,
-                    result
-                )
-                return False
+                return await self.refuse_connection(writer)
             else:
                 # passing a "continue" signal:
                 writer.write('CONTINUE'.encode('utf-8'))
                 await writer.drain()
-                return True
+                return mode
+
+    async def refuse_connection(
+        self,
+        writer: asyncio.StreamWriter,
+        message: str = 'Connection unsecured, Closing now.'
+    ):
+        exc = ConnectionRefusedError(
+            message
+        )
+        self.logger.error(
+            'Closing unsecured connection'
+        )
+        result = cloudpickle.dumps(exc)
+        await self.closing_writer(
+            writer,
+            result
+        )
+        return False
+
+    async def session_validation(
+            self,
+            prefix: bytes,
+            reader: asyncio.StreamReader,
+            writer: asyncio.StreamWriter
+    ):
+        """Nonce-based challenge/response authentication.
+
+        Sends a fresh nonce to the client, that replies with a proof made
+        with the shared secret (full handshake) or with the key of a
+        session ticket (resumed session).
+        Clients asking for the "capacity" option (auth:<mode>:capacity)
+        receive the Worker capacity after the CONTINUE reply.
+
+        Returns:
+            the connection mode, or False if the client was refused.
+        """
+        # mode_name (with options) is signed by the client proof:
+        _, mode_name = prefix.split(b':', 1)
+        name, *options = mode_name.split(b':')
+        mode = FRAMED_MODE if name == b'framed' else STREAM_MODE
+        secret = secret_key(WORKER_SECRET_KEY)
+        nonce = make_nonce()
+        try:
+            writer.write(nonce)
+            await writer.drain()
+            if prefix.startswith(RESUME_PREFIX):
+                ticket = await reader.readexactly(TICKET_SIZE)
+                proof = await reader.readexactly(PROOF_SIZE)
+                if ticket_expiration(ticket) < time.time():
+                    await self.closing_writer(writer, SESSION_EXPIRED)
+                    return False
+                key = derive_session_key(secret, ticket)
+                if not verify_proof(proof, key, nonce, mode_name):
+                    return await self.refuse_connection(writer)
+                reply = b'CONTINUE'
+            else:
+                client_nonce = await reader.readexactly(NONCE_SIZE)
+                proof = await reader.readexactly(PROOF_SIZE)
+                if not verify_proof(proof, secret, nonce, client_nonce, mode_name):
+                    return await self.refuse_connection(writer)
+                # passing a "continue" signal and the session ticket:
+                reply = b'CONTINUE' + new_ticket(WORKER_SESSION_TTL)
+            if CAPACITY_OPTION in options:
+                reply += self.capacity().pack()
+            writer.write(reply)
+            await writer.drain()
+            return mode
+        except asyncio.IncompleteReadError as exc:
+            self.logger.error(
+                f"Incomplete Session Handshake: {exc}"
+            )
+            await self.closing_writer(writer, None)
+            return False
 
     async def _read_task(self, reader: asyncio.StreamReader):
-        serialized_task = b''
-        while True:
-            serialized_task += await reader.read(-1)
-            if reader.at_eof():
-                break
+        """Read the Task until EOF, enforcing the max payload size."""
+        serialized_task = bytearray()
+        while (chunk := await reader.read(READ_CHUNK_SIZE)):
+            serialized_task += chunk
+            if len(serialized_task) > WORKER_MAX_PAYLOAD_SIZE:
+                raise PayloadTooLarge(
+                    len(serialized_task), WORKER_MAX_PAYLOAD_SIZE
+                )
         return serialized_task
 
-    async def deserialize_task(self, serialized_task, writer: asyncio.StreamWriter):
+    async def deserialize_task(
+        self,
+        serialized_task,
+        writer: asyncio.StreamWriter,
+        out_of_band: bool = False
+    ):
         try:
-            task = cloudpickle.loads(serialized_task)
+            task = loads(serialized_task, out_of_band)
             self.logger.info(
                 f'TASK RECEIVED: {task} at {int(time.time())}'
             )
@@ -482,7 +823,45 @@ class QWorker:
             await self.closing_writer(writer, result)
             return False
 
-    async def return_result(self, writer: asyncio.StreamWriter, result, task, uid):
+    async def resolve_call(
+        self,
+        payload: bytes,
+        writer: FrameWriter,
+        out_of_band: bool = False
+    ):
+        """Rebuild a FuncWrapper sent by reference of their function.
+
+        The function is taken from the function cache, when is missing (and
+        the client didn't send their code) the client is asked for it.
+        Returns None in that case.
+        """
+        try:
+            digest, code, task = loads_call(payload, out_of_band)
+            if not isinstance(task, FuncWrapper):
+                raise RuntimeError(
+                    f"Expected a Function, received: {task!r}"
+                )
+            if code:
+                task.func = self.functions.load(digest, code)
+            elif (func := self.functions.get(digest)) is not None:
+                task.func = func
+            else:
+                writer.write(b'', FLAG_MISSING)
+                await writer.drain()
+                return None
+            self.logger.info(
+                f'TASK RECEIVED: {task} at {int(time.time())}'
+            )
+            return task
+        except (EOFError, RuntimeError, ValueError, struct.error) as ex:
+            ex = ParserError(
+                f"Error Decoding Function Call: {ex}"
+            )
+            await self.closing_writer(writer, cloudpickle.dumps(ex))
+            return False
+
+    def prepare_result(self, result, task, uid):
+        """Convert a Task result into a object that can be sent to client."""
         if result is None:
             # Not always a Task returns Value, sometimes returns None.
             result = [
@@ -492,31 +871,47 @@ class QWorker:
                     "worker": self.name
                 }
             ]
-        try:
-            if isinstance(result, BaseException):
-                try:
-                    msg = result.message
-                except Exception:
-                    msg = str(result)
-                result = {
-                    "exception": result.__class__,
-                    "error": msg
-                }
-            elif inspect.isgeneratorfunction(result) or isinstance(result, list):
-                try:
-                    result = json_encoder(list(result))
-                except (ValueError, TypeError):
-                    result = f"{result!r}"  # cannot pickle a generator object
-            result = cloudpickle.dumps(result)
-        except Exception as err:  # pylint: disable=W0703
-            error = {
-                "exception": err.__class__,
-                "error": str(err)
+        if isinstance(result, BaseException):
+            try:
+                msg = result.message
+            except Exception:
+                msg = str(result)
+            result = {
+                "exception": result.__class__,
+                "error": msg
             }
-            result = cloudpickle.dumps(error)
-            self.logger.error(
-                f'Error dumping result: {err!s}'
+        elif inspect.isgenerator(result) or isinstance(result, list):
+            try:
+                result = json_encoder(list(result))
+            except (ValueError, TypeError):
+                result = f"{result!r}"  # cannot pickle a generator object
+        return result
+
+    def dump_exception(self, err: BaseException) -> bytes:
+        """Pickle an exception, to be raised by client."""
+        try:
+            return cloudpickle.dumps(err)
+        except Exception:  # pylint: disable=W0703
+            return cloudpickle.dumps(QWException(str(err)))
+
+    def dump_error(self, err: BaseException) -> bytes:
+        error = {
+            "exception": err.__class__,
+            "error": str(err)
+        }
+        self.logger.error(
+            f'Error dumping result: {err!s}'
+        )
+        return cloudpickle.dumps(error)
+
+    async def return_result(self, writer: asyncio.StreamWriter, result, task, uid):
+        try:
+            result = dumps(
+                self.prepare_result(result, task, uid),
+                out_of_band=getattr(writer, 'out_of_band', False)
             )
+        except Exception as err:  # pylint: disable=W0703
+            result = self.dump_error(err)
         await self.closing_writer(writer, result)
 
     async def handle_queue_wrapper(
@@ -551,8 +946,7 @@ class QWorker:
             result = None
             try:
                 # executed and send result to client
-                executor = TaskExecutor(task)
-                result = await executor.run()
+                result = await self.execute_task(task)
                 return await self.return_result(writer, result, task, uid)
             except Exception as err:  # pylint: disable=W0703
                 try:
@@ -583,53 +977,40 @@ class QWorker:
             "peername"
         )
         # first time: check signature authentication of payload:
-        if not await self.signature_validation(reader, writer):
+        if not (mode := await self.signature_validation(reader, writer)):
             # await self.closing_writer(writer, None)
             return False
+        if mode == FRAMED_MODE:
+            return await self.framed_handler(reader, writer, addr)
+        return await self.stream_handler(reader, writer, addr)
+
+    async def stream_handler(
+            self,
+            reader: asyncio.StreamReader,
+            writer: asyncio.StreamWriter,
+            addr: tuple
+    ):
+        """Handler for a single Task sent over the connection (until EOF)."""
         self.logger.info(
             f"Received Data from {addr!r} to worker {self.name!s} pid: {self._pid}"
         )
         # after: deserialize Task:
-        serialized_task = await self._read_task(reader)
-        task = None
+        try:
+            serialized_task = await self._read_task(reader)
+        except PayloadTooLarge as exc:
+            return await self.discard_task(
+                f"Task discarded by {self.name!s}: {exc}", writer=writer
+            )
         result = None
+        if not serialized_task:
+            # client diverted the Task to another worker (e.g. queue is full)
+            self.logger.debug(
+                f"Connection from {addr!r} was closed without a Task"
+            )
+            await self.closing_writer(writer, None)
+            return False
         if (task := await self.deserialize_task(serialized_task, writer)):
-            try:
-                if isinstance(task, bytes):
-                    await self.worker_check_state(
-                        writer=writer
-                    )
-                    return False
-                try:
-                    task_uuid = task.id if task.id else uuid.uuid1(
-                        node=random.getrandbits(48) | 0x010000000000
-                    )
-                except AttributeError:
-                    task_uuid = uuid.uuid1(
-                        node=random.getrandbits(48) | 0x010000000000
-                    )
-                if isinstance(task, QueueWrapper):
-                    return await self.handle_queue_wrapper(task, task_uuid, writer)
-                elif callable(task):
-                    executor = TaskExecutor(task)
-                    result = await executor.run()
-                    return await self.return_result(writer, result, task, task_uuid)
-                else:
-                    # put work in Queue:
-                    try:
-                        await self.queue.put(task, id=task_uuid)
-                        result = f'Task {task!s} was Queued.'.encode('utf-8')
-                        return await self.return_result(writer, result, task, task_uuid)
-                    except asyncio.QueueFull as exc:
-                        return await self.queue_full(
-                            message=f'Queue Full, Task {task!s} was discarded',
-                            writer=writer
-                        )
-            except Exception as exc:
-                self.logger.exception(exc, stack_info=True)
-                result = f'Task {task!s} Error'
-                await self.closing_writer(writer, result)
-                raise
+            return await self.process_task(task, writer)
         else:
             self.logger.error(
                 f'No Task was received, received: {serialized_task}'
@@ -637,6 +1018,271 @@ class QWorker:
             await self.closing_writer(writer, result)
             return False
 
+    def get_task_uuid(self, task: Any) -> uuid.UUID:
+        try:
+            return task.id if task.id else uuid.uuid1(
+                node=random.getrandbits(48) | 0x010000000000
+            )
+        except AttributeError:
+            return uuid.uuid1(
+                node=random.getrandbits(48) | 0x010000000000
+            )
+
+    async def process_task(self, task: Any, writer: asyncio.StreamWriter):
+        """Run or Queue a deserialized Task, sending the result to writer."""
+        result = None
+        try:
+            if isinstance(task, bytes):
+                await self.worker_check_state(
+                    writer=writer
+                )
+                return False
+            task_uuid = self.get_task_uuid(task)
+            if isinstance(task, QueueWrapper):
+                return await self.handle_queue_wrapper(task, task_uuid, writer)
+            elif callable(task):
+                result = await self.execute_task(task)
+                return await self.return_result(writer, result, task, task_uuid)
+            else:
+                # put work in Queue:
+                try:
+                    await self.queue.put(task, id=task_uuid)
+                    result = f'Task {task!s} was Queued.'.encode('utf-8')
+                    return await self.return_result(writer, result, task, task_uuid)
+                except asyncio.QueueFull:
+                    return await self.queue_full(
+                        message=f'Queue Full, Task {task!s} was discarded',
+                        writer=writer
+                    )
+        except Exception as exc:
+            self.logger.exception(exc, stack_info=True)
+            result = f'Task {task!s} Error'.encode('utf-8')
+            await self.closing_writer(writer, result)
+            raise
+
+    async def execute_task(self, task: Any) -> Any:
+        """Run a Task, counted as active while is executed."""
+        executor = TaskExecutor(task)
+        self._active += 1
+        try:
+            return await executor.run()
+        finally:
+            self._active -= 1
+
+    async def handle_batch(self, tasks: list, writer: asyncio.StreamWriter):
+        """Run or Queue a Batch of Tasks received in a single payload.
+
+        Queued Tasks are put into the Queue Manager in one step, the others
+        are executed concurrently. Results are returned in the same order.
+        """
+        results: list = [None] * len(tasks)
+        queued: list = []
+        running: list = []
+        for idx, task in enumerate(tasks):
+            task_uuid = self.get_task_uuid(task)
+            if isinstance(task, QueueWrapper) and task.queued is True:
+                task.debug = self.debug
+                task.id = task_uuid
+                queued.append((idx, task))
+            else:
+                running.append((idx, task, task_uuid))
+        if queued:
+            accepted = await self.queue.put_many([t for _, t in queued])
+            for num, (idx, task) in enumerate(queued):
+                if num < accepted:
+                    results[idx] = f'Task {task!s} with id {task.id} was queued.'.encode('utf-8')
+                else:
+                    results[idx] = asyncio.QueueFull(
+                        f"Queue in {self.name!s} is Full, discarding Task {task!r}"
+                    )
+        if running:
+            outcomes = await asyncio.gather(
+                *[self.execute_task(task) for _, task, _ in running]
+            )
+            for (idx, task, task_uuid), result in zip(running, outcomes):
+                try:
+                    results[idx] = self.prepare_result(result, task, task_uuid)
+                except Exception as err:  # pylint: disable=W0703
+                    results[idx] = err
+        out_of_band = getattr(writer, 'out_of_band', False)
+        try:
+            result = dumps(results, out_of_band=out_of_band)
+        except Exception:  # pylint: disable=W0703
+            # find out which results cannot be pickled:
+            items = []
+            for item in results:
+                try:
+                    cloudpickle.dumps(item)
+                except Exception as err:  # pylint: disable=W0703
+                    item = {
+                        "exception": err.__class__,
+                        "error": str(err)
+                    }
+                items.append(item)
+            result = dumps(items, out_of_band=out_of_band)
+        self.logger.info(
+            f'Batch of {len(tasks)} Tasks processed ({len(queued)} queued) at {int(time.time())}'
+        )
+        await self.closing_writer(writer, result)
+
+    async def iter_chunks(self, result: Any, size: int):
+        """Split a result in chunks of size items while is produced."""
+        if hasattr(result, '__aiter__'):
+            chunk = []
+            async for item in result:
+                chunk.append(item)
+                if len(chunk) >= size:
+                    yield chunk
+                    chunk = []
+            if chunk:
+                yield chunk
+        elif isinstance(result, (list, tuple)):
+            for idx in range(0, len(result), size):
+                yield list(result[idx:idx + size])
+        elif isinstance(result, Iterator):
+            # generators can block, are consumed on a thread:
+            def take():
+                return list(itertools.islice(result, size))
+            while (chunk := await self._loop.run_in_executor(None, take)):
+                yield chunk
+        elif result is not None:
+            yield [result]
+
+    async def stream_result(self, task: Any, writer: FrameWriter):
+        """Run a Task and send the result to client in chunks.
+
+        Generators (sync or async) and lists are sent in partial replies of
+        WORKER_STREAM_CHUNK_SIZE items while are produced, the last reply is
+        empty (or an exception flagged as error).
+        """
+        result = await self.execute_task(task)
+        try:
+            if isinstance(result, BaseException):
+                raise result
+            async for chunk in self.iter_chunks(result, WORKER_STREAM_CHUNK_SIZE):
+                await writer.write_chunk(dumps(chunk))
+        except asyncio.CancelledError:
+            raise
+        except Exception as err:  # pylint: disable=W0703
+            self.logger.error(
+                f'Error streaming result of Task {task!r}: {err!s}'
+            )
+            writer.write(self.dump_exception(err), FLAG_ERROR)
+        else:
+            # last (empty) reply, ends the stream:
+            writer.write(b'')
+        await writer.drain()
+
+    def framed_session(self, writer: asyncio.StreamWriter) -> "FramedSession":
+        return FramedSession(self, writer)
+
+    async def framed_handler(
+            self,
+            reader: asyncio.StreamReader,
+            writer: asyncio.StreamWriter,
+            addr: tuple
+    ):
+        """Handler for persistent (framed) connections.
+
+        Reads frames until the client closes the connection, every request
+        is processed concurrently and replied with their own request id.
+        """
+        self.logger.info(
+            f"Framed connection from {addr!r} to worker {self.name!s} pid: {self._pid}"
+        )
+        session = self.framed_session(writer)
+        try:
+            while self._running:
+                try:
+                    frame = await read_frame(reader, WORKER_MAX_PAYLOAD_SIZE)
+                except PayloadTooLarge as exc:
+                    session.discard(exc)
+                    continue
+                if frame is None or not session.handle_frame(*frame):
+                    break
+        except asyncio.IncompleteReadError as exc:
+            self.logger.warning(
+                f"Incomplete frame received from {addr!r}: {exc}"
+            )
+        except (ConnectionResetError, ConnectionAbortedError) as exc:
+            self.logger.warning(
+                f"Connection with {addr!r} was lost: {exc}"
+            )
+        except asyncio.CancelledError:
+            pass
+        finally:
+            await session.close()
+
+    async def frame_dispatch(
+        self,
+        kind: int,
+        payload: bytes,
+        channel: FrameWriter,
+        flags: int = 0
+    ):
+        """Process a single request received over a framed connection."""
+        out_of_band = bool(flags & FLAG_BUFFERS)
+        try:
+            if kind == FRAME_PING:
+                if payload == CAPACITY_OPTION:
+                    return await self.closing_writer(
+                        channel, self.capacity().pack()
+                    )
+                return await self.closing_writer(channel, b'PONG')
+            elif kind == FRAME_HEALTH:
+                return await self.worker_health(writer=channel)
+            elif kind == FRAME_PROBE:
+                return await self.worker_probe(writer=channel)
+            elif kind == FRAME_CHECK_STATE:
+                return await self.worker_check_state(writer=channel)
+            elif kind == FRAME_TASK:
+                if (task := await self.deserialize_task(
+                    payload, channel, out_of_band
+                )):
+                    return await self.process_task(task, channel)
+                self.logger.error(
+                    f'No Task was received, received: {payload}'
+                )
+            elif kind == FRAME_CALL:
+                task = await self.resolve_call(payload, channel, out_of_band)
+                if task is None:
+                    # function code was requested to client.
+                    return
+                elif task:
+                    return await self.process_task(task, channel)
+                self.logger.error(
+                    'No Function Call was received'
+                )
+            elif kind == FRAME_STREAM:
+                if (task := await self.deserialize_task(
+                    payload, channel, out_of_band
+                )):
+                    return await self.stream_result(task, channel)
+                self.logger.error(
+                    f'No Task was received, received: {payload}'
+                )
+            elif kind == FRAME_BATCH:
+                if (tasks := await self.deserialize_task(
+                    payload, channel, out_of_band
+                )):
+                    return await self.handle_batch(tasks, channel)
+                self.logger.error(
+                    f'No Batch was received, received: {payload}'
+                )
+            else:
+                self.logger.error(
+                    f'Unknown Frame kind {kind} received'
+                )
+            await self.closing_writer(channel, None)
+        except Exception as exc:  # pylint: disable=W0703
+            self.logger.error(
+                f"Error processing request {channel.request_id}: {exc}"
+            )
+            # the channel always replies, client is waiting for it (a stream
+            # ends with the error instead of being silently truncated):
+            if not channel.is_closing():
+                channel.write(self.dump_exception(exc), FLAG_ERROR)
+
     async def closing_writer(self, writer: asyncio.StreamWriter, result):
         """Sending results and closing the streamer."""
         try:
@@ -653,7 +1299,13 @@ class QWorker:
 
 
 ### Start Server ###
-def start_server(num_worker, host, port, debug: bool):
+def start_server(
+    num_worker,
+    host,
+    port,
+    debug: bool,
+    protocol: str = WORKER_SERVER_PROTOCOL
+):
     """thread worker function"""
     loop = None
     worker = None
@@ -670,7 +1322,8 @@ def start_server(num_worker, host, port, debug: bool):
             port=port,
             event_loop=loop,
             debug=debug,
-            worker_id=num_worker
+            worker_id=num_worker,
+            protocol=QueueProtocol if protocol == 'protocol' else None
         )
         loop.run_until_complete(
             worker.start()
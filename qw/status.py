@@ -0,0 +1,172 @@
+"""QueueWorker Status.
+
+Status snapshot of a Worker, replied to health and check_state probes.
+
+Static information (addresses, versions of packages) is computed once, the
+JSON replies are encoded again only when a counter of the Worker changed
+since the last probe. Load balancers can use the binary probe instead:
+
+    magic (2 bytes) | flags (1 byte) | free (4 bytes) | queued (4 bytes) |
+    active (4 bytes) | load (2 bytes) | consumers (2 bytes) | uptime (4 bytes)
+"""
+import struct
+import time
+from typing import Any
+from navconfig.logging import logging
+from .conf import (
+    WORKER_DEFAULT_QTY,
+    WORKER_QUEUE_SIZE,
+    WORKER_REDIS
+)
+from .utils.json import json_encoder
+from .utils.versions import get_versions
+
+
+PROBE_MAGIC = b'QW'
+PROBE_FORMAT = struct.Struct('!2sBIIIHHI')
+
+### Probe Flags:
+PROBE_RUNNING = 0x01
+PROBE_QUEUE_FULL = 0x02
+
+
+def parse_probe(data: bytes) -> dict:
+    """Decode the binary probe reply of a Worker."""
+    magic, flags, free, queued, active, load, consumers, uptime = PROBE_FORMAT.unpack(
+        data
+    )
+    if magic != PROBE_MAGIC:
+        raise ValueError(
+            f"Invalid Probe reply: {data!r}"
+        )
+    return {
+        "running": bool(flags & PROBE_RUNNING),
+        "full": bool(flags & PROBE_QUEUE_FULL),
+        "free": free,
+        "queued": queued,
+        "active": active,
+        "load": load / 1000,
+        "consumers": consumers,
+        "uptime": uptime
+    }
+
+
+class WorkerStatus:
+    """Status snapshot kept by a Worker.
+
+    Args:
+        worker: QWorker reporting their status.
+    """
+    def __init__(self, worker: Any):
+        self.worker = worker
+        self.started: float = time.monotonic()
+        self.logger = logging.getLogger('QW.Status')
+        try:
+            self.versions: dict = get_versions()
+        except (ImportError, AttributeError) as exc:
+            self.logger.warning(
+                f"Unable to get versions of packages: {exc}"
+            )
+            self.versions = {}
+        self._worker_info: dict = None
+        self._health: tuple = (None, b'')
+        self._state: tuple = (None, b'')
+
+    def reset(self):
+        """Discard the cached information (e.g. Worker started a new server)."""
+        self._worker_info = None
+        self._health = (None, b'')
+        self._state = (None, b'')
+
+    def worker_info(self) -> dict:
+        """Addresses served by Worker (known after the servers were started)."""
+        if self._worker_info is None:
+            worker = self.worker
+            self._worker_info = {
+                "name": worker.name,
+                "address": worker.server_address,
+                "serving": worker.serving,
+                "unix_socket": worker.unix_path
+            }
+        return self._worker_info
+
+    def counters(self) -> tuple:
+        """Values of the Worker that change the status replies."""
+        worker = self.worker
+        compression = worker.compression
+        functions = worker.functions
+        return (
+            worker.queue.size(),
+            tuple(worker.queue.lanes()),
+            len(worker.queue.retries),
+            worker.queue.ticks,
+            len(worker.queue.consumers),
+            worker.active,
+            compression.compressed,
+            compression.decompressed,
+            functions.hits,
+            functions.misses
+        )
+
+    def _queue(self) -> dict:
+        queue = self.worker.queue
+        return {
+            "size": queue.size(),
+            "full": queue.full(),
+            "empty": queue.empty(),
+            "lanes": queue.lanes(),
+            "retrying": len(queue.retries),
+            "consumers": len(queue.consumers),
+            "pool": queue.pool(),
+            "spill": queue.spill.to_dict() if queue.spill is not None else None
+        }
+
+    def health(self) -> bytes:
+        """JSON reply of a health probe."""
+        counters = self.counters()
+        if self._health[0] != counters:
+            status = {
+                "workers": WORKER_DEFAULT_QTY,
+                "queue": self._queue(),
+                "worker": self.worker_info(),
+                "compression": self.worker.compression.to_dict(),
+                "functions": self.worker.functions.to_dict()
+            }
+            self._health = (counters, json_encoder(status).encode('utf-8'))
+        return self._health[1]
+
+    def check_state(self) -> bytes:
+        """JSON reply of a check_state probe."""
+        counters = self.counters()
+        if self._state[0] != counters:
+            status = {
+                "versions": self.versions,
+                "workers": WORKER_DEFAULT_QTY,
+                "worker": {
+                    **self.worker_info(),
+                    "redis": WORKER_REDIS
+                },
+                "queue": {
+                    "max_size": WORKER_QUEUE_SIZE,
+                    **self._queue()
+                },
+                "compression": self.worker.compression.to_dict(),
+                "functions": self.worker.functions.to_dict()
+            }
+            self._state = (counters, json_encoder(status).encode('utf-8'))
+        return self._state[1]
+
+    def probe(self) -> bytes:
+        """Binary reply of a probe."""
+        worker = self.worker
+        capacity = worker.capacity()
+        flags = PROBE_RUNNING if worker.running else 0
+        if capacity.full:
+            flags |= PROBE_QUEUE_FULL
+        return PROBE_FORMAT.pack(
+            PROBE_MAGIC,
+            flags,
+            *capacity.pack_values(),
+            min(len(worker.queue.consumers), 0xFFFF),
+            int(time.monotonic() - self.started)
+        )
@@ -1 +1,9 @@
-from .functions import cPrint, make_signature
+from .functions import (
+    cPrint,
+    make_signature,
+    private_dir,
+    owned_by_user,
+    unix_socket_path,
+    local_sockets,
+    is_local_host
+)
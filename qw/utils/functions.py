@@ -1,14 +1,25 @@
+import os
+import glob
+import socket
 import hashlib
 import hmac
 import base64
+from functools import lru_cache
 from asyncdb.utils.functions import colors, Msg, cPrint
 from qw.exceptions import ConfigError
+from qw.conf import WORKER_UNIX_SOCKET_DIR
 
 
 __all__ = (
     "colors",
     "Msg",
     "cPrint",
+    "make_signature",
+    "private_dir",
+    "owned_by_user",
+    "unix_socket_path",
+    "local_sockets",
+    "is_local_host"
 )
 
 def make_signature(message: str, key: str) -> str:
@@ -20,3 +31,68 @@ def make_signature(message: str, key: str) -> str:
     msg = message.encode('utf-8')
     digest = hmac.new(skey, msg, digestmod=hashlib.sha512).digest()
     return base64.b64encode(digest)
+
+
+def owned_by_user(path: str) -> bool:
+    """True if path is owned by the user running this process."""
+    return os.stat(path).st_uid == os.getuid()
+
+
+def private_dir(path: str, create: bool = True) -> str:
+    """Directory only accessible by the user running this process.
+
+    Created with mode 0700 if missing (and create is True).
+
+    Raises:
+        PermissionError: directory is owned by another user or can be
+            accessed by other users.
+    """
+    if create:
+        os.makedirs(path, mode=0o700, exist_ok=True)
+    stat = os.stat(path)
+    if stat.st_uid != os.getuid():
+        raise PermissionError(
+            f"Directory {path} is owned by another user (uid {stat.st_uid})"
+        )
+    if stat.st_mode & 0o077:
+        raise PermissionError(
+            f"Directory {path} can be accessed by other users "
+            f"(mode {stat.st_mode & 0o777:o})"
+        )
+    return path
+
+
+def unix_socket_path(port: int, worker_id: int) -> str:
+    """Path of the Unix Socket served by a Worker process."""
+    return os.path.join(WORKER_UNIX_SOCKET_DIR, f'qw-{port}-{worker_id}.sock')
+
+
+def local_sockets(port: int) -> list:
+    """Unix Sockets served by the Worker processes of port in this host.
+
+    Empty if the socket directory is missing or is not private.
+    """
+    try:
+        private_dir(WORKER_UNIX_SOCKET_DIR, create=False)
+    except OSError:
+        return []
+    return glob.glob(unix_socket_path(port, '*'))
+
+
+@lru_cache(maxsize=1)
+def _local_addresses() -> frozenset:
+    hostname = socket.gethostname()
+    addresses = {'localhost', '127.0.0.1', '::1', '0.0.0.0', hostname}
+    try:
+        addresses.add(socket.getfqdn())
+        addresses.update(
+            info[4][0] for info in socket.getaddrinfo(hostname, None)
+        )
+    except OSError:
+        pass
+    return frozenset(addresses)
+
+
+def is_local_host(host: str) -> bool:
+    """True if host is an address (or name) of this machine."""
+    return host in _local_addresses()
@@ -11,6 +11,8 @@ import uuid
 class QueueWrapper:
     _queued: bool = True
     _debug: bool = False
+    ## priority of the task on the Worker Queue (higher first):
+    priority: int = 0
 
     def __init__(self, coro=None, *args, **kwargs):
         if 'queued' in kwargs:
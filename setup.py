@@ -112,6 +112,12 @@ setup(
         'async-timeout==4.0.3',
         'msgpack==1.0.5',
     ],
+    extras_require={
+        "compression": [
+            'zstandard>=0.22.0',
+            'lz4>=4.3.2'
+        ]
+    },
     ext_modules=cythonize(extensions),
     entry_points={
         'console_scripts': [
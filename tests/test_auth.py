@@ -0,0 +1,48 @@
+"""Session authentication: proofs and session tickets."""
+import time
+from qw.auth import (
+    NONCE_SIZE,
+    PROOF_SIZE,
+    TICKET_SIZE,
+    ClientSession,
+    derive_session_key,
+    make_nonce,
+    make_proof,
+    new_ticket,
+    secret_key,
+    ticket_expiration,
+    verify_proof
+)
+
+
+SECRET = secret_key('a shared secret')
+
+
+def test_full_handshake_proof():
+    nonce, client_nonce = make_nonce(), make_nonce()
+    assert len(nonce) == NONCE_SIZE
+    proof = make_proof(SECRET, nonce, client_nonce, b'framed')
+    assert len(proof) == PROOF_SIZE
+    assert verify_proof(proof, SECRET, nonce, client_nonce, b'framed')
+    # bound to the mode, the nonces and the secret:
+    assert not verify_proof(proof, SECRET, nonce, client_nonce, b'stream')
+    assert not verify_proof(proof, SECRET, make_nonce(), client_nonce, b'framed')
+    assert not verify_proof(proof, secret_key('other'), nonce, client_nonce, b'framed')
+
+
+def test_ticket_round_trip():
+    ticket = new_ticket(60)
+    assert len(ticket) == TICKET_SIZE
+    assert abs(ticket_expiration(ticket) - (time.time() + 60)) < 2
+    session = ClientSession(ticket, SECRET)
+    assert not session.expired
+    # Worker derives the same key from the ticket, without any state:
+    nonce = make_nonce()
+    proof = make_proof(session.key, nonce, b'framed')
+    assert verify_proof(proof, derive_session_key(SECRET, ticket), nonce, b'framed')
+    assert not verify_proof(proof, derive_session_key(SECRET, new_ticket(60)), nonce, b'framed')
+
+
+def test_expired_ticket():
+    session = ClientSession(new_ticket(0), SECRET)
+    assert session.expired
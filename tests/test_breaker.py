@@ -0,0 +1,93 @@
+"""CircuitBreaker: ejection and recovery of Workers."""
+from qw.breaker import CircuitBreaker, CLOSED, OPEN, HALF_OPEN
+
+
+def make_breaker() -> CircuitBreaker:
+    return CircuitBreaker(('127.0.0.1', 8888), threshold=3, backoff=1.0)
+
+
+def expire(breaker: CircuitBreaker):
+    breaker._retry_at = 0.0  # pylint: disable=W0212
+
+
+def test_opens_after_threshold():
+    breaker = make_breaker()
+    breaker.failure()
+    breaker.failure()
+    assert breaker.state == CLOSED
+    breaker.failure()
+    assert breaker.state == OPEN
+    assert not breaker.available
+    assert not breaker.allow()
+
+
+def test_half_open_allows_a_single_trial():
+    breaker = make_breaker()
+    breaker.trip()
+    expire(breaker)
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.success()
+    assert breaker.state == CLOSED
+    assert breaker.opened == 0
+
+
+def test_failed_trial_opens_with_longer_backoff():
+    breaker = make_breaker()
+    breaker.trip()
+    expire(breaker)
+    breaker.allow()
+    breaker.failure()
+    assert breaker.state == OPEN
+    assert breaker.opened == 2
+    assert breaker.retry_in > 1.5
+
+
+def test_concurrent_failures_trip_once():
+    breaker = make_breaker()
+    for _ in range(5):
+        breaker.failure()
+    assert breaker.opened == 1
+    assert breaker.retry_in <= 1.2
+
+
+def test_released_trial_is_available_again():
+    breaker = make_breaker()
+    breaker.trip()
+    expire(breaker)
+    breaker.allow()
+    assert not breaker.available
+    breaker.release()
+    assert breaker.available
+
+
+def test_failed_probe_keeps_the_backoff():
+    breaker = make_breaker()
+    breaker.trip()
+    retry_at = breaker._retry_at  # pylint: disable=W0212
+    for _ in range(3):
+        breaker.probed(False)
+    assert breaker.state == OPEN
+    assert breaker.opened == 1
+    assert breaker._retry_at == retry_at  # pylint: disable=W0212
+    # still down after the backoff:
+    expire(breaker)
+    breaker.probed(False)
+    assert breaker.state == OPEN
+    assert breaker.opened == 1
+    assert 0.7 < breaker.retry_in <= 1.2
+
+
+def test_probe_recovers_open_and_stuck_circuits():
+    breaker = make_breaker()
+    breaker.trip()
+    breaker.probed(False)
+    assert breaker.state == OPEN
+    breaker.probed(True)
+    assert breaker.available
+    # a trial that never finished:
+    breaker.allow()
+    assert not breaker.available
+    breaker.probed(True)
+    assert breaker.available
@@ -0,0 +1,135 @@
+"""QClient: batches and fan-out of calls (without Workers)."""
+import asyncio
+import random
+from qw.client import QClient, SyncQClient
+from qw.conf import WORKER_FRAMED_PROTOCOL, get_worker_list
+
+
+WORKERS = [('127.0.0.1', 8888), ('127.0.0.1', 8889)]
+
+
+def add(a, b=0):
+    return a + b
+
+
+class BatchClient(QClient):
+    """Client running the batches locally."""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.batches: list = []
+
+    async def _send_batch(self, batch: list, use_wrapper: bool, queued: bool) -> list:
+        self.batches.append(len(batch))
+        await asyncio.sleep(random.random() / 100)
+        if any(args == (13,) for _, args, _ in batch):
+            raise ConnectionRefusedError('unlucky batch')
+        return [fn(*args, **kwargs) for fn, args, kwargs in batch]
+
+
+def test_unpack_call():
+    client = QClient.__new__(QClient)
+    assert client._unpack_call(add) == (add, (), {})  # pylint: disable=W0212
+    assert client._unpack_call((add, [1])) == (add, (1,), {})  # pylint: disable=W0212
+    assert client._unpack_call((add, (1,), {'b': 2})) == (add, (1,), {'b': 2})  # pylint: disable=W0212
+
+
+def test_run_many_keeps_the_order_of_calls():
+    async def run_many():
+        client = BatchClient(worker_list=WORKERS, framed=True)
+        results = await client.run_many(
+            [(add, (n,), {'b': 1}) for n in range(10)], batch_size=3
+        )
+        return client, results
+
+    client, results = asyncio.run(run_many())
+    assert results == [n + 1 for n in range(10)]
+    assert client.batches == [3, 3, 3, 1]
+
+
+def test_failed_batch_keeps_the_other_results():
+    async def run_many():
+        client = BatchClient(worker_list=WORKERS, framed=True)
+        return await client.run_many(
+            [(add, (n,)) for n in range(10, 20)], batch_size=2
+        )
+
+    results = asyncio.run(run_many())
+    # 13 is sent with 12, both get the error of their batch:
+    assert [isinstance(r, ConnectionRefusedError) for r in results[2:4]] == [True, True]
+    assert results[:2] + results[4:] == [10, 11, 14, 15, 16, 17, 18, 19]
+
+
+class MapClient(QClient):
+    """Client running every call locally, failing the first call of 3."""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.running: int = 0
+        self.max_running: int = 0
+        self.calls: list = []
+
+    async def _run(self, fn, args, kwargs, use_wrapper=False, routing_key=None, workers=None):
+        self.calls.append(args)
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(random.random() / 100)
+            if args == (3,) and self.calls.count(args) == 1:
+                raise ConnectionResetError('lost')
+            return fn(*args, **kwargs)
+        finally:
+            self.running -= 1
+
+
+def test_map_yields_in_order_with_bounded_concurrency():
+    async def run_map():
+        client = MapClient(worker_list=WORKERS)
+        results = [
+            result async for result in client.map(add, range(20), concurrency=4)
+        ]
+        return client, results
+
+    client, results = asyncio.run(run_map())
+    assert results == list(range(20))
+    assert client.max_running <= 4
+    # the failed call was sent again:
+    assert client.calls.count((3,)) == 2
+
+
+def test_context_manager_closes_the_pools():
+    closed = []
+
+    class Pool:
+        async def close(self):
+            closed.append(self)
+
+    async def use_client():
+        async with QClient(worker_list=WORKERS) as client:
+            client._pools = {worker: Pool() for worker in WORKERS}  # pylint: disable=W0212
+        return client
+
+    client = asyncio.run(use_client())
+    assert len(closed) == 2
+    assert not client._pools  # pylint: disable=W0212
+
+
+def test_sync_client_inherits_the_framed_protocol():
+    with SyncQClient(WORKERS) as client:
+        assert client.client._framed is WORKER_FRAMED_PROTOCOL  # pylint: disable=W0212
+    with SyncQClient(WORKERS, framed=not WORKER_FRAMED_PROTOCOL) as client:
+        assert client.client._framed is not WORKER_FRAMED_PROTOCOL  # pylint: disable=W0212
+
+
+def test_high_priority_calls_use_the_worker_list_by_default():
+    assert get_worker_list(['']) == []
+
+    class Client(QClient):
+        async def open_connection(self, worker: tuple, framed: bool = False):
+            return worker, None
+
+    async def select():
+        client = Client(WORKERS)
+        assert not client._high_workers  # pylint: disable=W0212
+        worker, _ = await client.select_worker(priority=10)
+        return worker
+
+    assert asyncio.run(select()) in WORKERS
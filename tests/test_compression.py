@@ -0,0 +1,52 @@
+"""Compression codecs negotiated on framed connections."""
+import os
+from qw.compression import CODECS, CompressionStats, get_codec, negotiate
+
+
+def test_negotiate_prefers_the_client_order():
+    assert negotiate(['zlib'], ['zstd', 'lz4', 'zlib']).name == 'zlib'
+    assert negotiate(['brotli', 'zlib'], ['zlib']).name == 'zlib'
+    assert negotiate(['zlib'], ['zstd']) is None
+    assert negotiate([], list(CODECS)) is None
+
+
+def test_every_available_codec_round_trips():
+    data = b'queue worker ' * 1000
+    for name in CODECS:
+        codec = get_codec(name.encode('utf-8'))
+        assert codec.decompress(codec.compress(data)) == data
+
+
+def test_small_or_incompressible_payloads_are_sent_raw():
+    stats = CompressionStats()
+    codec = get_codec('zlib')
+    small = b'x' * 100
+    assert stats.compress(codec, small, threshold=1024) == (small, False)
+    noise = os.urandom(4096)
+    assert stats.compress(codec, noise, threshold=1024) == (noise, False)
+    assert stats.compress(None, noise, threshold=0) == (noise, False)
+    data = b'queue worker ' * 1000
+    compressed, done = stats.compress(codec, data, threshold=1024)
+    assert done and len(compressed) < len(data)
+    assert stats.decompress(codec, compressed) == data
+    metrics = stats.to_dict()
+    assert metrics['compressed'] == 1
+    assert metrics['decompressed'] == 1
+    assert metrics['ratio'] > 1
+
+
+def test_decompression_is_bounded():
+    stats = CompressionStats()
+    data = bytes(1 << 20)
+    for name in CODECS:
+        codec = get_codec(name)
+        compressed = codec.compress(data)
+        assert stats.decompress(codec, compressed, max_size=len(data)) == data
+        try:
+            stats.decompress(codec, compressed, max_size=1024)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f'{name} payload was inflated over the max size')
+        # only a bit more than the max size was inflated:
+        assert len(codec.decompress(compressed, 1024)) == 1025
@@ -0,0 +1,65 @@
+"""Decorators: client shared by the decorated functions."""
+import asyncio
+from qw import decorators
+
+
+class Client:
+    """Client recording the calls, instead of sending them to Workers."""
+    def __init__(self):
+        self.calls: list = []
+        self.connected: bool = True
+
+    async def run(self, fn, *args, **kwargs):
+        self.calls.append(('run', kwargs))
+        return fn(*args)
+
+    async def queue(self, fn, *args, **kwargs):
+        self.calls.append(('queue', kwargs))
+        return {"status": "Queued"}
+
+    async def disconnect(self):
+        self.connected = False
+
+
+@decorators.run(priority=2, routing_key=lambda a, b: f'key-{a}')
+def add(a, b):
+    return a + b
+
+
+@decorators.dispatch
+def notify(message):
+    return message
+
+
+def test_client_is_shared_and_closed(monkeypatch):
+    monkeypatch.setattr(decorators, 'QClient', Client)
+
+    async def calls():
+        assert await add(1, 2) == 3
+        await notify('hello')
+        client = decorators.get_client()
+        await decorators.close_client()
+        return client
+
+    client = asyncio.run(calls())
+    assert client.calls == [
+        ('run', {'routing_key': 'key-1', 'priority': 2}),
+        ('queue', {})
+    ]
+    assert not client.connected
+    assert not decorators._clients  # pylint: disable=W0212
+
+
+def test_clients_of_closed_loops_are_dropped(monkeypatch):
+    monkeypatch.setattr(decorators, 'QClient', Client)
+
+    async def call():
+        await add(1, 2)
+        return decorators.get_client()
+
+    first = asyncio.run(call())
+    second = asyncio.run(call())
+    assert first is not second
+    # only the client of the last loop is kept:
+    assert list(decorators._clients.values()) == [second]  # pylint: disable=W0212
+    decorators._clients.clear()  # pylint: disable=W0212
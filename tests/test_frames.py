@@ -0,0 +1,172 @@
+"""Framed protocol: frames, FrameParser and multiplexed connections."""
+import asyncio
+import socket
+import zlib
+from qw.compression import get_codec
+from qw.frames import (
+    FLAG_COMPRESSED,
+    FRAME_HEADER,
+    FRAME_TASK,
+    FRAME_RESULT,
+    FRAME_PING,
+    FramedConnection,
+    FrameParser,
+    PayloadTooLarge,
+    WorkerCapacity,
+    read_frame,
+    write_frame
+)
+
+
+def frame(kind: int, request_id: int, payload: bytes = b'', flags: int = 0) -> bytes:
+    return FRAME_HEADER.pack(kind, flags, request_id, len(payload)) + payload
+
+
+def stream_reader(data: bytes) -> asyncio.StreamReader:
+    reader = asyncio.StreamReader()
+    reader.feed_data(data)
+    reader.feed_eof()
+    return reader
+
+
+def test_read_frames_until_eof():
+    async def read_all():
+        reader = stream_reader(
+            frame(FRAME_TASK, 1, b'first', flags=2) + frame(FRAME_RESULT, 2)
+        )
+        return [
+            await read_frame(reader),
+            await read_frame(reader),
+            await read_frame(reader)
+        ]
+
+    first, second, eof = asyncio.run(read_all())
+    assert first == (FRAME_TASK, 2, 1, b'first')
+    assert second == (FRAME_RESULT, 0, 2, b'')
+    assert eof is None
+
+
+def test_truncated_frame_is_an_error():
+    async def read_truncated():
+        reader = stream_reader(frame(FRAME_TASK, 1, b'payload')[:-2])
+        return await read_frame(reader)
+
+    try:
+        asyncio.run(read_truncated())
+    except asyncio.IncompleteReadError:
+        pass
+    else:
+        raise AssertionError('a truncated frame was read')
+
+
+def test_oversized_frame_is_discarded():
+    async def read_all():
+        reader = stream_reader(
+            frame(FRAME_TASK, 1, b'x' * 100) + frame(FRAME_TASK, 2, b'ok')
+        )
+        try:
+            await read_frame(reader, max_size=10)
+        except PayloadTooLarge as exc:
+            error = exc
+        return error, await read_frame(reader, max_size=10)
+
+    error, following = asyncio.run(read_all())
+    assert error.request_id == 1
+    # the connection is still usable:
+    assert following == (FRAME_TASK, 0, 2, b'ok')
+
+
+def test_replies_are_matched_by_request_id():
+    async def worker(reader, writer):
+        # replies in the reverse order of the requests:
+        requests = [await read_frame(reader) for _ in range(3)]
+        for _, _, request_id, payload in reversed(requests):
+            write_frame(writer, FRAME_RESULT, request_id, bytes(payload).upper())
+        await writer.drain()
+
+    async def requests():
+        client_sock, worker_sock = socket.socketpair()
+        reader, writer = await asyncio.open_connection(sock=client_sock)
+        worker_reader, worker_writer = await asyncio.open_connection(sock=worker_sock)
+        serving = asyncio.get_running_loop().create_task(
+            worker(worker_reader, worker_writer)
+        )
+        conn = FramedConnection(reader, writer, ('127.0.0.1', 8888))
+        try:
+            return await asyncio.gather(
+                *[conn.request(FRAME_TASK, name) for name in (b'a', b'b', b'c')]
+            )
+        finally:
+            await serving
+            await conn.close()
+            worker_writer.close()
+
+    replies = asyncio.run(requests())
+    assert [bytes(payload) for _, payload in replies] == [b'A', b'B', b'C']
+
+
+def test_reply_inflated_over_max_size_is_refused():
+    async def worker(reader, writer):
+        _, _, request_id, _ = await read_frame(reader)
+        write_frame(writer, FRAME_RESULT, request_id, zlib.compress(bytes(10000)), FLAG_COMPRESSED)
+        await writer.drain()
+
+    async def request():
+        client_sock, worker_sock = socket.socketpair()
+        reader, writer = await asyncio.open_connection(sock=client_sock)
+        worker_reader, worker_writer = await asyncio.open_connection(sock=worker_sock)
+        serving = asyncio.get_running_loop().create_task(
+            worker(worker_reader, worker_writer)
+        )
+        conn = FramedConnection(reader, writer, ('127.0.0.1', 8888), max_size=1000)
+        conn.codec = get_codec('zlib')
+        try:
+            return await conn.request(FRAME_TASK, b'task')
+        finally:
+            await serving
+            await conn.close()
+            worker_writer.close()
+
+    try:
+        asyncio.run(request())
+    except ValueError:
+        pass
+    else:
+        raise AssertionError('reply was inflated over the max size')
+
+
+def test_parse_frames_in_a_single_chunk():
+    parser = FrameParser()
+    data = frame(FRAME_TASK, 1, b'first') + frame(FRAME_PING, 2)
+    assert parser.feed(data) == [
+        (FRAME_TASK, 0, 1, bytearray(b'first')),
+        (FRAME_PING, 0, 2, b'')
+    ]
+
+
+def test_parse_split_header_and_payload():
+    parser = FrameParser()
+    data = frame(FRAME_TASK, 7, b'payload', flags=2)
+    frames = []
+    for pos in range(len(data)):
+        frames += parser.feed(data[pos:pos + 1])
+    assert frames == [(FRAME_TASK, 2, 7, bytearray(b'payload'))]
+
+
+def test_oversized_payload_is_skipped():
+    parser = FrameParser(max_size=4)
+    big = frame(FRAME_TASK, 1, b'x' * 10)
+    # the oversized payload arrives in several chunks:
+    frames = parser.feed(big[:12])
+    frames += parser.feed(big[12:] + frame(FRAME_TASK, 2, b'ok'))
+    error, following = frames
+    assert isinstance(error, PayloadTooLarge)
+    assert error.request_id == 1
+    assert following == (FRAME_TASK, 0, 2, bytearray(b'ok'))
+
+
+def test_capacity_round_trip():
+    capacity = WorkerCapacity.unpack(WorkerCapacity(4, 10, 2, 750).pack())
+    assert (capacity.free, capacity.queued, capacity.active, capacity.load) == (4, 10, 2, 750)
+    assert not capacity.full
+    assert WorkerCapacity(0, 10, 2, 750).full
@@ -0,0 +1,84 @@
+"""Hedged calls of QClient (without Workers)."""
+import asyncio
+import cloudpickle
+from qw.client import QClient
+from qw.conf import WORKER_HEDGE_MIN_SAMPLES
+from qw.scheduler import WorkerStats
+
+
+WORKERS = [('127.0.0.1', 8888), ('127.0.0.1', 8889)]
+
+
+def echo(value):
+    return value
+
+
+class Writer:
+    def get_extra_info(self, name: str, default=None):
+        return ('127.0.0.1', 50000)
+
+
+class Connection:
+    def __init__(self, worker: tuple):
+        self.worker = worker
+        self.writer = Writer()
+
+
+class HedgedClient(QClient):
+    """Client with fake Workers, replying after their delay."""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.delays: dict = {worker: 0.005 for worker in WORKERS}
+        self.sent: list = []
+
+    async def acquire_worker(self, framed=False, queued=False, key=None, exclude=None, **kwargs):
+        worker = next(w for w in WORKERS if not exclude or w not in exclude)
+        return worker, Connection(worker)
+
+    async def request_worker(self, func, conn, kind=None):
+        self.sent.append(conn.worker)
+        await asyncio.sleep(self.delays[conn.worker])
+        return cloudpickle.dumps(func.args[0]), False
+
+
+def test_percentile_of_latencies():
+    stats = WorkerStats()
+    for elapsed in range(100, 0, -1):
+        stats.observe(WORKERS[0], elapsed / 1000, 'program.slow')
+    assert stats.percentile(95, 'program.slow') == 0.096
+    assert stats.percentile(50, 'program.slow') == 0.051
+    assert stats.percentile(100, 'program.slow') == 0.1
+    # other functions have their own latencies:
+    assert stats.percentile(95, 'program.fast') is None
+
+
+def test_no_percentile_without_enough_samples():
+    stats = WorkerStats()
+    for _ in range(WORKER_HEDGE_MIN_SAMPLES - 1):
+        stats.observe(WORKERS[0], 0.1, 'program.slow')
+    assert stats.percentile(95, 'program.slow') is None
+
+
+def test_slow_call_is_hedged_to_another_worker():
+    async def hedged_calls():
+        client = HedgedClient(worker_list=WORKERS, framed=True)
+        # more calls than needed to know the latency of the function:
+        results = [
+            await client.run(echo, n, hedge=True)
+            for n in range(WORKER_HEDGE_MIN_SAMPLES + 5)
+        ]
+        assert client.hedge_metrics()['hedged'] == 0
+        client.delays[WORKERS[0]] = 5.0
+        started = asyncio.get_running_loop().time()
+        results.append(await client.run(echo, 'slow', hedge=True))
+        elapsed = asyncio.get_running_loop().time() - started
+        return client, results, elapsed
+
+    client, results, elapsed = asyncio.run(hedged_calls())
+    assert results[-1] == 'slow'
+    assert results[:-1] == list(range(WORKER_HEDGE_MIN_SAMPLES + 5))
+    assert client.sent[-2:] == WORKERS
+    assert elapsed < 1
+    metrics = client.hedge_metrics()
+    assert metrics['hedged'] == 1
+    assert metrics['won'] == 1
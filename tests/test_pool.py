@@ -0,0 +1,84 @@
+"""WorkerPool: bounded pool of framed connections."""
+import asyncio
+from qw.pool import WorkerPool
+
+
+class Connection:
+    in_flight: int = 0
+    closed: bool = False
+    last_used: float = 0.0
+
+    async def close(self):
+        self.closed = True
+
+
+def test_connection_is_shared_until_max_streams():
+    opened = []
+
+    async def connect():
+        opened.append(Connection())
+        return opened[-1]
+
+    async def acquire():
+        pool = WorkerPool(('127.0.0.1', 8888), connect, max_size=2, max_streams=2)
+        try:
+            first = await pool.acquire()
+            first.in_flight = 1
+            assert await pool.acquire() is first
+            first.in_flight = 2
+            second = await pool.acquire()
+            assert second is not first
+            second.in_flight = 2
+            # max_size is reached, the least loaded connection is shared:
+            assert await pool.acquire() in (first, second)
+            return pool.metrics()
+        finally:
+            await pool.close()
+
+    metrics = asyncio.run(acquire())
+    assert len(opened) == 2
+    assert metrics['created'] == 2
+    assert metrics['reused'] == 2
+    assert all(conn.closed for conn in opened)
+
+
+def test_cold_pool_is_bounded():
+    opened = []
+
+    async def connect():
+        await asyncio.sleep(0.01)
+        opened.append(Connection())
+        return opened[-1]
+
+    async def burst():
+        pool = WorkerPool(('127.0.0.1', 8888), connect, max_size=4)
+        try:
+            return await asyncio.gather(*[pool.acquire() for _ in range(50)])
+        finally:
+            await pool.close()
+
+    connections = asyncio.run(burst())
+    assert len(opened) <= 4
+    assert {id(conn) for conn in connections} <= {id(conn) for conn in opened}
+
+
+def test_waiters_fail_with_the_pending_connection():
+    attempts = []
+
+    async def connect():
+        attempts.append(1)
+        await asyncio.sleep(0.01)
+        raise ConnectionRefusedError('refused')
+
+    async def burst():
+        pool = WorkerPool(('127.0.0.1', 8888), connect, max_size=2)
+        try:
+            return await asyncio.gather(
+                *[pool.acquire() for _ in range(10)], return_exceptions=True
+            )
+        finally:
+            await pool.close()
+
+    results = asyncio.run(burst())
+    assert len(attempts) == 2
+    assert all(isinstance(result, ConnectionError) for result in results)
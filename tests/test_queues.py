@@ -0,0 +1,114 @@
+"""Worker Queue: priority lanes and delayed retries."""
+import asyncio
+import time
+from qw.queues import PriorityLanes
+from qw.queues.retry import RetryScheduler
+
+
+class Task:
+    def __init__(self, name: str, priority: int = 0):
+        self.name = name
+        self.priority = priority
+        self.retries = 0
+
+
+def drain(queue: asyncio.Queue) -> list:
+    names = []
+    while not queue.empty():
+        names.append(queue.get_nowait().name)
+    return names
+
+
+def fill(queue: PriorityLanes, tasks: list) -> PriorityLanes:
+    for name, priority in tasks:
+        queue.put_nowait(Task(name, priority))
+    return queue
+
+
+def test_strict_lanes_serve_higher_priority_first():
+    async def lanes():
+        queue = fill(
+            PriorityLanes(maxsize=10, lanes=3, policy='strict'),
+            [('a', 0), ('b', 2), ('c', 1), ('d', 2), ('e', 9), ('f', -1)]
+        )
+        assert queue.sizes() == [2, 1, 3]
+        return drain(queue)
+
+    # priority is clamped to the lanes:
+    assert asyncio.run(lanes()) == ['b', 'd', 'e', 'c', 'a', 'f']
+
+
+def test_weighted_lanes_share_the_consumers():
+    async def lanes():
+        queue = fill(
+            PriorityLanes(maxsize=100, lanes=2, policy='weighted', weights=[1, 3]),
+            [('low', 0)] * 20 + [('high', 1)] * 20
+        )
+        return drain(queue)[:8]
+
+    served = asyncio.run(lanes())
+    assert served.count('high') == 6
+    assert served.count('low') == 2
+
+
+def test_waiting_task_is_not_starved():
+    async def lanes():
+        queue = fill(
+            PriorityLanes(maxsize=10, lanes=2, policy='strict', max_wait=0.01),
+            [('old', 0)]
+        )
+        await asyncio.sleep(0.02)
+        fill(queue, [('new', 1)])
+        assert queue.wait_time() >= 0.02
+        return drain(queue)
+
+    assert asyncio.run(lanes()) == ['old', 'new']
+
+
+def test_full_lanes():
+    async def lanes():
+        queue = fill(PriorityLanes(maxsize=2, lanes=2), [('a', 0), ('b', 1)])
+        try:
+            queue.put_nowait(Task('c', 1))
+        except asyncio.QueueFull:
+            return True
+        return False
+
+    assert asyncio.run(lanes())
+
+
+def test_retry_delay_grows_up_to_the_max():
+    scheduler = RetryScheduler(asyncio.Queue(), interval=1, max_interval=10, jitter=0)
+    assert [scheduler.delay(retries) for retries in range(1, 6)] == [1, 2, 4, 8, 10]
+    jittered = RetryScheduler(asyncio.Queue(), interval=1, max_interval=10, jitter=0.5)
+    assert all(2 <= jittered.delay(3) <= 6 for _ in range(100))
+
+
+def test_tasks_are_queued_when_the_retry_is_due():
+    async def retries():
+        queue = asyncio.Queue()
+        scheduler = RetryScheduler(queue, interval=1, jitter=0)
+        scheduler.schedule(Task('later'), delay=0.05)
+        scheduler.schedule(Task('sooner'), delay=0.01)
+        assert len(scheduler) == 2 and queue.empty()
+        started = time.monotonic()
+        first = await queue.get()
+        second = await queue.get()
+        return first.name, second.name, time.monotonic() - started, len(scheduler)
+
+    first, second, elapsed, pending = asyncio.run(retries())
+    assert (first, second) == ('sooner', 'later')
+    assert elapsed >= 0.04
+    assert pending == 0
+
+
+def test_pending_retries_are_discarded():
+    async def retries():
+        queue = asyncio.Queue()
+        scheduler = RetryScheduler(queue)
+        scheduler.schedule(Task('never'), delay=0.01)
+        discarded = scheduler.clear()
+        await asyncio.sleep(0.02)
+        return discarded, queue.empty()
+
+    assert asyncio.run(retries()) == (1, True)
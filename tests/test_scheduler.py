@@ -0,0 +1,133 @@
+"""Scheduling strategies and HashRing: routing of calls to Workers."""
+from qw.exceptions import ConfigError
+from qw.frames import WorkerCapacity
+from qw.scheduler import (
+    EWMALatency,
+    HashRing,
+    LeastOutstanding,
+    PowerOfTwoChoices,
+    RoundRobin,
+    WorkerStats,
+    get_scheduler
+)
+
+
+WORKERS = [('127.0.0.1', 8888 + n) for n in range(4)]
+KEYS = [f'program.task-{n}' for n in range(1000)]
+
+
+def busy_stats() -> WorkerStats:
+    """Stats where only the last Worker is idle."""
+    stats = WorkerStats()
+    for load, worker in enumerate(reversed(WORKERS)):
+        stats.in_flight[worker] = load * 2
+    return stats
+
+
+def test_round_robin_cycles_over_workers():
+    scheduler = RoundRobin(WorkerStats())
+    assert [scheduler.select(WORKERS) for _ in range(8)] == WORKERS * 2
+    assert scheduler.select(WORKERS, exclude={WORKERS[1], WORKERS[2]}) in (WORKERS[0], WORKERS[3])
+    assert scheduler.select([]) is None
+
+
+def test_least_outstanding_counts_worker_capacity():
+    stats = busy_stats()
+    scheduler = LeastOutstanding(stats)
+    assert scheduler.select(WORKERS) == WORKERS[-1]
+    assert scheduler.select(WORKERS, exclude={WORKERS[-1]}) == WORKERS[-2]
+    # Tasks busy on the Worker are outstanding too:
+    stats.set_capacity(WORKERS[-1], WorkerCapacity(0, 5, 4, 0))
+    assert scheduler.select(WORKERS) == WORKERS[-2]
+
+
+def test_power_of_two_choices_never_picks_the_busiest():
+    scheduler = PowerOfTwoChoices(busy_stats())
+    assert WORKERS[0] not in {scheduler.select(WORKERS) for _ in range(100)}
+    assert scheduler.select(WORKERS[:1]) == WORKERS[0]
+
+
+def test_ewma_tries_new_workers_then_the_fastest():
+    stats = WorkerStats(decay=0.5)
+    scheduler = EWMALatency(stats)
+    for worker in WORKERS[:3]:
+        stats.observe(worker, 0.1)
+    assert scheduler.select(WORKERS) == WORKERS[3]
+    stats.observe(WORKERS[3], 1.0)
+    stats.observe(WORKERS[1], 0.02)
+    assert abs(stats.latency[WORKERS[1]] - 0.06) < 1e-9
+    assert scheduler.select(WORKERS) == WORKERS[1]
+
+
+def test_track_counts_requests_in_flight():
+    stats = WorkerStats()
+    worker = WORKERS[0]
+    with stats.track(worker):
+        assert stats.in_flight[worker] == 1
+    assert stats.in_flight[worker] == 0
+    assert stats.latency[worker] >= 0
+    try:
+        with stats.track(worker):
+            raise ConnectionResetError('lost')
+    except ConnectionResetError:
+        pass
+    assert stats.errors[worker] == 1
+
+
+def test_untimed_requests_are_only_counted():
+    stats = WorkerStats()
+    worker = WORKERS[0]
+    with stats.track(worker, timed=False):
+        assert stats.in_flight[worker] == 1
+    assert worker not in stats.latency
+
+
+def test_unknown_scheduler():
+    assert isinstance(get_scheduler('p2c', WorkerStats()), PowerOfTwoChoices)
+    try:
+        get_scheduler('random', WorkerStats())
+    except ConfigError:
+        pass
+    else:
+        raise AssertionError('unknown scheduler was accepted')
+
+
+def owners(ring: HashRing) -> dict:
+    return {key: ring.get(key) for key in KEYS}
+
+
+def test_keys_are_spread_over_workers():
+    ring = HashRing(WORKERS)
+    assert set(owners(ring).values()) == set(WORKERS)
+
+
+def test_only_keys_of_removed_worker_move():
+    ring = HashRing(WORKERS)
+    before = owners(ring)
+    ring.remove(WORKERS[0])
+    after = owners(ring)
+    for key in KEYS:
+        if before[key] != WORKERS[0]:
+            assert after[key] == before[key]
+        else:
+            assert after[key] != WORKERS[0]
+
+
+def test_new_worker_only_takes_keys():
+    ring = HashRing(WORKERS[:3])
+    before = owners(ring)
+    ring.update(WORKERS)
+    after = owners(ring)
+    moved = [key for key in KEYS if after[key] != before[key]]
+    assert moved
+    assert all(after[key] == WORKERS[3] for key in moved)
+    # about a quarter of the keys, never all of them:
+    assert len(moved) < len(KEYS) / 2
+
+
+def test_excluded_worker_is_skipped():
+    ring = HashRing(WORKERS)
+    key = KEYS[0]
+    owner = ring.get(key)
+    assert ring.get(key, exclude={owner}) not in (owner, None)
+    assert ring.get(key, exclude=set(WORKERS)) is None
@@ -0,0 +1,79 @@
+"""Serializer: out-of-band buffers and functions sent by digest."""
+import pickle
+from qw.conf import WORKER_OOB_MIN_SIZE
+from qw.serializer import (
+    FunctionCache,
+    dump_function,
+    dumps,
+    dumps_call,
+    loads,
+    loads_call
+)
+
+
+def join(payload) -> bytes:
+    return b''.join(bytes(part) for part in payload)
+
+
+def test_small_buffers_are_sent_in_band():
+    data = dumps({'rows': pickle.PickleBuffer(b'x' * 100)})
+    assert isinstance(data, bytes)
+    assert bytes(loads(data)['rows']) == b'x' * 100
+
+
+def test_large_buffers_are_sent_out_of_band():
+    buffer = bytearray(b'x' * WORKER_OOB_MIN_SIZE * 2)
+    parts = dumps({'rows': pickle.PickleBuffer(buffer), 'name': 'report'})
+    assert isinstance(parts, list)
+    # header, pickle and the buffer itself (without copies):
+    header, data, oob = parts
+    assert oob.nbytes == len(buffer)
+    assert len(data) < WORKER_OOB_MIN_SIZE
+    obj = loads(join(parts), out_of_band=True)
+    assert obj['name'] == 'report'
+    assert bytes(obj['rows']) == buffer
+
+
+def add(a, b=0):
+    return a + b
+
+
+class Call:
+    def __init__(self, func, *args):
+        self.func = func
+        self.args = args
+
+
+def test_call_is_sent_without_their_function():
+    digest, code = dump_function(add)
+    wrapper = Call(add, 1)
+    payload = dumps_call(wrapper, digest)
+    received, sent_code, received_wrapper = loads_call(payload)
+    assert received == digest
+    assert not bytes(sent_code)
+    assert received_wrapper.func is None
+    assert received_wrapper.args == (1,)
+    assert wrapper.func is add
+    # the first call carries the function:
+    _, sent_code, _ = loads_call(dumps_call(wrapper, digest, code))
+    assert bytes(sent_code) == code
+
+
+def test_function_cache():
+    cache = FunctionCache(max_size=1)
+    digest, code = dump_function(add)
+    assert cache.get(digest) is None
+    assert cache.load(digest, code)(1, b=2) == 3
+    assert cache.get(digest)(1) == 1
+    try:
+        cache.load(digest, code + b'.')
+    except ValueError:
+        pass
+    else:
+        raise AssertionError('code not matching their digest was loaded')
+    # least recently used functions are evicted:
+    other, other_code = dump_function(len)
+    cache.load(other, other_code)
+    assert len(cache) == 1
+    assert cache.get(digest) is None
+    assert cache.to_dict()['hits'] == 1
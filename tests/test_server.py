@@ -0,0 +1,98 @@
+"""QWorker: replies sent over framed connections."""
+import asyncio
+import json
+import socket
+from qw.client import result_error
+from qw.frames import (
+    FLAG_ERROR,
+    FLAG_MORE,
+    FRAME_STREAM,
+    FramedConnection,
+    FrameWriter,
+    read_frame
+)
+from qw.serializer import dumps, loads
+from qw.server import QWorker
+
+
+async def framed_pair() -> tuple:
+    """A client connection and the streams of the Worker side."""
+    client_sock, worker_sock = socket.socketpair()
+    reader, writer = await asyncio.open_connection(sock=client_sock)
+    worker_streams = await asyncio.open_connection(sock=worker_sock)
+    return FramedConnection(reader, writer, ('127.0.0.1', 8888)), worker_streams
+
+
+def test_failed_stream_ends_with_an_error():
+    async def stream():
+        worker = QWorker(name='test', event_loop=asyncio.get_running_loop())
+
+        async def stream_result(task, writer):
+            await writer.write_chunk(dumps([1, 2]))
+            raise RuntimeError('lost the database')
+
+        worker.stream_result = stream_result
+        worker.deserialize_task = lambda *args: asyncio.sleep(0, 'task')
+        conn, (reader, writer) = await framed_pair()
+
+        async def serve():
+            _, flags, request_id, payload = await read_frame(reader)
+            channel = FrameWriter(writer, request_id, asyncio.Lock())
+            await worker.frame_dispatch(FRAME_STREAM, payload, channel, flags)
+            await channel.drain()
+
+        serving = asyncio.get_running_loop().create_task(serve())
+        try:
+            return [
+                (flags, loads(payload)) async for flags, payload in conn.stream(FRAME_STREAM, b'task')
+            ]
+        finally:
+            await serving
+            await conn.close()
+            writer.close()
+
+    (flags, chunk), (error_flags, error) = asyncio.run(stream())
+    assert flags & FLAG_MORE and chunk == [1, 2]
+    # the stream is not truncated silently:
+    assert error_flags & FLAG_ERROR
+    assert isinstance(error, RuntimeError)
+
+
+def test_generator_results_are_sent_as_lists():
+    worker = QWorker(name='test', event_loop=asyncio.new_event_loop())
+    try:
+        result = worker.prepare_result((n * 2 for n in range(3)), 'task', 'uid')
+    finally:
+        worker._loop.close()  # pylint: disable=W0212
+    # a generator can't be pickled, their items are sent as a JSON list:
+    assert json.loads(result) == [0, 2, 4]
+
+
+def test_error_results_are_raised_by_client():
+    error = result_error({"exception": KeyError, "error": "missing"})
+    assert isinstance(error, KeyError)
+    assert result_error(ValueError('bad')).args == ('bad',)
+    assert result_error([{"exception": "not an error"}]) is None
+    assert result_error({"rows": 1}) is None
+
+
+def test_batch_tasks_are_counted_as_active():
+    async def batch():
+        worker = QWorker(name='test', event_loop=asyncio.get_running_loop())
+        seen = []
+
+        async def task():
+            await asyncio.sleep(0.01)
+            seen.append(worker.active)
+            await asyncio.sleep(0.01)
+
+        replies = []
+
+        async def closing_writer(writer, result):
+            replies.append(result)
+
+        worker.closing_writer = closing_writer
+        await worker.handle_batch([task, task], writer=None)
+        return seen, worker.active, len(replies)
+
+    assert asyncio.run(batch()) == ([2, 2], 0, 1)
@@ -0,0 +1,128 @@
+"""SpillStore: Tasks spilled to disk when the Worker Queue is full."""
+import asyncio
+import contextlib
+import os
+from qw.queues import PriorityLanes, QueueManager, manager
+from qw.queues.spill import SpillStore
+
+
+class Task:
+    def __init__(self, name: str, priority: int = 0):
+        self.name = name
+        self.priority = priority
+
+
+def test_spilled_tasks_are_drained_by_priority(tmp_path):
+    async def spill():
+        store = SpillStore(str(tmp_path / 'worker.spill.db'), max_tasks=10)
+        await store.open()
+        try:
+            await store.push_many([Task('a'), Task('b', 2), Task('c'), Task('d', 1)])
+            first = await store.pop_many(2)
+            rest = await store.pop_many(10)
+            return [t.name for t in first], [t.name for t in rest], len(store)
+        finally:
+            await store.close()
+
+    assert asyncio.run(spill()) == (['b', 'd'], ['a', 'c'], 0)
+
+
+def test_spill_is_bounded(tmp_path):
+    async def spill():
+        store = SpillStore(str(tmp_path / 'worker.spill.db'), max_tasks=3)
+        await store.open()
+        try:
+            spilled = await store.push_many([Task(str(n)) for n in range(5)])
+            try:
+                await store.push(Task('full'))
+            except asyncio.QueueFull:
+                refused = True
+            return spilled, refused, store.full
+        finally:
+            await store.close()
+
+    assert asyncio.run(spill()) == (3, True, True)
+
+
+def test_tasks_are_recovered_after_restart(tmp_path):
+    path = str(tmp_path / 'worker.spill.db')
+
+    async def spill():
+        store = SpillStore(path)
+        await store.open()
+        await store.push_many([Task('a'), Task('b')])
+        await store.close()
+
+    async def recover():
+        store = SpillStore(path)
+        await store.open()
+        try:
+            return len(store), [t.name for t in await store.pop_many(10)]
+        finally:
+            await store.close()
+
+    asyncio.run(spill())
+    assert asyncio.run(recover()) == (2, ['a', 'b'])
+
+
+def test_spill_in_a_shared_directory_is_refused(tmp_path):
+    os.chmod(tmp_path, 0o777)
+
+    async def spill():
+        store = SpillStore(str(tmp_path / 'worker.spill.db'))
+        try:
+            await store.open()
+        finally:
+            await store.close()
+
+    try:
+        asyncio.run(spill())
+    except PermissionError:
+        pass
+    else:
+        raise AssertionError('spill was opened in a shared directory')
+    finally:
+        os.chmod(tmp_path, 0o700)
+
+
+def test_peeked_tasks_stay_on_disk_until_removed(tmp_path):
+    async def spill():
+        store = SpillStore(str(tmp_path / 'worker.spill.db'))
+        await store.open()
+        try:
+            await store.push_many([Task('a'), Task('b'), Task('c')])
+            peeked = await store.peek_many(2)
+            again = await store.peek_many(2)
+            await store.remove([peeked[0][0]])
+            rest = await store.pop_many(10)
+            return (
+                [t.name for _, t in peeked], [t.name for _, t in again],
+                [t.name for t in rest], len(store)
+            )
+        finally:
+            await store.close()
+
+    assert asyncio.run(spill()) == (['a', 'b'], ['a', 'b'], ['b', 'c'], 0)
+
+
+def test_stopped_drain_keeps_the_tasks_not_queued(tmp_path, monkeypatch):
+    monkeypatch.setattr(manager, 'spill_path', lambda name: str(tmp_path / f'{name}.spill.db'))
+
+    async def drain():
+        queue = QueueManager('test')
+        queue.queue = PriorityLanes(maxsize=1)
+        await queue.open_spill()
+        await queue.spill.push_many([Task('a'), Task('b'), Task('c')])
+        queue._spilled.set()
+        # 'a' fills the Queue and the drain waits for room for 'b':
+        while queue.queue.empty():
+            await asyncio.sleep(0.01)
+        queue._drainer.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await queue._drainer
+        queue._drainer = None
+        left = [t.name for t in await queue.spill.pop_many(10)]
+        await queue.spill.close()
+        return queue.queue.get_nowait().name, left
+
+    assert asyncio.run(drain()) == ('a', ['b', 'c'])
@@ -0,0 +1,29 @@
+"""Private directories of Unix Sockets and spilled Tasks."""
+import os
+from qw.utils import private_dir
+
+
+def test_private_dir_is_created_private(tmp_path):
+    path = str(tmp_path / 'sockets')
+    assert private_dir(path) == path
+    assert os.stat(path).st_mode & 0o777 == 0o700
+    # already exists:
+    assert private_dir(path) == path
+
+
+def test_shared_dir_is_refused(tmp_path):
+    path = str(tmp_path / 'shared')
+    os.mkdir(path, mode=0o700)
+    os.chmod(path, 0o755)
+    try:
+        private_dir(path)
+    except PermissionError:
+        pass
+    else:
+        raise AssertionError('a shared directory was accepted')
+    try:
+        private_dir(str(tmp_path / 'missing'), create=False)
+    except FileNotFoundError:
+        pass
+    else:
+        raise AssertionError('a missing directory was accepted')